@@ -0,0 +1,57 @@
+"""
+Bloom filters over a table's primary keys, that let a point lookup of an absent key
+skip the descent of the table's tree.
+
+A table's filter occupies a page of its own, whose bits are set in place; hence, like the
+pages of the table's tree, the filter is persisted when the pager flushes its pages. A filter
+never has false negatives, i.e. if it doesn't contain a key, the key is not in the table.
+Since deleting a key can't clear its bits (other keys may share them), deleted keys remain
+in the filter; which only makes the filter less selective.
+"""
+from typing import Iterator
+
+from .constants import PAGE_SIZE
+from .statistics import mix_hash
+
+BLOOM_FILTER_NUM_BITS = PAGE_SIZE * 8
+# number of bits set per key
+BLOOM_FILTER_NUM_HASHES = 4
+
+
+class BloomFilter:
+    """
+    A Bloom filter stored in the page `page_num`
+    """
+
+    def __init__(self, page: bytearray, page_num: int):
+        self.page = page
+        self.page_num = page_num
+
+    def add(self, key: int):
+        for position in self.bit_positions(key):
+            self.page[position >> 3] |= 1 << (position & 7)
+
+    def may_contain(self, key: int) -> bool:
+        """
+        Whether `key` may have been added; if False, it certainly wasn't
+        """
+        return all(
+            self.page[position >> 3] & (1 << (position & 7))
+            for position in self.bit_positions(key)
+        )
+
+    def clear(self):
+        self.page[:] = bytes(PAGE_SIZE)
+
+    @staticmethod
+    def bit_positions(key: int) -> Iterator[int]:
+        """
+        Generate the positions of the key's bits; the hashes are derived
+        from two halves of a single hash, i.e. by double hashing
+        """
+        h = mix_hash(key)
+        h1 = h & 0xFFFFFFFF
+        # odd, so that the positions don't repeat
+        h2 = (h >> 32) | 1
+        for i in range(BLOOM_FILTER_NUM_HASHES):
+            yield (h1 + i * h2) % BLOOM_FILTER_NUM_BITS
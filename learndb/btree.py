@@ -8,7 +8,7 @@ import logging
 
 from collections import deque
 from enum import Enum, auto
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
 
 from .constants import (
     NULLPTR,
@@ -33,6 +33,8 @@ from .constants import (
     INTERNAL_NODE_CELL_SIZE,
     INTERNAL_NODE_MAX_CELLS,  # for debugging
     INTERNAL_NODE_MAX_CHILDREN,
+    INTERNAL_NODE_CHILD_COUNT_SIZE,
+    INTERNAL_NODE_CHILD_COUNTS_OFFSET,
     # leaf node header layout
     LEAF_NODE_NUM_CELLS_SIZE,
     LEAF_NODE_NUM_CELLS_OFFSET,
@@ -53,6 +55,7 @@ from .constants import (
     FREE_BLOCK_SIZE_OFFSET,
     FREE_BLOCK_NEXT_BLOCK_SIZE,
     FREE_BLOCK_NEXT_BLOCK_OFFSET,
+    FREE_BLOCK_HEADER_SIZE,
 )
 from .pager import Pager
 from .serde import get_cell_key, get_cell_key_in_page, get_cell_size
@@ -67,6 +70,11 @@ class TreeDeleteResult(Enum):
     Success = auto()
 
 
+class TreeUpdateResult(Enum):
+    Success = auto()
+    KeyNotFound = auto()
+
+
 class NodeType(Enum):
     NodeInternal = 1
     NodeLeaf = 2
@@ -84,14 +92,18 @@ class Tree:
     is only interested in its interface, which operates on sorted
     bytes strings.
 
-    The public interface consists of `find`, `insert`
-    and `delete`, and validators. The remaining methods should not
+    The public interface consists of `find`, `insert`, `update`,
+    `delete`, `delete_many`, `truncate`, and `drop`, and validators. The remaining methods should not
     be invoked by external actors. In principle, any other structure,
     e.g. SSTable, implementing this interface, could replace this.
 
     The tree functionality can be divided into methods that
     operate on page sized `bytes`, e.g. (set_)leaf_node_key. And higher
     level helpers that support find, insert, and delete.
+
+    The tree is counted, i.e. an internal node stores the number of cells in each child's
+    subtree. This allows seeking to the cell with a given rank, via `find_rank`, by
+    descending the tree, i.e. without reading the preceding cells.
     """
 
     def __init__(self, pager: Pager, root_page_num: int):
@@ -102,6 +114,12 @@ class Tree:
         """
         self.pager = pager
         self.root_page_num = root_page_num
+        # nodes on the path to the leaf modified by the ongoing insert/delete; only the count
+        # of the child on the path must be recounted
+        self.stale_page_nums = set()
+        # internal nodes whose children were changed by a split or compaction; every child count
+        # must be recounted
+        self.restructured_page_nums = set()
         self.check_create_leaf_root()
 
     # section : public interface: find, insert, and delete
@@ -132,6 +150,107 @@ class Tree:
             cell_num = self.leaf_node_find(page_num, key)
             return page_num, cell_num
 
+    def find_cell(self, key: int) -> Optional[bytes]:
+        """
+        point lookup: return cell with `key`, or None if `key` doesn't exist
+        """
+        page_num, cell_num = self.find(key)
+        node = self.pager.get_page(page_num)
+        if (
+            self.leaf_node_num_cells(node) > cell_num
+            and self.leaf_node_key(node, cell_num) == key
+        ):
+            return self.leaf_node_cell(node, cell_num)
+        return None
+
+    def count_cells(self, page_num: int = None) -> int:
+        """
+        return number of cells in the (sub)tree rooted at `page_num`;
+        only node headers are read, i.e. cells are not deserialized
+        """
+        if page_num is None:
+            page_num = self.root_page_num
+
+        node = self.pager.get_page(page_num)
+        if self.get_node_type(node) == NodeType.NodeLeaf:
+            return self.leaf_node_num_cells(node)
+
+        count = 0
+        for child_num in range(self.internal_node_num_keys(node)):
+            count += self.count_cells(self.internal_node_child(node, child_num))
+        if self.internal_node_has_right_child(node):
+            count += self.count_cells(self.internal_node_right_child(node))
+        return count
+
+    def shape(self, page_num: int = None) -> Tuple[int, int]:
+        """
+        return (number of pages, height) of the (sub)tree rooted at `page_num`;
+        a tree with only a root leaf has height 1
+        """
+        if page_num is None:
+            page_num = self.root_page_num
+
+        node = self.pager.get_page(page_num)
+        if self.get_node_type(node) == NodeType.NodeLeaf:
+            return 1, 1
+
+        children = [
+            self.internal_node_child(node, child_num)
+            for child_num in range(self.internal_node_num_keys(node))
+        ]
+        if self.internal_node_has_right_child(node):
+            children.append(self.internal_node_right_child(node))
+        page_count = 1
+        height = 0
+        for child in children:
+            child_page_count, child_height = self.shape(child)
+            page_count += child_page_count
+            height = max(height, child_height)
+        return page_count, height + 1
+
+    def page_nums(self) -> Iterator[int]:
+        """
+        generate the page nums of all nodes, level by level from the root. Since
+        all leaves are at the same depth, only the internal nodes, and a single
+        leaf, are read.
+        """
+        level = [self.root_page_num]
+        while level:
+            yield from level
+            if self.get_node_type(self.pager.get_page(level[0])) == NodeType.NodeLeaf:
+                return
+            level = [
+                child_page_num
+                for page_num in level
+                for _, child_page_num in self.internal_node_children(
+                    self.pager.get_page(page_num)
+                )
+            ]
+
+    def find_rank(self, rank: int) -> Tuple[int, int]:
+        """
+        find location of the cell with (0-based) `rank`, i.e. the cell preceded by `rank` cells
+        in key order. This descends the tree using the child counts, i.e. in O(log n).
+
+        :param rank:
+        :return: (page_num, cell_num): (int, int); if `rank` is past the last cell,
+            cell_num is past the last cell of the right-most leaf
+        """
+        page_num = self.root_page_num
+        node = self.pager.get_page(page_num)
+        while self.get_node_type(node) == NodeType.NodeInternal:
+            children = self.internal_node_children(node)
+            for child_num, page_num in children[:-1]:
+                count = self.internal_node_child_count(node, child_num)
+                if rank < count:
+                    break
+                rank -= count
+            else:
+                # the right-most child; if rank is past its last cell, so is the returned location
+                page_num = children[-1][1]
+            node = self.pager.get_page(page_num)
+        return page_num, rank
+
     def insert(self, cell: bytes) -> TreeInsertResult:
         """
         insert a `key` into the tree
@@ -172,7 +291,9 @@ class Tree:
         ):
             return TreeInsertResult.DuplicateKey
 
+        self.mark_path_stale(page_num)
         self.leaf_node_insert(page_num, cell_num, cell)
+        self.update_child_counts()
         return TreeInsertResult.Success
 
     def delete(self, key: int):
@@ -206,9 +327,139 @@ class Tree:
         if self.leaf_node_key(node, cell_num) != key:
             return TreeDeleteResult.Success
 
+        self.mark_path_stale(page_num)
         self.leaf_node_delete(page_num, cell_num)
+        self.update_child_counts()
         return TreeDeleteResult.Success
 
+    def delete_many(self, keys: List[int]) -> TreeDeleteResult:
+        """
+        delete `keys`, removing the keys a leaf holds in one rewrite of the leaf, where that
+        doesn't restructure the tree; keys that don't exist are ignored
+
+        Algorithm:
+            in key order, find the leaf holding the smallest key not yet handled. The leaf's
+            keys that are to be deleted are handled together, in key order: while deleting
+            a key via `delete` would neither compact the leaf with its siblings, nor change
+            the leaf's max key, the key is removed with the others, in one rewrite of the leaf.
+            The remaining keys of the leaf are deleted via `delete`, which compacts nodes
+            and updates ancestors' keys.
+
+            Thus, the tree is restructured exactly as if each key were deleted via `delete`,
+            in key order.
+        """
+        keys = sorted(keys)
+        index = 0
+        while index < len(keys):
+            page_num, _ = self.find(keys[index])
+            node = self.pager.get_page(page_num)
+            num_cells = self.leaf_node_num_cells(node)
+            if num_cells == 0:
+                # the tree is empty
+                break
+
+            # (key, cell_num) of the keys in the leaf's range, that the leaf holds
+            max_key = self.leaf_node_key(node, num_cells - 1)
+            if keys[index] > max_key:
+                # the key, and all remaining keys, are past the tree's max key
+                break
+            leaf_keys = []
+            while index < len(keys) and keys[index] <= max_key:
+                cell_num = self.leaf_node_find(page_num, keys[index])
+                if self.leaf_node_key(node, cell_num) == keys[index]:
+                    leaf_keys.append((keys[index], cell_num))
+                index += 1
+
+            # remove keys from the leaf, while that doesn't restructure the tree
+            cell_nums = []
+            deferred_keys = []
+            remaining_num_cells = num_cells
+            remaining_space = Tree.leaf_node_cell_cellptr_space(node)
+            for position, (key, cell_num) in enumerate(leaf_keys):
+                if cell_num == num_cells - 1:
+                    # the max key; the ancestors' keys must be updated
+                    deferred_keys = [key for key, _ in leaf_keys[position:]]
+                    break
+                remaining_num_cells -= 1
+                remaining_space -= (
+                    len(Tree.leaf_node_cell(node, cell_num))
+                    + LEAF_NODE_CELL_POINTER_SIZE
+                )
+                if not Tree.is_node_root(node) and self.leaf_node_is_compactable(
+                    page_num, remaining_num_cells, remaining_space
+                ):
+                    deferred_keys = [key for key, _ in leaf_keys[position:]]
+                    break
+                cell_nums.append(cell_num)
+            if cell_nums:
+                self.mark_path_stale(page_num)
+                self.leaf_node_delete_cells(node, cell_nums)
+                self.update_child_counts()
+
+            for key in deferred_keys:
+                self.delete(key)
+        return TreeDeleteResult.Success
+
+    def update(self, cell: bytes) -> TreeUpdateResult:
+        """
+        update the cell with `cell`'s key, i.e. replace the cell with `cell`
+
+        Algorithm:
+            find the key location, i.e. leaf page num, and cell num. If the key
+            does not exist, the op terminates.
+
+            If the new cell is no larger than the old cell, the new cell overwrites
+            the old cell in place; the old cell's bytes not used by the new cell are freed.
+
+            Otherwise, the new cell is allocated from the leaf's free list, or else its
+            allocation block, and the old cell is deallocated. Since the key is unchanged,
+            neither the cellptrs' order, nor the ancestors' keys, or child counts change.
+
+            Only if the leaf doesn't have space for the new cell, the old cell is deleted
+            and the new cell is inserted; which may restructure the tree.
+
+        :param cell: cell to update (contains key)
+        :return:
+        """
+        key = get_cell_key(cell)
+        page_num, cell_num = self.find(key)
+        node = self.pager.get_page(page_num)
+        if (
+            self.leaf_node_num_cells(node) <= cell_num
+            or self.leaf_node_key(node, cell_num) != key
+        ):
+            return TreeUpdateResult.KeyNotFound
+
+        if self.leaf_node_update(node, cell_num, cell):
+            return TreeUpdateResult.Success
+
+        self.delete(key)
+        self.insert(cell)
+        return TreeUpdateResult.Success
+
+    def truncate(self):
+        """
+        delete all cells, i.e. return every page, other than the root, to the
+        pager, and reset the root to an empty leaf. The cells are not visited; only
+        the internal nodes are read.
+        """
+        for page_num in self.page_nums():
+            if page_num != self.root_page_num:
+                self.pager.return_page(page_num)
+        root = self.pager.get_page(self.root_page_num)
+        self.initialize_leaf_node(
+            root, node_is_root=True, parent_page_num=self.root_page_num
+        )
+        self.stale_page_nums.clear()
+
+    def drop(self):
+        """
+        delete the tree, i.e. return every page, including the root, to the pager.
+        The tree must not be used after this.
+        """
+        self.truncate()
+        self.pager.return_page(self.root_page_num)
+
     # section: logic helpers - find
 
     def leaf_node_find(self, page_num: int, key: int) -> int:
@@ -413,10 +664,11 @@ class Tree:
         # check if combined alloc + free blocks will satisfy
         else:
             assert alloc_block_space + total_space_free_list >= space_needed
-            # perform compaction on node
-            # todo: complete me
+            # perform compaction on node, i.e. move free blocks onto alloc block, and retry
             # todo: this could be done with a check above allocate; whether node should be compacted before alloc
-            raise NotImplementedError
+            Tree.leaf_node_compact_cells(node, Tree.leaf_node_cells(node))
+            self.leaf_node_insert(page_num, cell_num, cell)
+            return
 
         # new key was inserted at largest index, i.e. new max-key - update parent
         if cell_num == num_cells and cell_num != 0:
@@ -574,6 +826,7 @@ class Tree:
         parent_page_num = self.get_parent_page_num(old_child)
         parent = self.pager.get_page(parent_page_num)
         num_keys = self.internal_node_num_keys(parent)
+        self.restructured_page_nums.add(parent_page_num)
         # number of nodes to add; one (old) node is already included
         num_new_nodes = 1 if middle_child_page_num is None else 2
 
@@ -717,6 +970,9 @@ class Tree:
         self.initialize_internal_node(
             right_parent, node_is_root=False, parent_page_num=grandparent_page_num
         )
+        self.restructured_page_nums.update(
+            (left_parent_page_num, right_parent_page_num)
+        )
 
         # 1.2. prepare new children to be inserted
         old_child_max_key = self.get_node_max_key(old_child)
@@ -820,10 +1076,7 @@ class Tree:
         Tree.set_internal_node_num_keys(left_parent, left_split_count - 1)
         Tree.set_internal_node_num_keys(right_parent, right_split_count - 1)
 
-        # 4. recycle old_child_num
-        self.pager.return_page(old_child_page_num)
-
-        # 5. update parent
+        # 4. update parent
         if self.is_node_root(parent):
             self.create_new_root(left_parent_page_num, right_parent_page_num)
         else:
@@ -831,6 +1084,11 @@ class Tree:
                 parent_page_num, left_parent_page_num, right_parent_page_num
             )
 
+        # 5. recycle old_child_num
+        # NOTE: this must be done after the parent is updated, since the parent's
+        # max key is found via its right child, which may be the old child
+        self.pager.return_page(old_child_page_num)
+
     def create_new_root(
         self,
         left_child_page_num: int,
@@ -866,6 +1124,7 @@ class Tree:
         root = self.pager.get_page(self.root_page_num)
         self.initialize_internal_node(root)
         self.set_node_is_root(root, True)
+        self.restructured_page_nums.add(self.root_page_num)
         # root points to itself
         self.set_parent_page_num(root, self.root_page_num)
 
@@ -968,6 +1227,132 @@ class Tree:
         num_cells = Tree.leaf_node_num_cells(node)
         Tree.set_leaf_node_num_cells(node, num_cells + 1)
 
+    # section: logic helpers - update
+
+    @staticmethod
+    def leaf_node_update(node: bytes, cell_num: int, cell: bytes) -> bool:
+        """
+        replace the cell at `cell_num` with `cell`, within the node; return
+        False, if the node doesn't have space for `cell`
+
+        :param node:
+        :param cell_num:
+        :param cell:
+        :return:
+        """
+        cellptr = Tree.leaf_node_cellptr(node, cell_num)
+        old_cell_size = Tree.leaf_node_cell_size(node, cell_num)
+        space_needed = len(cell)
+
+        if space_needed <= old_cell_size:
+            # overwrite in place; the new cell is placed at the end of the old cell,
+            # so that the freed bytes, preceding it, may be returned to the alloc block
+            new_cellptr = cellptr + old_cell_size - space_needed
+            Tree.set_leaf_node_cell(node, new_cellptr, cell)
+            Tree.set_leaf_node_cellptr(node, cell_num, new_cellptr)
+            Tree.leaf_node_free_bytes(node, cellptr, old_cell_size - space_needed)
+            return True
+
+        has_free_block, _, _ = Tree.find_free_block(node, space_needed)
+        # the old cell, if it's at the boundary of the alloc block, is returned to it
+        alloc_block_space = Tree.leaf_node_alloc_block_space(node)
+        if cellptr == Tree.leaf_node_alloc_ptr(node):
+            alloc_block_space += old_cell_size
+        if not has_free_block and alloc_block_space < space_needed:
+            # free space is fragmented, or insufficient
+            free_space = (
+                LEAF_NODE_NON_HEADER_SPACE
+                - Tree.leaf_node_cell_cellptr_space(node)
+                + old_cell_size
+            )
+            if free_space < space_needed:
+                return False
+            cells = Tree.leaf_node_cells(node)
+            cells[cell_num] = cell
+            Tree.leaf_node_compact_cells(node, cells)
+            return True
+
+        # the old cell must be deallocated before the new cell is allocated, since
+        # it may be returned to the alloc block
+        Tree.leaf_node_deallocate_cell(node, cell_num)
+        if has_free_block:
+            new_cellptr = Tree.leaf_node_allocate_free_block(node, space_needed)
+        else:
+            new_cellptr = Tree.leaf_node_alloc_ptr(node) - space_needed
+            Tree.set_leaf_node_alloc_ptr(node, new_cellptr)
+        Tree.set_leaf_node_cell(node, new_cellptr, cell)
+        Tree.set_leaf_node_cellptr(node, cell_num, new_cellptr)
+        return True
+
+    @staticmethod
+    def leaf_node_allocate_free_block(node: bytes, space_needed: int) -> int:
+        """
+        allocate `space_needed` bytes from the first free block, in the free list,
+        that is large enough; return the offset of the allocated bytes.
+        The block's remaining bytes are freed.
+
+        :param node:
+        :param space_needed:
+        :return:
+        """
+        has_free_block, prev_block, next_block = Tree.find_free_block(
+            node, space_needed
+        )
+        assert has_free_block, "no free block large enough"
+        # unlink block from free list
+        if prev_block == NULLPTR:
+            block = Tree.leaf_node_free_list_head(node)
+            Tree.set_leaf_node_free_list_head(node, next_block)
+        else:
+            block = Tree.free_block_next_free(node, prev_block)
+            Tree.set_free_block_next_free(node, prev_block, next_block)
+        block_size = Tree.free_block_size(node, block)
+        Tree.set_leaf_node_total_free_list_space(
+            node, Tree.leaf_node_total_free_list_space(node) - block_size
+        )
+
+        # allocate the end of the block, and free its start
+        Tree.leaf_node_free_bytes(node, block, block_size - space_needed)
+        return block + block_size - space_needed
+
+    @staticmethod
+    def leaf_node_compact_cells(node: bytes, cells: List[bytes]):
+        """
+        rewrite the node to hold `cells`, contiguously on the alloc block; i.e. the free
+        list is emptied, and the node's free space is in its alloc block
+
+        :param node:
+        :param cells: ordered by key
+        :return:
+        """
+        Tree.set_leaf_node_num_cells(node, 0)
+        Tree.set_leaf_node_alloc_ptr(node, PAGE_SIZE)
+        Tree.set_leaf_node_free_list_head(node, NULLPTR)
+        Tree.set_leaf_node_total_free_list_space(node, 0)
+        for cell_num, cell in enumerate(cells):
+            Tree.leaf_node_allocate_alloc_block_cell(node, cell_num, cell)
+
+    @staticmethod
+    def leaf_node_free_bytes(node: bytes, offset: int, size: int):
+        """
+        free `size` bytes starting at `offset`; if these are at the boundary of the
+        alloc ptr, return them to alloc block, otherwise to the free list.
+
+        NOTE: a fragment smaller than a free block's header can't be tracked, and
+        is lost until the node is rewritten, e.g. split or compacted
+
+        :param node:
+        :param offset:
+        :param size:
+        :return:
+        """
+        if size == 0:
+            return
+        if offset == Tree.leaf_node_alloc_ptr(node):
+            Tree.set_leaf_node_alloc_ptr(node, offset + size)
+        elif size >= FREE_BLOCK_HEADER_SIZE:
+            Tree.leaf_node_add_free_block(node, offset, size)
+
     # section: logic helpers - delete core
 
     def leaf_node_delete(self, page_num: int, cell_num: int):
@@ -987,38 +1372,24 @@ class Tree:
 
         # 2. check if compaction is possible
         if not Tree.is_node_root(node):
-            left_sib_page_num = self.get_left_sibling(page_num)
-            right_sib_page_num = self.get_right_sibling(page_num)
-
-            # this indicates an inconsistency in code
-            assert left_sib_page_num != page_num
-            assert right_sib_page_num != page_num
+            parent_page_num = Tree.get_parent_page_num(node)
+            parent = self.pager.get_page(parent_page_num)
+            if num_cells == 1 and Tree.internal_node_num_keys(parent) == 0:
+                # the node is its parent's only child, and is emptied; it has no siblings
+                # to be compacted with, and is removed instead
+                return self.internal_node_remove_child(
+                    parent_page_num, page_num, del_key
+                )
 
-            num_sibs = 1
-            num_children = num_cells - 1  # -1 for deleted
             cell = Tree.leaf_node_cell(node, cell_num)
-            total_space_needed = (
-                Tree.leaf_node_cell_cellptr_space(node)
-                - len(cell)
-                - LEAF_NODE_CELL_POINTER_SIZE
-            )
-
-            if left_sib_page_num:
-                left_sib = self.pager.get_page(left_sib_page_num)
-                num_sibs += 1
-                num_children += Tree.leaf_node_num_cells(left_sib)
-                total_space_needed = Tree.leaf_node_cell_cellptr_space(left_sib)
-            if right_sib_page_num:
-                right_sib = self.pager.get_page(right_sib_page_num)
-                num_sibs += 1
-                num_children += Tree.leaf_node_num_cells(right_sib)
-                total_space_needed = Tree.leaf_node_cell_cellptr_space(right_sib)
-
             # 2.1. compaction is possible if: 1) node is non-root, 2)  num of children and 3) space can
             # fit on one at least 1 fewer node
-            if (
-                num_children <= (num_sibs - 1) * LEAF_NODE_MAX_CELLS
-                and total_space_needed <= (num_sibs - 1) * LEAF_NODE_NON_HEADER_SPACE
+            if self.leaf_node_is_compactable(
+                page_num,
+                num_cells - 1,  # -1 for deleted
+                Tree.leaf_node_cell_cellptr_space(node)
+                - len(cell)
+                - LEAF_NODE_CELL_POINTER_SIZE,
             ):
                 return self.leaf_node_compact_and_delete(page_num, cell_num)
 
@@ -1040,6 +1411,73 @@ class Tree:
             new_right_key = self.leaf_node_key(node, cell_num - 1)
             self.update_parent_on_new_right_child(page_num, del_key, new_right_key)
 
+    def leaf_node_is_compactable(
+        self, page_num: int, num_cells: int, cell_cellptr_space: int
+    ) -> bool:
+        """
+        return whether the non-root leaf at `page_num`, if it had `num_cells` cells that
+        (with their cellptrs) occupy `cell_cellptr_space` bytes, and its siblings fit on
+        at least 1 fewer node
+
+        :param page_num:
+        :param num_cells:
+        :param cell_cellptr_space:
+        :return:
+        """
+        left_sib_page_num = self.get_left_sibling(page_num)
+        right_sib_page_num = self.get_right_sibling(page_num)
+
+        # this indicates an inconsistency in code
+        assert left_sib_page_num != page_num
+        assert right_sib_page_num != page_num
+
+        num_sibs = 1
+        num_children = num_cells
+        total_space_needed = cell_cellptr_space
+
+        if left_sib_page_num:
+            left_sib = self.pager.get_page(left_sib_page_num)
+            num_sibs += 1
+            num_children += Tree.leaf_node_num_cells(left_sib)
+            total_space_needed = Tree.leaf_node_cell_cellptr_space(left_sib)
+        if right_sib_page_num:
+            right_sib = self.pager.get_page(right_sib_page_num)
+            num_sibs += 1
+            num_children += Tree.leaf_node_num_cells(right_sib)
+            total_space_needed = Tree.leaf_node_cell_cellptr_space(right_sib)
+
+        return (
+            num_children <= (num_sibs - 1) * LEAF_NODE_MAX_CELLS
+            and total_space_needed <= (num_sibs - 1) * LEAF_NODE_NON_HEADER_SPACE
+        )
+
+    @staticmethod
+    def leaf_node_delete_cells(node: bytes, cell_nums: List[int]):
+        """
+        delete the cells at `cell_nums`, in one rewrite of the node's cellptrs.
+        The node's max key must not be deleted, since the parent's key isn't updated.
+
+        :param node:
+        :param cell_nums:
+        :return:
+        """
+        num_cells = Tree.leaf_node_num_cells(node)
+        deleted = set(cell_nums)
+        cellptrs = [
+            Tree.leaf_node_cellptr(node, cell_num)
+            for cell_num in range(num_cells)
+            if cell_num not in deleted
+        ]
+        # deallocate cells in offset order, so that adjacent cells at
+        # the alloc ptr are all returned to the alloc block
+        for cell_num in sorted(
+            cell_nums, key=lambda cell_num: Tree.leaf_node_cellptr(node, cell_num)
+        ):
+            Tree.leaf_node_deallocate_cell(node, cell_num)
+        for cell_num, cellptr in enumerate(cellptrs):
+            Tree.set_leaf_node_cellptr(node, cell_num, cellptr)
+        Tree.set_leaf_node_num_cells(node, len(cellptrs))
+
     def leaf_node_compact_and_delete(self, page_num: int, cell_num: int):
         """
         compact nodes and delete child at `child_num`
@@ -1227,6 +1665,7 @@ class Tree:
         parent = self.pager.get_page(parent_page_num)
         parent_num_keys = self.internal_node_num_keys(parent)
         parent_num_new_keys = parent_num_keys - (num_old_nodes - num_new_nodes)
+        self.restructured_page_nums.add(parent_page_num)
 
         # 3. determine the start and end locations of src nodes
         # there can be 3 or 2 src nodes- this should be reflected in some args being None
@@ -1325,13 +1764,81 @@ class Tree:
         if old_right_child_page_num:
             self.pager.return_page(old_right_child_page_num)
 
-        # 8. check if compaction is possible
-        # only attempt compaction if parent is not root
-        if not self.is_node_root(parent):
-            left_sib_page_num = self.get_left_sibling(parent_page_num)
-            right_sib_page_num = self.get_right_sibling(parent_page_num)
+        # 8. compact parent, or reduce tree depth
+        return self.check_compact_internal_node(parent_page_num)
+
+    def internal_node_remove_child(
+        self, page_num: int, child_page_num: int, child_max_key: int
+    ):
+        """
+        Invoked when the subtree of child `child_page_num` of node at `page_num` is emptied,
+        i.e. its last key `child_max_key` is deleted. Removes the child, and recycles it.
+
+        If the child was the node's only child, the node is emptied too, and is removed from
+        its parent in turn. If the emptied node is the root, the tree is reset to an empty leaf root.
+
+        :param page_num:
+        :param child_page_num:
+        :param child_max_key:
+        :return:
+        """
+        node = self.pager.get_page(page_num)
+        num_keys = self.internal_node_num_keys(node)
+        self.pager.return_page(child_page_num)
+        self.restructured_page_nums.add(page_num)
+
+        # 1. node is emptied
+        if num_keys == 0:
+            if self.is_node_root(node):
+                self.initialize_leaf_node(node, node_is_root=True)
+                return
+            return self.internal_node_remove_child(
+                self.get_parent_page_num(node), page_num, child_max_key
+            )
+
+        # 2. remove child
+        if self.internal_node_right_child(node) == child_page_num:
+            # the last inner child becomes the right child, i.e. there is a new max key;
+            # propagate this up the ancestor chain
+            new_right_child_page_num = self.internal_node_child(node, num_keys - 1)
+            Tree.set_internal_node_right_child(node, new_right_child_page_num)
+            Tree.set_internal_node_num_keys(node, num_keys - 1)
+            new_right_child = self.pager.get_page(new_right_child_page_num)
+            self.update_parent_on_new_right_child(
+                page_num, child_max_key, self.get_node_max_key(new_right_child)
+            )
+        else:
+            # move inner children right of the child over it
+            child_num = self.internal_node_find(page_num, child_max_key)
+            if child_num < num_keys - 1:
+                right_children = self.internal_node_children_starting_at(
+                    node, child_num + 1
+                )
+                self.set_internal_node_children_starting_at(
+                    node, right_children, child_num
+                )
+            Tree.set_internal_node_num_keys(node, num_keys - 1)
+
+        # 3. compact node, or reduce tree depth
+        return self.check_compact_internal_node(page_num)
+
+    def check_compact_internal_node(self, page_num: int):
+        """
+        Invoked after node at `page_num` has fewer children. If the node is not root, and it and
+        its siblings' children fit on at least one fewer node, compact them. If the node is root,
+        and has a single child, reduce the tree depth.
+
+        :param page_num:
+        :return:
+        """
+        node = self.pager.get_page(page_num)
+        # 1. check if compaction is possible
+        # only attempt compaction if node is not root
+        if not self.is_node_root(node):
+            left_sib_page_num = self.get_left_sibling(page_num)
+            right_sib_page_num = self.get_right_sibling(page_num)
             sib_count = 1
-            total_children_count = self.internal_node_num_children(parent)
+            total_children_count = self.internal_node_num_children(node)
 
             if left_sib_page_num:
                 left_sib = self.pager.get_page(left_sib_page_num)
@@ -1344,12 +1851,12 @@ class Tree:
 
             # compact if we can fit siblings' children on at least one fewer node
             if total_children_count <= (sib_count - 1) * INTERNAL_NODE_MAX_CHILDREN:
-                return self.internal_node_compact(parent_page_num)
+                return self.internal_node_compact(page_num)
 
-        # 9. check if tree depth can be reduced
-        if self.is_node_root(parent):
-            # if parent has only one child (right child), delete parent
-            if parent_num_new_keys == 0:
+        # 2. check if tree depth can be reduced
+        if self.is_node_root(node):
+            # if node has only one child (right child), delete node
+            if self.internal_node_num_keys(node) == 0:
                 self.delete_root()
 
     def internal_node_compact(self, page_num: Optional[int]):
@@ -1478,6 +1985,7 @@ class Tree:
         # all src child node have been placed
         # ensure dest node has right number of children
         Tree.set_internal_children_count(dest_node, dest_cell_num)
+        self.restructured_page_nums.update(new_page_nums)
 
         new_left_sib_page_num = new_page_nums[0]
         new_right_sib_page_num = new_page_nums[1] if len(new_page_nums) > 1 else None
@@ -1515,11 +2023,98 @@ class Tree:
             # copy child onto root page
             root[:PAGE_SIZE] = child
             self.set_node_is_root(root, True)
+            self.restructured_page_nums.add(self.root_page_num)
             self.set_parent_page_num(root, NULLPTR)
             # update children of root; since parent page_num has changed
             self.check_update_parent_ref_in_children(self.root_page_num)
             self.pager.return_page(child_page_num)
 
+    # section: logic helpers - child counts
+
+    def mark_path_stale(self, page_num: int):
+        """
+        mark node at `page_num` and its ancestors, as needing the count of the child on the path
+        to `page_num` recounted
+        """
+        node = self.pager.get_page(page_num)
+        self.stale_page_nums.add(page_num)
+        while not self.is_node_root(node):
+            page_num = self.get_parent_page_num(node)
+            self.stale_page_nums.add(page_num)
+            node = self.pager.get_page(page_num)
+
+    def update_child_counts(self):
+        """
+        recount the child counts changed by an insert/delete.
+
+        A stale node is on the path to the modified leaf; only the count of its stale child is
+        recounted, i.e. its other children are not read. A restructured node had its children
+        changed by a split or compaction; all its counts are recounted. A restructured node's
+        parent is either stale or restructured, since its children were changed too. Thus, every
+        node that must be recounted is reachable from the root via such nodes, and only
+        these are visited.
+        """
+        self.recount_subtree(self.root_page_num)
+        self.stale_page_nums.clear()
+        self.restructured_page_nums.clear()
+
+    def recount_subtree(self, page_num: int) -> int:
+        """
+        recount the child counts of node at `page_num`, and of its stale and restructured descendants
+        :return: number of cells in (sub)tree rooted at `page_num`
+        """
+        node = self.pager.get_page(page_num)
+        if self.get_node_type(node) == NodeType.NodeLeaf:
+            return self.leaf_node_num_cells(node)
+
+        is_restructured = page_num in self.restructured_page_nums
+        total = 0
+        for child_num, child_page_num in self.internal_node_children(node):
+            if (
+                child_page_num in self.stale_page_nums
+                or child_page_num in self.restructured_page_nums
+            ):
+                count = self.recount_subtree(child_page_num)
+            elif is_restructured:
+                count = self.subtree_cell_count(child_page_num)
+            else:
+                # neither the child's subtree nor its position changed
+                count = self.internal_node_child_count(node, child_num)
+            self.set_internal_node_child_count(node, child_num, count)
+            total += count
+        return total
+
+    def rebuild_child_counts(self, page_num: Optional[int] = None) -> int:
+        """
+        recount every child count of the (sub)tree rooted at `page_num`, i.e. without relying on
+        any stored counts. This is needed for trees written before internal nodes stored counts.
+        :return: number of cells in (sub)tree rooted at `page_num`
+        """
+        if page_num is None:
+            page_num = self.root_page_num
+        node = self.pager.get_page(page_num)
+        if self.get_node_type(node) == NodeType.NodeLeaf:
+            return self.leaf_node_num_cells(node)
+
+        total = 0
+        for child_num, child_page_num in self.internal_node_children(node):
+            count = self.rebuild_child_counts(child_page_num)
+            self.set_internal_node_child_count(node, child_num, count)
+            total += count
+        return total
+
+    def subtree_cell_count(self, page_num: int) -> int:
+        """
+        return number of cells in (sub)tree rooted at `page_num`, from its (stored) child counts
+        """
+        node = self.pager.get_page(page_num)
+        if self.get_node_type(node) == NodeType.NodeLeaf:
+            return self.leaf_node_num_cells(node)
+        return sum(
+            self.internal_node_child_count(node, child_num)
+            for child_num, _ in self.internal_node_children(node)
+        )
+
     # section: logic helpers - delete helpers
 
     @staticmethod
@@ -1547,10 +2142,20 @@ class Tree:
             return
 
         # 2. return cell to free list
-        # 2.1. format cell as free list node
-        offset = cellptr
-        # 2.2. set block size
-        block_size = len(cell)
+        Tree.leaf_node_add_free_block(node, cellptr, len(cell))
+
+    @staticmethod
+    def leaf_node_add_free_block(node: bytes, offset: int, block_size: int):
+        """
+        format the `block_size` bytes at `offset` as a free block, and
+        add it to the head of the free list
+
+        :param node:
+        :param offset:
+        :param block_size:
+        :return:
+        """
+        # 1. set block size
         block_size_value = block_size.to_bytes(
             FREE_BLOCK_SIZE_SIZE, sys.byteorder
         )  # encoded value
@@ -1559,30 +2164,14 @@ class Tree:
             block_size_offset : block_size_offset + FREE_BLOCK_SIZE_SIZE
         ] = block_size_value
 
-        # 2.3. insert node and set next ptr
+        # 2. insert to head of list; current head (or null) is the new block's next
         head = Tree.leaf_node_free_list_head(node)
-        if head == NULLPTR:
-            # set head to cell offset
-            Tree.set_leaf_node_free_list_head(node, cellptr)
-            next_ptr_offset = offset + FREE_BLOCK_NEXT_BLOCK_OFFSET
-            # set next ptr to null
-            node[
-                next_ptr_offset : next_ptr_offset + FREE_BLOCK_NEXT_BLOCK_SIZE
-            ] = NULLPTR.to_bytes(FREE_BLOCK_NEXT_BLOCK_SIZE, sys.byteorder)
-        else:
-            # insert to head of list
-            # make current head, new cell's next
-            next_ptr = head.to_bytes(FREE_BLOCK_NEXT_BLOCK_SIZE, sys.byteorder)
-            next_ptr_offset = offset + FREE_BLOCK_NEXT_BLOCK_OFFSET
-            node[
-                next_ptr_offset : next_ptr_offset + FREE_BLOCK_NEXT_BLOCK_SIZE
-            ] = next_ptr
-            # set new node as head
-            Tree.set_leaf_node_free_list_head(node, cellptr)
-
-        # 2.4. set free list total space
+        Tree.set_free_block_next_free(node, offset, head)
+        Tree.set_leaf_node_free_list_head(node, offset)
+
+        # 3. set free list total space
         Tree.set_leaf_node_total_free_list_space(
-            node, Tree.leaf_node_total_free_list_space(node) + len(cell)
+            node, Tree.leaf_node_total_free_list_space(node) + block_size
         )
 
     def get_left_sibling(self, page_num: int) -> Optional[int]:
@@ -1879,6 +2468,37 @@ class Tree:
         num_keys_to_shift = num_keys - child_num
         return node[offset : offset + num_keys_to_shift * INTERNAL_NODE_CELL_SIZE]
 
+    @staticmethod
+    def internal_node_children(node: bytes) -> List[Tuple[int, int]]:
+        """
+        return (child_num, page_num) of each child, in key order; the right child's
+        child_num is INTERNAL_NODE_MAX_CELLS
+        """
+        children = [
+            (child_num, Tree.internal_node_child(node, child_num))
+            for child_num in range(Tree.internal_node_num_keys(node))
+        ]
+        if Tree.internal_node_has_right_child(node):
+            children.append(
+                (INTERNAL_NODE_MAX_CELLS, Tree.internal_node_right_child(node))
+            )
+        return children
+
+    @staticmethod
+    def internal_node_child_count_offset(child_num: int) -> int:
+        # NOTE: the right child's child_num is INTERNAL_NODE_MAX_CELLS, i.e. its count is stored last
+        return (
+            INTERNAL_NODE_CHILD_COUNTS_OFFSET
+            + child_num * INTERNAL_NODE_CHILD_COUNT_SIZE
+        )
+
+    @staticmethod
+    def internal_node_child_count(node: bytes, child_num: int) -> int:
+        """return number of cells in subtree of child at `child_num`"""
+        offset = Tree.internal_node_child_count_offset(child_num)
+        value = node[offset : offset + INTERNAL_NODE_CHILD_COUNT_SIZE]
+        return int.from_bytes(value, sys.byteorder)
+
     @staticmethod
     def internal_node_has_right_child(node: bytes) -> bool:
         value = node[
@@ -1902,6 +2522,16 @@ class Tree:
         cell_size = get_cell_size(node, cellptr)
         return node[cellptr : cellptr + cell_size]
 
+    @staticmethod
+    def leaf_node_cells(node: bytes) -> List[bytes]:
+        """
+        returns (copies of) all cells, ordered by key
+        """
+        return [
+            bytes(Tree.leaf_node_cell(node, cell_num))
+            for cell_num in range(Tree.leaf_node_num_cells(node))
+        ]
+
     @staticmethod
     def leaf_node_cell_size(node: bytes, cell_num: int) -> int:
         """
@@ -2140,6 +2770,12 @@ class Tree:
         offset = Tree.internal_node_cell_offset(child_num)
         node[offset : offset + len(children)] = children
 
+    @staticmethod
+    def set_internal_node_child_count(node: bytes, child_num: int, count: int):
+        offset = Tree.internal_node_child_count_offset(child_num)
+        value = count.to_bytes(INTERNAL_NODE_CHILD_COUNT_SIZE, sys.byteorder)
+        node[offset : offset + INTERNAL_NODE_CHILD_COUNT_SIZE] = value
+
     @staticmethod
     def set_internal_node_key(node: bytes, child_num: int, key: int):
         offset = Tree.internal_node_key_offset(child_num)
@@ -2263,6 +2899,16 @@ class Tree:
             + LEAF_NODE_FREE_LIST_HEAD_POINTER_SIZE
         ] = value
 
+    @staticmethod
+    def set_free_block_next_free(node: bytes, free_block_offset: int, next_block: int):
+        """
+        set next free block of block at `free_block_offset`
+        """
+        offset = free_block_offset + FREE_BLOCK_NEXT_BLOCK_OFFSET
+        node[offset : offset + FREE_BLOCK_NEXT_BLOCK_SIZE] = next_block.to_bytes(
+            FREE_BLOCK_NEXT_BLOCK_SIZE, sys.byteorder
+        )
+
     @staticmethod
     def set_leaf_node_total_free_list_space(node: bytes, total_free_space: int) -> int:
         value = total_free_space.to_bytes(
@@ -2382,6 +3028,26 @@ class Tree:
         """
         self.validate_ordering()
         self.validate_parent_keys()
+        self.validate_child_counts()
+
+    def validate_child_counts(self) -> bool:
+        """
+        validate that each internal node's child counts, are the number of cells in the child's subtree
+        """
+        stack = [self.root_page_num]
+        while stack:
+            node_page_num = stack.pop()
+            node = self.pager.get_page(node_page_num)
+            if self.get_node_type(node) == NodeType.NodeInternal:
+                for child_num, child_page_num in self.internal_node_children(node):
+                    child_count = self.internal_node_child_count(node, child_num)
+                    actual_count = self.count_cells(child_page_num)
+                    assert child_count == actual_count, (
+                        f"Expected child count [{actual_count}] at pos [{child_num}]; found [{child_count}]; "
+                        f"parent_page_num: {node_page_num}, child_page_num: {child_page_num}"
+                    )
+                    stack.append(child_page_num)
+        return True
 
     def validate_parent_keys(self) -> bool:
         """
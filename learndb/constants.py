@@ -19,7 +19,9 @@ FILE_PAGE_AREA_OFFSET = FILE_HEADER_SIZE
 FILE_HEADER_VERSION_FIELD_OFFSET = 0
 FILE_HEADER_VERSION_FIELD_SIZE = 16
 # NOTE: The diff between size and len(FILE_HEADER_VERSION_VALUE) should be padding
-FILE_HEADER_VERSION_VALUE = b"learndb v1"
+FILE_HEADER_VERSION_VALUE = b"learndb v2"
+# files written before internal nodes stored their child counts
+FILE_HEADER_UNCOUNTED_VERSION_VALUE = b"learndb v1"
 # pointer to next node in free list
 FILE_HEADER_NEXT_FREE_PAGE_HEAD_OFFSET = (
     FILE_HEADER_VERSION_FIELD_OFFSET + FILE_HEADER_VERSION_FIELD_SIZE
@@ -98,6 +100,13 @@ INTERNAL_NODE_LEFT_SPLIT_CHILD_COUNT = (
     INTERNAL_NODE_MAX_CHILDREN + 1
 ) - INTERNAL_NODE_RIGHT_SPLIT_CHILD_COUNT
 
+# the number of cells in each child's subtree is stored at the end of the page;
+# the count of inner child n is at position n, and of the right child at position INTERNAL_NODE_MAX_CELLS
+INTERNAL_NODE_CHILD_COUNT_SIZE = WORD
+INTERNAL_NODE_CHILD_COUNTS_OFFSET = (
+    PAGE_SIZE - INTERNAL_NODE_MAX_CHILDREN * INTERNAL_NODE_CHILD_COUNT_SIZE
+)
+
 # leaf node header layout
 # old layout:
 # nodetype .. is_root .. parent_pointer
@@ -178,6 +187,8 @@ REAL_EPSILON = 0.00001
 # name of catalog
 CATALOG = "catalog"
 CATALOG_ROOT_PAGE_NUM = 0
+# name of table holding statistics collected by ANALYZE
+STATS_CATALOG = "stats_catalog"
 
 USAGE = """
 Supported meta-commands:
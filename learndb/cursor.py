@@ -40,6 +40,28 @@ class Cursor:
         # node must be leaf node
         self.end_of_table = Tree.leaf_node_num_cells(node) == 0
 
+    def seek_rank(self, rank: int):
+        """
+        set cursor location to the cell with (0-based) `rank`, i.e. skip
+        past `rank` cells, without reading them
+        """
+        self.page_num, self.cell_num = self.tree.find_rank(rank)
+        node = self.pager.get_page(self.page_num)
+        self.end_of_table = self.cell_num >= Tree.leaf_node_num_cells(node)
+
+    def seek_key(self, key: int):
+        """
+        set cursor location to the first cell with key not less than `key`
+        """
+        self.page_num, self.cell_num = self.tree.find(key)
+        node = self.pager.get_page(self.page_num)
+        num_cells = Tree.leaf_node_num_cells(node)
+        self.end_of_table = num_cells == 0
+        if 0 < num_cells <= self.cell_num:
+            # all keys in the leaf are smaller; continue from the next leaf
+            self.cell_num = num_cells - 1
+            self.advance()
+
     def get_cell(self) -> bytes:
         """
         return cell pointed by cursor
@@ -49,6 +71,13 @@ class Cursor:
         cell = Tree.leaf_node_cell(node, self.cell_num)
         return cell
 
+    def get_key(self) -> int:
+        """
+        return key of cell pointed by cursor; the rest of the cell is not read
+        """
+        node = self.pager.get_page(self.page_num)
+        return Tree.leaf_node_key(node, self.cell_num)
+
     def next_leaf(self):
         """
         move self.page_num and self.cell_num to next leaf and next cell
@@ -0,0 +1,237 @@
+"""
+Support for EXPLAIN, and EXPLAIN ANALYZE.
+
+While a select statement is evaluated, each operator (scan, filter, join, ...) is described
+by an `Operator`; since each operator consumes the recordsets of its inputs, the
+operators form a tree. EXPLAIN reports this tree without executing the statement, i.e. no
+records are pulled. EXPLAIN ANALYZE executes the statement, and reports for each operator,
+the number of records it generated, and the wall time, pages read, and bytes deserialized
+while generating them. These actuals are inclusive of the operator's inputs.
+"""
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .lang_parser.symbols import (
+    Symbol,
+    Expr,
+    OrClause,
+    AndClause,
+    Comparison,
+    ComparisonOp,
+    ArithmeticOp,
+    BinaryArithmeticOperation,
+    ColumnName,
+    FuncCall,
+    JoinType,
+    Literal,
+    SymbolicDataType,
+)
+from .lang_parser.visitor import Visitor, HandlerNotFoundException
+
+COMPARISON_OPERATORS = {
+    ComparisonOp.Greater: ">",
+    ComparisonOp.Less: "<",
+    ComparisonOp.LessEqual: "<=",
+    ComparisonOp.GreaterEqual: ">=",
+    ComparisonOp.Equal: "=",
+    ComparisonOp.NotEqual: "<>",
+}
+
+ARITHMETIC_OPERATORS = {
+    ArithmeticOp.Addition: "+",
+    ArithmeticOp.Subtraction: "-",
+    ArithmeticOp.Multiplication: "*",
+    ArithmeticOp.Division: "/",
+}
+
+JOIN_TYPE_NAMES = {
+    JoinType.Inner: "inner",
+    JoinType.LeftOuter: "left",
+    JoinType.RightOuter: "right",
+    JoinType.FullOuter: "full",
+    JoinType.Cross: "cross",
+}
+
+
+@dataclass
+class IOCounters:
+    """
+    Running counts of the VM's reads; these are only ever incremented.
+    NOTE: pages read counts the leaf pages, i.e. pages holding records, that
+    scans and lookups read cells from.
+    """
+
+    pages_read: int = 0
+    bytes_deserialized: int = 0
+
+
+@dataclass
+class Operator:
+    """
+    A node in the tree of operators that evaluate a statement
+    """
+
+    name: str
+    detail: Optional[str] = None
+    inputs: List["Operator"] = field(default_factory=list)
+    # actuals; only measured by EXPLAIN ANALYZE
+    rows: int = 0
+    seconds: float = 0.0
+    pages_read: int = 0
+    bytes_deserialized: int = 0
+
+
+class ExpressionPrinter(Visitor):
+    """
+    Prints an expression (condition), as sql text
+    """
+
+    def print(self, expr: Symbol) -> str:
+        return expr.accept(self)
+
+    def visit_expr(self, expr: Expr) -> str:
+        return self.print(expr.expr)
+
+    def visit_or_clause(self, or_clause: OrClause) -> str:
+        text = " or ".join(self.print(clause) for clause in or_clause.and_clauses)
+        return f"({text})" if len(or_clause.and_clauses) > 1 else text
+
+    def visit_and_clause(self, and_clause: AndClause) -> str:
+        return " and ".join(
+            self.print(predicate) for predicate in and_clause.predicates
+        )
+
+    def visit_comparison(self, comparison: Comparison) -> str:
+        operator = COMPARISON_OPERATORS[comparison.operator]
+        return f"{self.print(comparison.left_op)} {operator} {self.print(comparison.right_op)}"
+
+    def visit_binary_arithmetic_operation(
+        self, operation: BinaryArithmeticOperation
+    ) -> str:
+        operator = ARITHMETIC_OPERATORS[operation.operator]
+        return f"({self.print(operation.operand1)} {operator} {self.print(operation.operand2)})"
+
+    def visit_func_call(self, func_call: FuncCall) -> str:
+        args = ", ".join(self.print(arg) for arg in func_call.args)
+        return f"{func_call.name}({args})"
+
+    def visit_column_name(self, column: ColumnName) -> str:
+        return column.name
+
+    def visit_literal(self, literal: Literal) -> str:
+        if literal.value is None:
+            return "null"
+        if literal.type == SymbolicDataType.Text:
+            return f"'{literal.value}'"
+        if isinstance(literal.value, bool):
+            return str(literal.value).lower()
+        return str(literal.value)
+
+
+def expression_to_sql(expr: Any) -> str:
+    """
+    Return `expr` as sql text; expressions the printer doesn't handle
+    are returned as their repr
+    """
+    try:
+        return ExpressionPrinter().print(expr)
+    except (HandlerNotFoundException, AttributeError, KeyError):
+        return str(expr)
+
+
+class QueryProfile:
+    """
+    Records the operators of the statement being explained, keyed by the
+    name of the recordset each operator generates.
+
+    If `analyze` is not set, operators are not executed, i.e. each recordset
+    is cut off from the records of its inputs.
+    """
+
+    def __init__(self, analyze: bool, io_counters: IOCounters):
+        self.analyze = analyze
+        self.io_counters = io_counters
+        self.operators: Dict[str, Operator] = {}
+
+    def describe(
+        self, name: str, detail: Optional[str], input_rsnames: Iterable[str]
+    ) -> Operator:
+        """
+        Create an operator, over the operators that generate `input_rsnames`
+        """
+        inputs = [
+            self.operators[rsname]
+            for rsname in input_rsnames
+            if rsname in self.operators
+        ]
+        return Operator(name, detail, inputs)
+
+    def register(self, rsname: str, operator: Operator):
+        self.operators[rsname] = operator
+
+    def get_operator(self, rsname: str) -> Optional[Operator]:
+        return self.operators.get(rsname)
+
+    def instrument(self, records: Iterable, operator: Operator) -> Iterable:
+        """
+        Return the records the operator generates; if analyzing, measured with
+        `operator`, else none
+        """
+        if not self.analyze:
+            return iter(())
+        return self.measured_records(records, operator)
+
+    def measured_records(self, records: Iterable, operator: Operator) -> Iterator:
+        records = iter(records)
+        while True:
+            with self.measure(operator):
+                try:
+                    record = next(records)
+                except StopIteration:
+                    return
+            operator.rows += 1
+            yield record
+
+    @contextmanager
+    def measure(self, operator: Operator):
+        """
+        Add the time, and reads, spent in the block to the operator's actuals
+        """
+        start = time.perf_counter()
+        pages_read = self.io_counters.pages_read
+        bytes_deserialized = self.io_counters.bytes_deserialized
+        try:
+            yield
+        finally:
+            operator.seconds += time.perf_counter() - start
+            operator.pages_read += self.io_counters.pages_read - pages_read
+            operator.bytes_deserialized += (
+                self.io_counters.bytes_deserialized - bytes_deserialized
+            )
+
+    def format(self, root: Operator) -> List[str]:
+        """
+        Format the tree of operators rooted at `root` as lines of text; inputs are
+        indented under the operator that consumes them
+        """
+        lines = []
+
+        def format_operator(operator: Operator, depth: int):
+            text = operator.name
+            if operator.detail:
+                text += f" {operator.detail}"
+            if self.analyze:
+                text += (
+                    f" (actual rows={operator.rows} time={operator.seconds * 1000:.3f}ms"
+                    f" pages={operator.pages_read} bytes={operator.bytes_deserialized})"
+                )
+            prefix = "  " * (depth - 1) + "-> " if depth else ""
+            lines.append(prefix + text)
+            for input_operator in operator.inputs:
+                format_operator(input_operator, depth + 1)
+
+        format_operator(root, 0)
+        return lines
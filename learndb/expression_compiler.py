@@ -0,0 +1,280 @@
+"""
+Compiles expressions into python closures.
+
+The ExpressionInterpreter walks an expression's AST for every record it is evaluated over.
+Instead, an expression can be compiled once per statement, against the schema of the
+records it will be evaluated over: column references are bound to their position in the record
+(a dict key, or a tuple slot), literals are validated, and functions and operators are resolved.
+The compiled expression, i.e. a closure: record -> value, then only does the per-record work.
+
+The compiled expression evaluates exactly like the interpreter; expressions the compiler
+doesn't handle, e.g. nested selects, fall back to the interpreter.
+"""
+import numbers
+import operator
+from typing import Any, Callable, List, Optional, Type, Union
+
+from .constants import REAL_EPSILON
+from .datatypes import DataType, is_term_valid_for_datatype
+from .functions import resolve_scalar_func_name
+from .lang_parser.visitor import Visitor, HandlerNotFoundException
+from .lang_parser.symbols import (
+    Symbol,
+    OrClause,
+    AndClause,
+    ColumnName,
+    ComparisonOp,
+    Comparison,
+    Literal,
+    BinaryArithmeticOperation,
+    ArithmeticOp,
+    FuncCall,
+    Expr,
+)
+from .expression_interpreter import ExpressionInterpreter
+from .name_registry import NameRegistry
+from .schema import SimpleSchema, ScopedSchema
+from .semantic_analysis import SemanticAnalyzer
+from .vm_utils import datatype_from_symbolic_datatype
+
+CompiledExpression = Callable[[Any], Any]
+
+# exact types that are numbers; checked before the (slower) isinstance check against numbers.Number
+NUMERIC_TYPES = (int, float)
+
+STRICT_COMPARISONS = {
+    ComparisonOp.Equal: operator.eq,
+    ComparisonOp.NotEqual: operator.ne,
+    ComparisonOp.Greater: operator.gt,
+    ComparisonOp.Less: operator.lt,
+    ComparisonOp.GreaterEqual: operator.ge,
+    ComparisonOp.LessEqual: operator.le,
+}
+
+# see: ExpressionInterpreter.evaluate_fuzzy_comparison
+FUZZY_COMPARISONS = {
+    ComparisonOp.Equal: lambda left, right: abs(left - right) <= REAL_EPSILON,
+    ComparisonOp.NotEqual: lambda left, right: abs(left - right) > REAL_EPSILON,
+    ComparisonOp.Greater: lambda left, right: left + REAL_EPSILON > right,
+    ComparisonOp.Less: lambda left, right: left - REAL_EPSILON < right,
+    ComparisonOp.GreaterEqual: lambda left, right: left + REAL_EPSILON >= right,
+    ComparisonOp.LessEqual: lambda left, right: left - REAL_EPSILON <= right,
+}
+
+
+def integer_or_true_division(left, right):
+    # like the interpreter, integers are floor divided
+    if isinstance(left, int):
+        return left // right
+    return left / right
+
+
+ARITHMETIC_OPERATIONS = {
+    ArithmeticOp.Addition: operator.add,
+    ArithmeticOp.Subtraction: operator.sub,
+    ArithmeticOp.Multiplication: operator.mul,
+    ArithmeticOp.Division: integer_or_true_division,
+}
+
+
+class ExpressionCompiler(Visitor):
+    """
+    Compiles an expression into a closure, that evaluates the expression over a record.
+
+    The records must conform to the schema the expression is compiled against, i.e.
+        - a SimpleRecord, if schema is a SimpleSchema
+        - a ScopedRecord, if schema is a ScopedSchema
+        - a JoinedRecordView, if schema is a ScopedSchema, and `left_width` is passed
+    """
+
+    def __init__(self, interpreter: ExpressionInterpreter):
+        # fallback for expressions that can't be compiled
+        self.interpreter = interpreter
+        # determines the types of function args, so they can be validated once
+        self.type_checker = SemanticAnalyzer(NameRegistry())
+        self.schema = None
+        self.left_width = None
+
+    def compile(
+        self,
+        expr: Symbol,
+        schema: Union[SimpleSchema, ScopedSchema],
+        left_width: Optional[int] = None,
+    ) -> CompiledExpression:
+        """
+        Compile `expr` into a closure over records conforming to `schema`
+        """
+        self.schema = schema
+        self.left_width = left_width
+        try:
+            return self.compile_node(expr)
+        except HandlerNotFoundException:
+            interpreter = self.interpreter
+            return lambda record: interpreter.evaluate_over_record(expr, record)
+        finally:
+            self.schema = None
+            self.left_width = None
+
+    def compile_node(self, expr: Symbol) -> CompiledExpression:
+        return expr.accept(self)
+
+    # section: visit methods
+
+    def visit_expr(self, expr: Expr) -> CompiledExpression:
+        return self.compile_node(expr.expr)
+
+    def visit_or_clause(self, or_clause: OrClause) -> CompiledExpression:
+        """
+        NOTE: like the interpreter, this evaluates to True if any clause is True;
+        otherwise to the value of the last clause
+        """
+        clauses = [self.compile_node(clause) for clause in or_clause.and_clauses]
+        if len(clauses) == 1:
+            return clauses[0]
+
+        def or_clause_value(record):
+            value = None
+            for clause in clauses:
+                value = clause(record)
+                if value is True:
+                    return True
+            return value
+
+        return or_clause_value
+
+    def visit_and_clause(self, and_clause: AndClause) -> CompiledExpression:
+        """
+        NOTE: like the interpreter, this evaluates to False if any predicate is False; otherwise
+        to the value of the last boolean predicate, or the (single) non-boolean predicate
+        """
+        predicates = [
+            self.compile_node(predicate) for predicate in and_clause.predicates
+        ]
+
+        def and_clause_value(record):
+            value = None
+            value_unset = True
+            for predicate in predicates:
+                predicate_value = predicate(record)
+                if isinstance(predicate_value, bool):
+                    if predicate_value is False:
+                        return False
+                    value = predicate_value
+                elif value_unset:
+                    value = predicate_value
+                    value_unset = False
+                else:
+                    raise NotImplementedError
+            return value
+
+        return and_clause_value
+
+    def visit_comparison(self, comparison: Comparison) -> CompiledExpression:
+        left = self.compile_node(comparison.left_op)
+        right = self.compile_node(comparison.right_op)
+        # a literal operand is bound, rather than evaluated per record
+        left_is_literal = isinstance(comparison.left_op, Literal)
+        left_literal = comparison.left_op.value if left_is_literal else None
+        right_is_literal = isinstance(comparison.right_op, Literal)
+        right_literal = comparison.right_op.value if right_is_literal else None
+        strict = STRICT_COMPARISONS[comparison.operator]
+        fuzzy = FUZZY_COMPARISONS[comparison.operator]
+        # equality and inequality can be for any datatypes; other comparisons
+        # are only defined for numeric types
+        numeric_only = comparison.operator not in (
+            ComparisonOp.Equal,
+            ComparisonOp.NotEqual,
+        )
+
+        def comparison_value(record):
+            left_value = left_literal if left_is_literal else left(record)
+            right_value = right_literal if right_is_literal else right(record)
+            if numeric_only and not (
+                left_value.__class__ in NUMERIC_TYPES
+                and right_value.__class__ in NUMERIC_TYPES
+            ):
+                assert isinstance(left_value, numbers.Number) and isinstance(
+                    right_value, numbers.Number
+                )
+            # reals within REAL_EPSILON of each other are compared fuzzily
+            if (
+                isinstance(left_value, float)
+                and abs(left_value - right_value) <= REAL_EPSILON
+            ):
+                return fuzzy(left_value, right_value)
+            return strict(left_value, right_value)
+
+        return comparison_value
+
+    def visit_binary_arithmetic_operation(
+        self, operation: BinaryArithmeticOperation
+    ) -> CompiledExpression:
+        operand1 = self.compile_node(operation.operand1)
+        operand2 = self.compile_node(operation.operand2)
+        apply = ARITHMETIC_OPERATIONS[operation.operator]
+        return lambda record: apply(operand1(record), operand2(record))
+
+    def visit_func_call(self, func_call: FuncCall) -> CompiledExpression:
+        resp = resolve_scalar_func_name(func_call.name)
+        if not resp.success:
+            # e.g. an aggregate function; these are only evaluated over groups
+            raise HandlerNotFoundException(
+                f"Unable to compile call to function [{func_call.name}]"
+            )
+        func = resp.body
+        args = [self.compile_node(arg) for arg in func_call.args]
+        arg_types = self.resolve_arg_types(func_call.args)
+        if arg_types is None or not func.validate_arg_types(arg_types, {}).success:
+            # args are validated on each invocation
+            # NOTE: we currently only support positional args
+            return lambda record: func.apply([arg(record) for arg in args], {})
+
+        # args were validated for their types; invoke the function body directly
+        # NOTE: a null arg fails in the body, rather than in arg validation
+        body = func.body
+        if len(args) == 1:
+            arg = args[0]
+            return lambda record: body(arg(record))
+        return lambda record: body(*[arg(record) for arg in args])
+
+    def visit_column_name(self, column: ColumnName) -> CompiledExpression:
+        name = column.name
+        if isinstance(self.schema, SimpleSchema):
+            # SimpleRecord values are keyed by lowercased column name
+            key = name.lower()
+            return lambda record: record.values[key]
+
+        slot = self.schema.get_slot(name)
+        if slot is None:
+            # an unknown name; the record reports the error, if the expression is evaluated
+            return lambda record: record.get(name)
+        if self.left_width is None:
+            return lambda record: record.values[slot]
+        if slot < self.left_width:
+            return lambda record: record.left[slot]
+        right_slot = slot - self.left_width
+        return lambda record: record.right[right_slot]
+
+    def visit_literal(self, literal: Literal) -> CompiledExpression:
+        data_type = datatype_from_symbolic_datatype(literal.type)
+        assert is_term_valid_for_datatype(data_type, literal.value)
+        value = literal.value
+        return lambda record: value
+
+    # section: helpers
+
+    def resolve_arg_types(self, args: List[Symbol]) -> Optional[List[Type[DataType]]]:
+        """
+        Return the types of function `args`, or None if any can't be determined
+        """
+        self.type_checker.name_registry.set_schema(self.schema)
+        arg_types = []
+        for arg in args:
+            try:
+                resp = self.type_checker.analyze_scalar(arg, self.schema)
+            except (HandlerNotFoundException, NotImplementedError):
+                return None
+            if not resp.success:
+                return None
+            arg_types.append(resp.body)
+        return arg_types
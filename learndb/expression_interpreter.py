@@ -293,7 +293,7 @@ class ExpressionInterpreter(Visitor):
         """
         Evaluate
         """
-        if self.mode == EvalMode.Scalar:
+        if self.mode in (EvalMode.Scalar, EvalMode.NoSchema):
             # get function
             resp = resolve_scalar_func_name(func_call.name)
             assert resp.success
@@ -321,12 +321,9 @@ class ExpressionInterpreter(Visitor):
             # min, max, count, etc, it's unclear what multiple arguments could mean, and is hence unsupported.
             resp = resolve_aggregate_func_name(func_call.name)
             assert resp.success  # NOTE: this has been confirmed by SemanticAnalyzer
-            func = resp.body
             arg_column_name = func_call.args[0].expr.name
-            # get list of column values from recordset
-            value_list = self.record.recordset_to_values(arg_column_name)
-            # wrap value list, since agg function expects a list of pos args, where first arg is value list
-            return func.apply([value_list], {})
+            # the aggregate was computed when the records were grouped
+            return self.record.get_aggregate_value(func_call.name, arg_column_name)
 
     def visit_column_name(self, column: ColumnName) -> Any:
         val = self.record.get(column.name)
@@ -0,0 +1,242 @@
+"""
+Rewrites conditions (i.e. where clause, join conditions, and having clause) into an equivalent,
+simpler form, before they are planned and evaluated:
+    - constant subexpressions are folded, e.g. `2 * 10` -> `20`
+    - boolean identities are simplified, e.g. `1 = 1 and x < 5` -> `x < 5`
+    - comparisons are normalized to `column op constant`, e.g. `5 > x` -> `x < 5`,
+        and `x + 1 > 5` -> `x > 4`
+
+The normalized form is what predicate push-down, and selectivity estimation, recognize.
+
+Constants are folded by evaluating them with the ExpressionInterpreter, so a folded constant
+has exactly the value the interpreter would have computed for each record. A constant whose
+evaluation fails, e.g. `1 / 0`, is left as is, so the error is reported when the condition is
+evaluated, like before.
+"""
+from typing import Any, Optional
+
+from .functions import InvalidFunctionArguments, resolve_scalar_func_name
+from .lang_parser.visitor import Visitor, HandlerNotFoundException
+from .lang_parser.symbols import (
+    Symbol,
+    OrClause,
+    AndClause,
+    ColumnName,
+    Comparison,
+    Literal,
+    BinaryArithmeticOperation,
+    ArithmeticOp,
+    FuncCall,
+    Expr,
+    SymbolicDataType,
+)
+from .expression_interpreter import ExpressionInterpreter
+from .query_planner import MIRRORED_OPERATORS
+
+# errors raised by evaluating a constant, that prevent it from being folded
+FOLDING_ERRORS = (
+    ArithmeticError,
+    AssertionError,
+    TypeError,
+    ValueError,
+    InvalidFunctionArguments,
+)
+
+# moving an integer operand, from the column side of a comparison to the constant side
+INVERSE_OPERATORS = {
+    ArithmeticOp.Addition: ArithmeticOp.Subtraction,
+    ArithmeticOp.Subtraction: ArithmeticOp.Addition,
+}
+
+
+def literal_from_value(value: Any) -> Optional[Literal]:
+    """
+    Return a literal with `value`, or None, if `value` has no literal type
+    """
+    # NOTE: bool must be checked before int, since bool is a subclass of int
+    if isinstance(value, bool):
+        return Literal(value, SymbolicDataType.Boolean)
+    if isinstance(value, int):
+        return Literal(value, SymbolicDataType.Integer)
+    if isinstance(value, float):
+        return Literal(value, SymbolicDataType.Real)
+    if isinstance(value, str):
+        return Literal(value, SymbolicDataType.Text)
+    return None
+
+
+def is_boolean_literal(expr: Symbol, value: bool) -> bool:
+    return (
+        isinstance(expr, Literal)
+        and expr.type == SymbolicDataType.Boolean
+        and expr.value is value
+    )
+
+
+class ExpressionRewriter(Visitor):
+    """
+    Rewrites a condition into an equivalent, simpler condition.
+
+    The rewritten condition is a new tree; the condition passed in is not modified.
+    Nodes the rewriter doesn't handle, e.g. nested selects, are kept as is.
+    """
+
+    def __init__(self, interpreter: ExpressionInterpreter):
+        # evaluates constant subexpressions
+        self.interpreter = interpreter
+
+    def rewrite_condition(self, condition: Symbol) -> Symbol:
+        """
+        Public method.
+        Return the rewritten `condition`
+        """
+        try:
+            return self.rewrite(condition)
+        except HandlerNotFoundException:
+            return condition
+
+    def rewrite(self, expr: Symbol) -> Symbol:
+        return expr.accept(self)
+
+    def fold(self, expr: Symbol) -> Symbol:
+        """
+        Return a literal with the value of the constant `expr`; or `expr`
+        if it can't be evaluated
+        """
+        try:
+            value = self.interpreter.evaluate_over_no_record(expr)
+        except FOLDING_ERRORS:
+            return expr
+        literal = literal_from_value(value)
+        return expr if literal is None else literal
+
+    # section: visit methods
+
+    def visit_expr(self, expr: Expr) -> Symbol:
+        return Expr(self.rewrite(expr.expr))
+
+    def visit_or_clause(self, or_clause: OrClause) -> Symbol:
+        """
+        A clause that is true makes the or clause true; a clause that
+        is false can be dropped
+        """
+        clauses = []
+        for and_clause in or_clause.and_clauses:
+            clause = self.rewrite(and_clause)
+            if is_boolean_literal(clause, True):
+                return clause
+            if not is_boolean_literal(clause, False):
+                clauses.append(clause)
+        if len(clauses) == 0:
+            return Literal(False, SymbolicDataType.Boolean)
+        if len(clauses) == 1:
+            return clauses[0]
+        return OrClause(clauses)
+
+    def visit_and_clause(self, and_clause: AndClause) -> Symbol:
+        """
+        A predicate that is false makes the and clause false; a predicate that
+        is true can be dropped
+        """
+        predicates = []
+        for predicate in and_clause.predicates:
+            predicate = self.rewrite(predicate)
+            if is_boolean_literal(predicate, False):
+                return predicate
+            if not is_boolean_literal(predicate, True):
+                predicates.append(predicate)
+        if len(predicates) == 0:
+            return Literal(True, SymbolicDataType.Boolean)
+        if len(predicates) == 1:
+            return predicates[0]
+        return AndClause(predicates)
+
+    def visit_comparison(self, comparison: Comparison) -> Symbol:
+        left_op = self.unwrap(self.rewrite(comparison.left_op))
+        right_op = self.unwrap(self.rewrite(comparison.right_op))
+        operator = comparison.operator
+        if isinstance(left_op, Literal) and isinstance(right_op, Literal):
+            return self.fold(Comparison(left_op, right_op, operator))
+
+        # normalize to <non-constant> op <constant>
+        if isinstance(left_op, Literal):
+            left_op, right_op = right_op, left_op
+            operator = MIRRORED_OPERATORS[operator]
+
+        # move an integer operand of the non-constant side to the constant side,
+        # e.g. x + 1 > 5 -> x > 4
+        # NOTE: this is only done for addition, and subtraction, over integers, where it's exact
+        while (
+            isinstance(right_op, Literal)
+            and right_op.type == SymbolicDataType.Integer
+            and isinstance(left_op, BinaryArithmeticOperation)
+            and left_op.operator in INVERSE_OPERATORS
+        ):
+            operand1 = self.unwrap(left_op.operand1)
+            operand2 = self.unwrap(left_op.operand2)
+            if (
+                isinstance(operand2, Literal)
+                and operand2.type == SymbolicDataType.Integer
+            ):
+                # x + c1 op c2 -> x op c2 - c1; x - c1 op c2 -> x op c2 + c1
+                constant = self.fold(
+                    BinaryArithmeticOperation(
+                        INVERSE_OPERATORS[left_op.operator], right_op, operand2
+                    )
+                )
+                left_op = operand1
+            elif (
+                isinstance(operand1, Literal)
+                and operand1.type == SymbolicDataType.Integer
+                and left_op.operator == ArithmeticOp.Addition
+            ):
+                # c1 + x op c2 -> x op c2 - c1
+                constant = self.fold(
+                    BinaryArithmeticOperation(
+                        ArithmeticOp.Subtraction, right_op, operand1
+                    )
+                )
+                left_op = operand2
+            else:
+                break
+            right_op = constant
+
+        return Comparison(left_op, right_op, operator)
+
+    def visit_binary_arithmetic_operation(
+        self, operation: BinaryArithmeticOperation
+    ) -> Symbol:
+        operand1 = self.unwrap(self.rewrite(operation.operand1))
+        operand2 = self.unwrap(self.rewrite(operation.operand2))
+        rewritten = BinaryArithmeticOperation(operation.operator, operand1, operand2)
+        if isinstance(operand1, Literal) and isinstance(operand2, Literal):
+            return self.fold(rewritten)
+        return rewritten
+
+    def visit_func_call(self, func_call: FuncCall) -> Symbol:
+        args = [self.rewrite(arg) for arg in func_call.args]
+        rewritten = FuncCall(func_call.name, args)
+        # only scalar functions can be folded; aggregates are evaluated over groups
+        if resolve_scalar_func_name(func_call.name).success and all(
+            isinstance(self.unwrap(arg), Literal) for arg in args
+        ):
+            return self.fold(rewritten)
+        return rewritten
+
+    def visit_column_name(self, column: ColumnName) -> Symbol:
+        return column
+
+    def visit_literal(self, literal: Literal) -> Symbol:
+        return literal
+
+    # section: helpers
+
+    @staticmethod
+    def unwrap(expr: Symbol) -> Symbol:
+        """
+        Unwrap any Exprs around `expr`, e.g. from parenthesization, so that
+        its kind, e.g. literal, can be recognized
+        """
+        while isinstance(expr, Expr):
+            expr = expr.expr
+        return expr
@@ -11,11 +11,11 @@ Functions declarations should apply to both, but only lang functions will have a
 Native functions will have a declaration.
 """
 
-from typing import List, Dict, Any, Callable, Type, TypeVar, Union
+from typing import List, Dict, Any, Callable, Optional, Tuple, Type, TypeVar, Union
 
 
 from .dataexchange import Response
-from .datatypes import DataType, Integer, Real
+from .datatypes import DataType, Integer, Real, Text
 
 
 T = TypeVar("T")
@@ -29,6 +29,41 @@ class InvalidFunctionArguments(Exception):
     """
 
 
+class Accumulator:
+    """
+    Computes an aggregate incrementally, i.e. one value at a time, over the values of a group:
+        state = init(), then state = step(state, value) for each value, then finalize(state)
+
+    States of disjoint subsets of a group's values can be combined with merge, e.g. the
+    partial states of a group, computed by separate workers.
+
+    NOTE: accumulators are stateless, i.e. the state is passed in, and returned, so that only
+    the (small) state needs to be kept for each group, and not the group's values.
+    """
+
+    def init(self) -> Any:
+        raise NotImplementedError
+
+    def step(self, state: Any, value: Any) -> Any:
+        raise NotImplementedError
+
+    def merge(self, state: Any, other_state: Any) -> Any:
+        raise NotImplementedError
+
+    def finalize(self, state: Any) -> Any:
+        raise NotImplementedError
+
+
+def accumulate(accumulator: Accumulator, values: List[Any]) -> Any:
+    """
+    Aggregate `values` with `accumulator`
+    """
+    state = accumulator.init()
+    for value in values:
+        state = accumulator.step(state, value)
+    return accumulator.finalize(state)
+
+
 class FunctionDefinition:
     """
     Represents a function definition, for both scalar and aggregate functions.
@@ -40,6 +75,9 @@ class FunctionDefinition:
     :param named_params:
     :param func_body: callable function body
     :param return_type: return type of function
+    :param accumulator: for an aggregate function, computes the aggregate incrementally
+    :param return_type_rule: if the return type depends on the arg types; maps the
+        pos arg types to the return type, or to None if the arg types are invalid
     :return:
 
     FUTURE_NOTE: Currently, pos_params are represented as a List[DataType].
@@ -57,12 +95,18 @@ class FunctionDefinition:
         named_params: Dict[str, Type[DataType]],
         func_body: Callable,
         return_type: Type[DataType],
+        accumulator: Optional[Accumulator] = None,
+        return_type_rule: Optional[
+            Callable[[List[Type[DataType]]], Optional[Type[DataType]]]
+        ] = None,
     ):
         self.name = func_name
         self.pos_params = pos_params
         self.named_params = named_params
         self.body = func_body
         self._return_type = return_type
+        self.accumulator = accumulator
+        self.return_type_rule = return_type_rule
 
     def __str__(self):
         return f"FunctionDefinition[{self.name}]"
@@ -74,6 +118,21 @@ class FunctionDefinition:
     def return_type(self) -> Type[DataType]:
         return self._return_type
 
+    def resolve_return_type(self, pos_arg_types: List[Type[DataType]]) -> Response:
+        """
+        Return the type of invoking the function with args of `pos_arg_types`
+        """
+        if self.return_type_rule is None:
+            return Response(True, body=self.return_type)
+        return_type = self.return_type_rule(pos_arg_types)
+        if return_type is None:
+            arg_typenames = ", ".join(arg_type.typename for arg_type in pos_arg_types)
+            return Response(
+                False,
+                error_message=f"Function [{self.name}] not defined for args of type [{arg_typenames}]",
+            )
+        return Response(True, body=return_type)
+
     @staticmethod
     def is_valid_term(param: Type[DataType], term) -> bool:
         """Check if term matches param"""
@@ -151,6 +210,54 @@ class FunctionDefinition:
 
         return Response(True)
 
+    def validate_arg_types(
+        self,
+        pos_arg_types: List[Type[DataType]],
+        named_arg_types: Dict[str, Type[DataType]],
+    ) -> Response:
+        """
+        Validate the types of pos and named args, e.g. as determined by semantic analysis.
+        Invocations with args of validated types, needn't validate each invocation's args,
+        i.e. can invoke `body` directly.
+        """
+        if len(pos_arg_types) != len(self.pos_params):
+            return Response(
+                False,
+                error_message=f"Arity mismatch between expected positional params [{len(self.pos_params)}] "
+                f"and received args [{len(pos_arg_types)}]",
+            )
+        for idx, arg_type in enumerate(pos_arg_types):
+            param = self.pos_params[idx]
+            if isinstance(param, list):
+                # the items of a collection arg can only be validated on invocation
+                return Response(
+                    False,
+                    error_message=f"Collection positional param at index {idx}",
+                )
+            if param != DataType and param != arg_type:
+                return Response(
+                    False,
+                    error_message=f"Invalid positional argument type [{arg_type.typename}] at index {idx}. "
+                    f"Expected argument of type [{param.typename}]",
+                )
+
+        if set(named_arg_types) != set(self.named_params):
+            return Response(
+                False,
+                error_message=f"Mismatch between expected named params [{list(self.named_params)}] "
+                f"and received args [{list(named_arg_types)}]",
+            )
+        for arg_name, arg_type in named_arg_types.items():
+            param = self.named_params[arg_name]
+            if param != DataType and param != arg_type:
+                return Response(
+                    False,
+                    error_message=f"Invalid named argument type [{arg_type.typename}] for param [{arg_name}]. "
+                    f"Expected argument of type [{param.typename}]",
+                )
+
+        return Response(True)
+
     def apply(self, pos_args: List[Any], named_args: Dict[str, Any]):
         """
         This models native functions, where each specific function
@@ -194,23 +301,173 @@ float_square_function = FunctionDefinition(
 # aggregate function definitions
 
 
-def value_count_function_body(values: List[Any]) -> int:
+class CountAccumulator(Accumulator):
     """
     Note: count(*) counts every row (not supported in learndb)
     count(column) should only count non-null columns
     """
-    count = 0
-    for value in values:
-        if value is not None:
-            count += 1
-    return count
+
+    def init(self) -> int:
+        return 0
+
+    def step(self, state: int, value: Any) -> int:
+        return state if value is None else state + 1
+
+    def merge(self, state: int, other_state: int) -> int:
+        return state + other_state
+
+    def finalize(self, state: int) -> int:
+        return state
+
+
+def value_count_function_body(values: List[Any]) -> int:
+    return accumulate(CountAccumulator(), values)
 
 
 # a type of datatype means, it can accept any type
 count_function = FunctionDefinition(
-    "count", [[DataType]], {}, value_count_function_body, Integer
+    "count",
+    [[DataType]],
+    {},
+    value_count_function_body,
+    Integer,
+    accumulator=CountAccumulator(),
 )
 
+
+class SumAccumulator(Accumulator):
+    """
+    Sum of non-null values; null if there are none
+    """
+
+    def init(self) -> Optional[Union[int, float]]:
+        return None
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return value if state is None else state + value
+
+    def merge(self, state, other_state):
+        if other_state is None:
+            return state
+        return other_state if state is None else state + other_state
+
+    def finalize(self, state):
+        return state
+
+
+class AvgAccumulator(Accumulator):
+    """
+    Mean of non-null values; null if there are none.
+    The state is the pair (sum, count)
+    """
+
+    def init(self) -> Tuple[Union[int, float], int]:
+        return 0, 0
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return state[0] + value, state[1] + 1
+
+    def merge(self, state, other_state):
+        return state[0] + other_state[0], state[1] + other_state[1]
+
+    def finalize(self, state) -> Optional[float]:
+        total, count = state
+        return None if count == 0 else total / count
+
+
+class MinAccumulator(Accumulator):
+    """
+    Least non-null value; null if there are none
+    """
+
+    def init(self) -> Any:
+        return None
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return value if state is None or value < state else state
+
+    def merge(self, state, other_state):
+        return self.step(state, other_state)
+
+    def finalize(self, state):
+        return state
+
+
+class MaxAccumulator(Accumulator):
+    """
+    Greatest non-null value; null if there are none
+    """
+
+    def init(self) -> Any:
+        return None
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        return value if state is None or value > state else state
+
+    def merge(self, state, other_state):
+        return self.step(state, other_state)
+
+    def finalize(self, state):
+        return state
+
+
+def numeric_type_rule(pos_arg_types: List[Type[DataType]]) -> Optional[Type[DataType]]:
+    """
+    Aggregate over a numeric column; the return type is the column's type
+    """
+    arg_type = pos_arg_types[0]
+    return arg_type if arg_type in (Integer, Real) else None
+
+
+def real_type_rule(pos_arg_types: List[Type[DataType]]) -> Optional[Type[DataType]]:
+    """
+    Aggregate over a numeric column, that returns a real
+    """
+    return Real if pos_arg_types[0] in (Integer, Real) else None
+
+
+def ordered_type_rule(pos_arg_types: List[Type[DataType]]) -> Optional[Type[DataType]]:
+    """
+    Aggregate over a column whose values are ordered; the return type is the column's type
+    """
+    arg_type = pos_arg_types[0]
+    return arg_type if arg_type in (Integer, Real, Text) else None
+
+
+def aggregate_function(
+    name: str,
+    accumulator: Accumulator,
+    return_type: Type[DataType],
+    return_type_rule: Callable[[List[Type[DataType]]], Optional[Type[DataType]]],
+) -> FunctionDefinition:
+    """
+    Define an aggregate function over a single column, computed by `accumulator`
+    """
+    return FunctionDefinition(
+        name,
+        [[DataType]],
+        {},
+        lambda values: accumulate(accumulator, values),
+        return_type,
+        accumulator=accumulator,
+        return_type_rule=return_type_rule,
+    )
+
+
+# NOTE: the declared return type is the type for an integer column
+sum_function = aggregate_function("sum", SumAccumulator(), Integer, numeric_type_rule)
+avg_function = aggregate_function("avg", AvgAccumulator(), Real, real_type_rule)
+min_function = aggregate_function("min", MinAccumulator(), Integer, ordered_type_rule)
+max_function = aggregate_function("max", MaxAccumulator(), Integer, ordered_type_rule)
+
 # if we have same function for integers and floats, we'll name the int function
 # with not qualifiers, and name the float function with _float qualifier
 _SCALAR_FUNCTION_REGISTRY = {
@@ -218,7 +475,13 @@ _SCALAR_FUNCTION_REGISTRY = {
     "square_float": float_square_function,
 }
 
-_AGGREGATE_FUNCTION_REGISTRY = {"count": count_function}
+_AGGREGATE_FUNCTION_REGISTRY = {
+    "count": count_function,
+    "sum": sum_function,
+    "avg": avg_function,
+    "min": min_function,
+    "max": max_function,
+}
 
 
 # public functions
@@ -6,7 +6,7 @@ GRAMMAR = """
 
         ?terminated      : stmnt ";"
         ?stmnt           : select_stmnt | drop_stmnt | delete_stmnt | update_stmnt | truncate_stmnt | insert_stmnt
-                         | create_stmnt
+                         | create_stmnt | analyze_stmnt | explain_stmnt
 
         // we only want logically valid statements; and from is required for all other clauses
         // and so other clauses (e.g. where) are nested under from clause
@@ -103,6 +103,13 @@ GRAMMAR = """
 
         truncate_stmnt   : "truncate"i table_name
 
+        // collect statistics of one, or all tables
+        analyze_stmnt    : "analyze"i table_name?
+
+        // show how a select is evaluated; with analyze, the select is executed, and actuals are reported
+        explain_stmnt    : "explain"i explain_analyze? select_stmnt
+        explain_analyze  : "analyze"i
+
         // datatype values
         TRUE             : "true"i
         FALSE            : "false"i
@@ -12,7 +12,6 @@ from typing import Any, List, Union, Optional, Type, Tuple
 
 from .visitor import Visitor
 
-
 # constants
 
 WHITESPACE = " "
@@ -143,6 +142,19 @@ class DropStmnt(Symbol):
     table_name: TableName
 
 
+@dataclass
+class AnalyzeStmnt(Symbol):
+    # if not set, all tables are analyzed
+    table_name: Optional[TableName] = None
+
+
+@dataclass
+class ExplainStmnt(Symbol):
+    select_stmnt: SelectStmnt
+    # whether to execute the statement, and report actual row counts, and timings
+    analyze: bool = False
+
+
 # create statement helpers
 
 
@@ -350,6 +362,19 @@ class DeleteStmnt(Symbol):
     where_condition: Any = None
 
 
+@dataclass
+class UpdateStmnt(Symbol):
+    table_name: Any
+    column_name: ColumnName
+    value: Literal
+    where_condition: Any = None
+
+
+@dataclass
+class TruncateStmnt(Symbol):
+    table_name: TableName
+
+
 @dataclass
 class Program(Symbol):
     statements: list
@@ -440,6 +465,20 @@ class ToAst(Transformer):
     def drop_stmnt(args) -> DropStmnt:
         return DropStmnt(args[0])
 
+    @staticmethod
+    def analyze_stmnt(args) -> AnalyzeStmnt:
+        return AnalyzeStmnt(*args)
+
+    @staticmethod
+    def explain_stmnt(args) -> ExplainStmnt:
+        if len(args) == 2:
+            return ExplainStmnt(args[1], analyze=True)
+        return ExplainStmnt(args[0])
+
+    @staticmethod
+    def explain_analyze(_) -> bool:
+        return True
+
     @staticmethod
     def select_stmnt(args) -> SelectStmnt:
         """select_clause from_clause? group_by_clause? having_clause? order_by_clause? limit_clause?"""
@@ -456,6 +495,14 @@ class ToAst(Transformer):
     def delete_stmnt(args) -> DeleteStmnt:
         return DeleteStmnt(*args)
 
+    @staticmethod
+    def update_stmnt(args) -> UpdateStmnt:
+        return UpdateStmnt(*args)
+
+    @staticmethod
+    def truncate_stmnt(args) -> TruncateStmnt:
+        return TruncateStmnt(args[0])
+
     # select stmnt components
 
     @staticmethod
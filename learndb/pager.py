@@ -78,6 +78,9 @@ class Pager:
         self.has_free_page_list = False
         # head node page num
         self.free_page_list_head = NULLPTR
+        # version of the file, as read from its header; the header is written with
+        # the current version when the pager is closed
+        self.file_version = FILE_HEADER_VERSION_VALUE
         self.init()
 
     @classmethod
@@ -230,8 +233,13 @@ class Pager:
             self.flush_page(free_page_num)
             head = free_page_num
 
-        # 3. update header with free list head
-        self.set_free_page_head(self.header, head)
+        # 3. update header with free list head (or clear it, if there are no free pages),
+        # and current version
+        if head_is_defined:
+            self.set_free_page_head(self.header, head)
+        else:
+            self.set_free_page_head_null(self.header)
+        self.set_file_version(self.header)
         # flush updated header
         self.flush_header()
 
@@ -317,12 +325,8 @@ class Pager:
         :return:
         """
         header = bytearray(FILE_HEADER_SIZE)
-        assert FILE_HEADER_VERSION_FIELD_SIZE >= len(FILE_HEADER_VERSION_VALUE)
         # set version field
-        header[
-            FILE_HEADER_VERSION_FIELD_OFFSET : FILE_HEADER_VERSION_FIELD_OFFSET
-            + FILE_HEADER_VERSION_FIELD_SIZE
-        ] = FILE_HEADER_VERSION_VALUE
+        self.set_file_version(header)
 
         # initialize free page head to null
         # NOTE: these are strictly not needed, since a new page would be all zeroes,
@@ -356,6 +360,13 @@ class Pager:
         # read header
         self.fileptr.seek(0)
         self.header = bytearray(self.fileptr.read(FILE_HEADER_SIZE))
+        # version string is padded with null bytes
+        self.file_version = bytes(
+            self.header[
+                FILE_HEADER_VERSION_FIELD_OFFSET : FILE_HEADER_VERSION_FIELD_OFFSET
+                + FILE_HEADER_VERSION_FIELD_SIZE
+            ]
+        ).rstrip(b"\x00")
         # free page list is set
         has_free_page_list_bytes = self.header[
             FILE_HEADER_HAS_FREE_PAGE_LIST_OFFSET : FILE_HEADER_HAS_FREE_PAGE_LIST_OFFSET
@@ -445,6 +456,34 @@ class Pager:
             + FILE_HEADER_NEXT_FREE_PAGE_HEAD_SIZE
         ] = value
 
+    @staticmethod
+    def set_free_page_head_null(header: bytearray):
+        """
+        set header to have no free page list
+        """
+        value = False.to_bytes(FILE_HEADER_HAS_FREE_PAGE_LIST_SIZE, sys.byteorder)
+        header[
+            FILE_HEADER_HAS_FREE_PAGE_LIST_OFFSET : FILE_HEADER_HAS_FREE_PAGE_LIST_OFFSET
+            + FILE_HEADER_HAS_FREE_PAGE_LIST_SIZE
+        ] = value
+        value = NULLPTR.to_bytes(FILE_HEADER_NEXT_FREE_PAGE_HEAD_SIZE, sys.byteorder)
+        header[
+            FILE_HEADER_NEXT_FREE_PAGE_HEAD_OFFSET : FILE_HEADER_NEXT_FREE_PAGE_HEAD_OFFSET
+            + FILE_HEADER_NEXT_FREE_PAGE_HEAD_SIZE
+        ] = value
+
+    @staticmethod
+    def set_file_version(header: bytearray):
+        """
+        set version field to the current version
+        """
+        assert FILE_HEADER_VERSION_FIELD_SIZE >= len(FILE_HEADER_VERSION_VALUE)
+        value = FILE_HEADER_VERSION_VALUE.ljust(FILE_HEADER_VERSION_FIELD_SIZE, b"\x00")
+        header[
+            FILE_HEADER_VERSION_FIELD_OFFSET : FILE_HEADER_VERSION_FIELD_OFFSET
+            + FILE_HEADER_VERSION_FIELD_SIZE
+        ] = value
+
     def flush_header(self):
         """
         Flush file header
@@ -0,0 +1,487 @@
+"""
+Utilities to analyze the structure of conditions (i.e. where clause, and join conditions),
+so the VM can choose how to evaluate a query, e.g. which join algorithm to use; and
+a cost-based planner that orders a chain of inner joins.
+
+NOTE: these only inspect (and never evaluate) symbols; evaluation is done by the VM.
+"""
+
+import math
+from copy import deepcopy
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from itertools import combinations
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .datatypes import Integer, Real
+from .lang_parser.symbols import (
+    Symbol,
+    Expr,
+    OrClause,
+    AndClause,
+    Comparison,
+    ComparisonOp,
+    ColumnName,
+    Joining,
+    JoinType,
+    Literal,
+    SingleSource,
+)
+from .schema import ScopedSchema, SimpleSchema
+from .statistics import DEFAULT_SELECTIVITY, TableStatistics
+
+# the number of relations, up to which all join orders are considered
+MAX_JOIN_ORDER_RELATIONS = 8
+
+
+@dataclass
+class EquiJoinKeys:
+    """
+    Slots of the columns equated by the equality conjuncts of a join condition.
+    `left_slots` index the left record's values, and `right_slots` the right
+    record's values; the i-th left slot is equated to the i-th right slot.
+    """
+
+    left_slots: Tuple[int, ...]
+    right_slots: Tuple[int, ...]
+
+
+def split_conjuncts(condition: Symbol) -> List[Symbol]:
+    """
+    Split `condition` into a list of conjuncts, i.e. conditions that
+    must all be true for `condition` to be true
+    """
+    if isinstance(condition, Expr):
+        return split_conjuncts(condition.expr)
+    if isinstance(condition, OrClause) and len(condition.and_clauses) == 1:
+        return split_conjuncts(condition.and_clauses[0])
+    if isinstance(condition, AndClause):
+        conjuncts = []
+        for predicate in condition.predicates:
+            conjuncts.extend(split_conjuncts(predicate))
+        return conjuncts
+    return [condition]
+
+
+def conjoin(conjuncts: List[Symbol]) -> Optional[Symbol]:
+    """
+    Inverse of split_conjuncts; return None if there are no conjuncts
+    """
+    if len(conjuncts) == 0:
+        return None
+    if len(conjuncts) == 1:
+        return conjuncts[0]
+    return AndClause(list(conjuncts))
+
+
+def find_equi_join_keys(
+    conjuncts: List[Symbol], schema: ScopedSchema, left_width: int
+) -> Tuple[Optional[EquiJoinKeys], List[Symbol]]:
+    """
+    Find equality conjuncts between a column of the left input, and a column
+    of the right input, of a join. `schema` is the schema of the joined record,
+    where the first `left_width` slots correspond to the left input.
+
+    Returns the equi-join keys (None, if there are none) and the remaining, i.e. residual,
+    conjuncts.
+
+    NOTE: Real columns are never used as keys, since reals are compared with a tolerance,
+    which a hash or merge can't emulate.
+    """
+    left_slots = []
+    right_slots = []
+    residual = []
+    for conjunct in conjuncts:
+        slots = equated_column_slots(conjunct, schema)
+        if slots is not None:
+            first, second = slots
+            if first < left_width <= second:
+                left_slots.append(first)
+                right_slots.append(second - left_width)
+                continue
+            if second < left_width <= first:
+                left_slots.append(second)
+                right_slots.append(first - left_width)
+                continue
+        residual.append(conjunct)
+
+    if not left_slots:
+        return None, residual
+    return EquiJoinKeys(tuple(left_slots), tuple(right_slots)), residual
+
+
+def equated_column_slots(
+    conjunct: Symbol, schema: ScopedSchema
+) -> Optional[Tuple[int, int]]:
+    """
+    If `conjunct` is like <column> = <column>, where both columns are
+    resolvable in `schema` and not reals, return the slots of the columns
+    """
+    if not isinstance(conjunct, Comparison) or conjunct.operator != ComparisonOp.Equal:
+        return None
+    if not isinstance(conjunct.left_op, ColumnName) or not isinstance(
+        conjunct.right_op, ColumnName
+    ):
+        return None
+    first = schema.get_slot(conjunct.left_op.name)
+    second = schema.get_slot(conjunct.right_op.name)
+    if first is None or second is None:
+        return None
+    if (
+        schema.slot_columns[first].datatype == Real
+        or schema.slot_columns[second].datatype == Real
+    ):
+        return None
+    return first, second
+
+
+def other_key_pairs(keys: EquiJoinKeys, key_index: int) -> List[Tuple[int, int]]:
+    """
+    Return the (left slot, right slot) pairs of `keys`, except the one at `key_index`
+    """
+    return [
+        key_pair
+        for index, key_pair in enumerate(zip(keys.left_slots, keys.right_slots))
+        if index != key_index
+    ]
+
+
+def keys_are_comparable(
+    keys: EquiJoinKeys, schema: ScopedSchema, left_width: int
+) -> bool:
+    """
+    Whether the left and right values of each key pair are orderable w.r.t. each
+    other, i.e. the columns have the same datatype; required to merge join on `keys`.
+    """
+    return all(
+        schema.slot_columns[left_slot].datatype
+        == schema.slot_columns[left_width + right_slot].datatype
+        for left_slot, right_slot in zip(keys.left_slots, keys.right_slots)
+    )
+
+
+def primary_key_slot(schema: SimpleSchema) -> int:
+    """
+    Return the slot of the primary key column, i.e. its position in the schema's columns
+    """
+    return [column.is_primary_key for column in schema.columns].index(True)
+
+
+def flatten_joining(source: Joining) -> Tuple[List[SingleSource], List[Joining]]:
+    """
+    The parser places the first source in a series of joins in the most nested join.
+    Return the sources in the order they're joined, and the joins; the i-th join
+    joins the first i + 1 sources with the (i + 1)-th source.
+    """
+    sources = []
+    joins = []
+    ptr = source
+    while isinstance(ptr, Joining):
+        joins.append(ptr)
+        sources.append(ptr.right_source)
+        ptr = ptr.left_source
+    sources.append(ptr)
+    sources.reverse()
+    joins.reverse()
+    return sources, joins
+
+
+def null_supplied_sources(joins: List[Joining]) -> Set[int]:
+    """
+    Return the positions of the sources (ordered like flatten_joining) whose columns
+    may be null-extended by an outer join. A condition on such a source can't be
+    evaluated before the join, since it would be evaluated before the null-extension.
+    """
+    positions = set()
+    for index, join in enumerate(joins):
+        if join.join_type in (JoinType.RightOuter, JoinType.FullOuter):
+            positions.update(range(index + 1))
+        if join.join_type in (JoinType.LeftOuter, JoinType.FullOuter):
+            positions.add(index + 1)
+    return positions
+
+
+def referenced_columns(conjunct: Symbol) -> List[ColumnName]:
+    """
+    Return the columns referenced in `conjunct`
+    """
+    if isinstance(conjunct, ColumnName):
+        return [conjunct]
+    return conjunct.find_descendents(ColumnName)
+
+
+def unqualify(conjunct: Symbol) -> Symbol:
+    """
+    Return a copy of `conjunct`, where column names are stripped of their table alias,
+    so it can be evaluated on a (simple) record of that table
+    """
+    conjunct = deepcopy(conjunct)
+    for column in referenced_columns(conjunct):
+        column.name = column.get_base_name()
+    return conjunct
+
+
+# section: cost-based join ordering
+
+
+class JoinAlgorithm(Enum):
+    Merge = auto()
+    IndexNestedLoop = auto()
+    Hash = auto()
+    NestedLoop = auto()
+
+
+@dataclass
+class Relation:
+    """
+    A source in a chain of inner joins, with the estimates needed to plan the join order
+    """
+
+    # the alias, or the table name
+    name: str
+    source: SingleSource
+    schema: SimpleSchema
+    statistics: TableStatistics
+    # estimated number of records, after conditions pushed into the scan
+    cardinality: float
+
+    @property
+    def primary_key(self) -> str:
+        return self.schema.get_primary_key_column().lower()
+
+    def distinct_count(self, column_name: str) -> float:
+        return min(
+            self.statistics.distinct_count(column_name), max(self.cardinality, 1)
+        )
+
+
+@dataclass
+class JoinStep:
+    """
+    Join the records joined so far, with `relation`, on `conjuncts`, using `algorithm`
+    """
+
+    relation: Relation
+    conjuncts: List[Symbol]
+    algorithm: JoinAlgorithm
+
+
+@dataclass
+class JoinPlan:
+    """
+    A left-deep join order; the `first` relation is joined with each step's relation in turn
+    """
+
+    first: Relation
+    steps: List[JoinStep] = field(default_factory=list)
+    # estimated cost, i.e. records read and generated, and number of joined records
+    cost: float = 0
+    cardinality: float = 0
+    # whether records are ordered on the first relation's primary key
+    ordered: bool = True
+    # positions of the conjuncts evaluated by steps
+    attached: FrozenSet[int] = frozenset()
+
+    @property
+    def relation_names(self) -> List[str]:
+        return [self.first.name] + [step.relation.name for step in self.steps]
+
+
+@dataclass
+class ConjunctInfo:
+    conjunct: Symbol
+    # names of relations referenced
+    names: FrozenSet[str]
+    # for a conjunct like a.x = b.y, over non-real columns, ((a, x), (b, y))
+    equated: Optional[Tuple[Tuple[str, str], Tuple[str, str]]]
+
+
+# the operator that results from swapping the operands of a comparison
+MIRRORED_OPERATORS = {
+    ComparisonOp.Less: ComparisonOp.Greater,
+    ComparisonOp.LessEqual: ComparisonOp.GreaterEqual,
+    ComparisonOp.Greater: ComparisonOp.Less,
+    ComparisonOp.GreaterEqual: ComparisonOp.LessEqual,
+    ComparisonOp.Equal: ComparisonOp.Equal,
+    ComparisonOp.NotEqual: ComparisonOp.NotEqual,
+}
+
+
+def estimate_selectivity(conjuncts: List[Symbol], statistics: TableStatistics) -> float:
+    """
+    Estimate the fraction of a table's records that satisfy all (unqualified) `conjuncts`.
+    Conjuncts are assumed to be independent; only conjuncts like <column> <op> <literal>
+    are estimated from the statistics.
+    """
+    selectivity = 1.0
+    for conjunct in conjuncts:
+        if isinstance(conjunct, Comparison):
+            if isinstance(conjunct.left_op, ColumnName) and isinstance(
+                conjunct.right_op, Literal
+            ):
+                selectivity *= statistics.selectivity(
+                    conjunct.left_op.name, conjunct.operator, conjunct.right_op.value
+                )
+                continue
+            if isinstance(conjunct.left_op, Literal) and isinstance(
+                conjunct.right_op, ColumnName
+            ):
+                selectivity *= statistics.selectivity(
+                    conjunct.right_op.name,
+                    MIRRORED_OPERATORS[conjunct.operator],
+                    conjunct.left_op.value,
+                )
+                continue
+        selectivity *= DEFAULT_SELECTIVITY
+    return selectivity
+
+
+def analyze_conjunct(conjunct: Symbol, relations: Dict[str, Relation]) -> ConjunctInfo:
+    """
+    Determine the relations referenced by a (qualified) conjunct of a join condition
+    """
+    names = frozenset(
+        column.get_parent_alias() for column in referenced_columns(conjunct)
+    )
+    equated = None
+    if (
+        isinstance(conjunct, Comparison)
+        and conjunct.operator == ComparisonOp.Equal
+        and isinstance(conjunct.left_op, ColumnName)
+        and isinstance(conjunct.right_op, ColumnName)
+    ):
+        sides = []
+        for column in (conjunct.left_op, conjunct.right_op):
+            relation = relations[column.get_parent_alias()]
+            definition = relation.schema.get_column_by_name(column.get_base_name())
+            if definition is not None and definition.datatype != Real:
+                sides.append((relation.name, column.get_base_name().lower()))
+        if len(sides) == 2 and sides[0][0] != sides[1][0]:
+            equated = (sides[0], sides[1])
+    return ConjunctInfo(conjunct, names, equated)
+
+
+def plan_join_order(
+    relations: List[Relation], conjuncts: List[Symbol]
+) -> Optional[JoinPlan]:
+    """
+    Find the cheapest left-deep order, and the algorithm of each join, to evaluate the inner
+    joins of `relations` on `conjuncts` (qualified with relation names). Every order is
+    considered (via dynamic programming over subsets of relations); thus, this returns
+    None if there are more than MAX_JOIN_ORDER_RELATIONS relations.
+
+    The cost of a plan is the sum of the estimated records read by each join, and
+    the estimated records it generates, i.e. the plan with the smallest intermediate results
+    is preferred. A conjunct is evaluated by the first join where all its relations are joined.
+    """
+    if len(relations) > MAX_JOIN_ORDER_RELATIONS:
+        return None
+    by_name = {relation.name: relation for relation in relations}
+    infos = [analyze_conjunct(conjunct, by_name) for conjunct in conjuncts]
+
+    best = {}
+    for index, relation in enumerate(relations):
+        # the first relation is scanned, in primary key order
+        best[frozenset([index])] = JoinPlan(
+            first=relation,
+            cost=relation.statistics.row_count,
+            cardinality=relation.cardinality,
+        )
+
+    for size in range(2, len(relations) + 1):
+        for subset in combinations(range(len(relations)), size):
+            subset = frozenset(subset)
+            for index in sorted(subset):
+                prev = best[subset - {index}]
+                candidate = extend_join_plan(prev, relations[index], infos, by_name)
+                if subset not in best or candidate.cost < best[subset].cost:
+                    best[subset] = candidate
+
+    return best[frozenset(range(len(relations)))]
+
+
+def extend_join_plan(
+    plan: JoinPlan,
+    relation: Relation,
+    infos: List[ConjunctInfo],
+    relations: Dict[str, Relation],
+) -> JoinPlan:
+    """
+    Return a plan that joins the records of `plan` with `relation`, using the cheapest
+    algorithm that applies
+    """
+    joined = set(plan.relation_names)
+    names = joined | {relation.name}
+    attached = [
+        position
+        for position, info in enumerate(infos)
+        if position not in plan.attached and info.names <= names
+    ]
+
+    selectivity = 1.0
+    # equated (left relation name, left column, right column)
+    key_pairs = []
+    for position in attached:
+        info = infos[position]
+        if info.equated is None:
+            selectivity *= DEFAULT_SELECTIVITY
+            continue
+        (first_name, first_column), (second_name, second_column) = info.equated
+        selectivity /= max(
+            relations[first_name].distinct_count(first_column),
+            relations[second_name].distinct_count(second_column),
+        )
+        if second_name == relation.name and first_name in joined:
+            key_pairs.append((first_name, first_column, second_column))
+        elif first_name == relation.name and second_name in joined:
+            key_pairs.append((second_name, second_column, first_column))
+
+    left_cardinality = plan.cardinality
+    right_rows = relation.statistics.row_count
+    # cost of each applicable algorithm; these mirror the rules the VM uses to
+    # determine whether an algorithm applies
+    costs = {}
+    if key_pairs:
+        right_pkey = relation.primary_key
+        if (
+            plan.ordered
+            and (plan.first.name, plan.first.primary_key, right_pkey) in key_pairs
+        ):
+            # both inputs are scanned once, in order
+            costs[JoinAlgorithm.Merge] = left_cardinality + right_rows
+        for left_name, left_column, right_column in key_pairs:
+            left_definition = relations[left_name].schema.get_column_by_name(
+                left_column
+            )
+            if right_column == right_pkey and left_definition.datatype == Integer:
+                # a tree lookup per left record
+                costs[JoinAlgorithm.IndexNestedLoop] = left_cardinality * (
+                    1 + math.log2(right_rows + 1)
+                )
+                break
+        # the right is scanned, and the smaller input is hashed
+        costs[JoinAlgorithm.Hash] = (
+            left_cardinality + right_rows + min(left_cardinality, relation.cardinality)
+        )
+    else:
+        # every pair of records is considered
+        costs[JoinAlgorithm.NestedLoop] = (
+            left_cardinality * relation.cardinality + right_rows
+        )
+    # on ties, prefer algorithms in declaration order
+    algorithm = min(costs, key=lambda algo: (costs[algo], algo.value))
+
+    cardinality = left_cardinality * relation.cardinality * selectivity
+    return JoinPlan(
+        first=plan.first,
+        steps=plan.steps
+        + [
+            JoinStep(
+                relation, [infos[position].conjunct for position in attached], algorithm
+            )
+        ],
+        cost=plan.cost + costs[algorithm] + cardinality,
+        cardinality=cardinality,
+        ordered=plan.ordered and algorithm != JoinAlgorithm.Hash,
+        attached=plan.attached | frozenset(attached),
+    )
@@ -5,7 +5,7 @@ Contains definitions and utilities to create and modifies Records.
 Records are data containing objects that conform to a schema.
 # TODO: should this module be called `record.py`
 """
-from typing import Any, List, Optional, Union, Tuple
+from typing import Any, Dict, List, Optional, Union, Tuple
 
 from .dataexchange import Response
 from .lang_parser.symbols import ColumnName, ColumnNameList, ValueList, Literal
@@ -24,6 +24,14 @@ class UnaggregatedGetOnUngroupedColumn(Exception):
     pass
 
 
+# identifies an aggregate over a group, i.e. (function name, column name)
+AggregateKey = Tuple[str, str]
+
+
+def aggregate_key(func_name: str, column_name: str) -> AggregateKey:
+    return func_name.lower(), column_name.lower()
+
+
 class AbstractRecord:
     """
     Interface for Record.
@@ -78,6 +86,12 @@ class SimpleRecord(AbstractRecord):
         """
         return self.values[column.lower()]
 
+    def to_tuple(self) -> Tuple:
+        """
+        Return values ordered by schema columns
+        """
+        return tuple(self.values[column.name] for column in self.schema.columns)
+
     def at_index(self, pos: int):
         """
         return
@@ -108,91 +122,42 @@ class ScopedRecord(AbstractRecord):
     """
     Represents scoped collection of record.
     These could be use generated from a single record, or a joining of multiple records.
+
+    Values are stored flat, i.e. as a single tuple, ordered according to the schema's
+    slots. Thus joining records is a tuple concatenation, and a lookup is a dict
+    lookup (qualified name -> slot) followed by a tuple index.
     """
 
-    # TODO: this should handle init records as two simple records, or a simple and JoinedRecord
-    # for a joinedRecord, it should determine be able to flatten and store it
-    # think through how this will generalize
-    def __init__(self, name_to_records: dict, schema: ScopedSchema):
-        self.names = name_to_records
+    def __init__(self, values: Tuple, schema: ScopedSchema):
+        self.values = values
         self.schema = schema
 
     @classmethod
     def from_records(
         cls,
         left_rec: Union[SimpleRecord, ScopedRecord],
-        right_rec: SimpleRecord,
+        right_rec: Union[SimpleRecord, ScopedRecord],
         left_alias: Optional[str],
         right_alias: str,
         schema: ScopedSchema,
     ):
-        if isinstance(left_rec, SimpleRecord):
-            assert left_alias is not None
-            return cls.from_simple_records(
-                left_rec, right_rec, left_alias, right_alias, schema
-            )
-        else:
-            # this mimics arguments to invoking method in vm
-            assert isinstance(left_rec, ScopedRecord)
-            # assert that the left alias is defined
-            assert left_alias in left_rec.names
-            return cls.from_joined_and_simple_record(
-                left_rec, right_rec, right_alias, schema
-            )
-
-    @classmethod
-    def from_simple_records(
-        cls,
-        left_rec: SimpleRecord,
-        right_rec: SimpleRecord,
-        left_alias,
-        right_alias,
-        schema: ScopedSchema,
-    ):
-        """
-        Construct a JoinedRecord for 2 simple records
-        """
-        names = {left_alias: left_rec, right_alias: right_rec}
-        return cls(names, schema)
+        return cls(left_rec.to_tuple() + right_rec.to_tuple(), schema)
 
     @classmethod
     def from_single_simple_record(cls, record, alias, schema: ScopedSchema):
-        return cls({alias: record}, schema)
+        return cls(record.to_tuple(), schema)
 
-    @classmethod
-    def from_joined_and_simple_record(
-        cls,
-        joined_rec: ScopedRecord,
-        right_rec: SimpleRecord,
-        right_alias,
-        schema: ScopedSchema,
-    ):
-        names = joined_rec.names.copy()
-        # make a shallow copy - don't need to copy records, since those are read-only
-        assert (
-            right_alias not in names
-        ), f"Create failed: {right_alias} already exists in [{names.keys()}]"
-        names[right_alias] = right_rec
-        return cls(names, schema)
+    def to_tuple(self) -> Tuple:
+        return self.values
 
     def get(self, fqname):
         """
         Given a fq column name, e.g. f.cola
         """
-        parts = fqname.split(".")
-        if len(parts) != 2:
-            raise InvalidNameException(
-                f"Expected 2 part name formatted like <table-alias>.<column-name>; received {fqname}"
-            )
-        table, column = parts
-        if table not in self.names:
-            raise ValueError(f"Uknown table alias [{table}]")
-        record = self.names[table]
-        if isinstance(record, SimpleRecord):
-            return record.get(column)
-        else:
-            assert isinstance(record, ScopedRecord)
-            return record.get(fqname)
+        slot = self.schema.slots.get(fqname)
+        if slot is None:
+            slot = resolve_slot(self.schema, fqname)
+        return self.values[slot]
 
     def has_columns(self, *args):
         """
@@ -200,32 +165,79 @@ class ScopedRecord(AbstractRecord):
         """
 
     def __repr__(self):
-        return f"JRec[{self.names}]"
+        return f"JRec[{self.values}]"
 
     def __str__(self):
-        return f"JRecord[{self.names}]"
+        return f"JRecord[{self.values}]"
+
+
+class JoinedRecordView(AbstractRecord):
+    """
+    A read-only view over a pair of left and right value tuples, that
+    resolves names like a ScopedRecord with the concatenated values.
+
+    This is used to evaluate a join condition over a candidate pair of
+    records, without constructing a joined record for pairs that don't match.
+    The view is reused, i.e. `left` and `right` are reset for each candidate pair.
+    """
+
+    def __init__(self, schema: ScopedSchema, left_width: int):
+        self.schema = schema
+        # number of slots in left values
+        self.left_width = left_width
+        self.left = None
+        self.right = None
+
+    def get(self, fqname):
+        slot = self.schema.slots.get(fqname)
+        if slot is None:
+            slot = resolve_slot(self.schema, fqname)
+        if slot < self.left_width:
+            return self.left[slot]
+        return self.right[slot - self.left_width]
+
+    def to_tuple(self) -> Tuple:
+        return self.left + self.right
+
+
+def resolve_slot(schema: ScopedSchema, fqname: str) -> int:
+    """
+    Resolve slot for `fqname`, or raise an exception describing why `fqname` is invalid.
+    """
+    parts = fqname.split(".")
+    if len(parts) != 2:
+        raise InvalidNameException(
+            f"Expected 2 part name formatted like <table-alias>.<column-name>; received {fqname}"
+        )
+    table, column = parts
+    if table not in schema.schemas:
+        raise ValueError(f"Uknown table alias [{table}]")
+    slot = schema.get_slot(fqname)
+    if slot is None:
+        raise KeyError(column.lower())
+    return slot
 
 
 class GroupedRecord(AbstractRecord):
     """
     Provides encapsulation over a record group.
 
-    NOTE: Other Record types, contain concrete values; however, this
-    potentially contains a recordset, corresponding to a group, which
-    would need to be evaluated by a function to give a value. This is named with `Record`
-    suffix since it implements the Record interface.
+    NOTE: Other Record types, contain concrete values; however, a group's non-grouping
+    columns only have values when aggregated by a function. Hence, this contains
+    the values of the aggregates, i.e. (function, column) pairs, computed over the group.
+    This is named with `Record` suffix since it implements the Record interface.
     """
 
     def __init__(
         self,
         schema: GroupedSchema,
         group_key: Tuple,
-        group_recordset: List[Union[SimpleRecord, ScopedRecord]],
+        aggregate_values: Dict[AggregateKey, Any],
     ):
         # NOTE: this schema corresponds to the schema for the whole group
         self.schema = schema
         self.group_key = group_key
-        self.group_recordset = group_recordset
+        self.aggregate_values = aggregate_values
 
     def has_columns(self, column: str) -> bool:
         # TODO: nuke; unused
@@ -248,46 +260,19 @@ class GroupedRecord(AbstractRecord):
 
         return None
 
-    def recordset_to_values(self, column_name: str) -> List[Any]:
-        """
-        Generate list of column values from group_recordset.
-        """
-        return [record.get(column_name) for record in self.group_recordset]
-
-    def get_group_recordset(self) -> List[Union[SimpleRecord, ScopedRecord]]:
+    def get_aggregate_value(self, func_name: str, column_name: str) -> Any:
         """
-        Iterator over contained records
+        Return value of aggregate function `func_name` over `column_name` of the group
         """
-        return self.group_recordset
-
-
-def join_records(
-    left_record: Union[SimpleRecord, ScopedRecord],
-    right_record: Union[SimpleRecord, ScopedRecord],
-    left_alias: Optional[str],
-    right_alias: Optional[str],
-):
-    """
-    TODO: remove if unused
-    join records and return a multi-record
-    left_, right_empty are used to handle left, right outer joined records
-    :return:
-    """
-
-    joined = ScopedRecord()
-    if isinstance(left_record, SimpleRecord):
-        joined.add_record(left_alias, left_record)
-    else:
-        assert isinstance(left_record, ScopedRecord)
-        joined.add_multi_record(left_record)
-
-    if isinstance(right_record, SimpleRecord):
-        joined.add_record(right_alias, right_record)
-    else:
-        assert isinstance(right_record, ScopedRecord)
-        joined.add_multi_record(right_record)
+        key = aggregate_key(func_name, column_name)
+        if key not in self.aggregate_values:
+            raise InvalidNameException(
+                f"Aggregate [{func_name}({column_name})] was not computed over group"
+            )
+        return self.aggregate_values[key]
 
-    return joined
+    def get_aggregate_values(self) -> Dict[AggregateKey, Any]:
+        return self.aggregate_values
 
 
 def create_null_record(schema: SimpleSchema) -> SimpleRecord:
@@ -412,6 +397,8 @@ def create_catalog_record(
     root_page_num: int,
     sql_text: str,
     catalog_schema: SimpleSchema,
+    row_count: int = 0,
+    bloom_filter_page_num: Optional[int] = None,
 ):
     """
     Create a catalog record.
@@ -422,6 +409,8 @@ def create_catalog_record(
     :param root_page_num:
     :param sql_text:
     :param catalog_schema:
+    :param row_count:
+    :param bloom_filter_page_num:
     :return:
     """
 
@@ -432,8 +421,19 @@ def create_catalog_record(
                 ColumnName("name"),
                 ColumnName("root_pagenum"),
                 ColumnName("sql_text"),
+                ColumnName("row_count"),
+                ColumnName("bloom_filter_pagenum"),
+            ]
+        ),
+        ValueList(
+            [
+                pkey,
+                table_name,
+                root_page_num,
+                sql_text,
+                row_count,
+                bloom_filter_page_num,
             ]
         ),
-        ValueList([pkey, table_name, root_page_num, sql_text]),
         catalog_schema,
     )
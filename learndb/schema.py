@@ -15,6 +15,7 @@ from copy import copy
 from typing import List, Optional, Union
 
 from .datatypes import DataType, Integer, Text, Blob, Real
+from .constants import STATS_CATALOG
 from .dataexchange import Response
 from .lang_parser.symbols import TableName, SymbolicDataType, ColumnName
 
@@ -121,11 +122,32 @@ class SimpleSchema(AbstractSchema):
 
 class ScopedSchema(AbstractSchema):
     """
-    Represents a scoped (by table_alias) collection of schema
+    Represents a scoped (by table_alias) collection of schema.
+
+    Records conforming to a scoped schema are stored flat, i.e. as a single tuple
+    of values across all scoped schemas (in alias, then column definition order).
+    `slots` maps a qualified name, i.e. <table-alias>.<column-name>, to the
+    position of the column's value in the tuple; this is computed once per schema,
+    rather than once per record lookup.
     """
 
     def __init__(self, schemas: dict):
-        self.schemas = schemas  # table_name -> Schema
+        # table_name -> Schema
+        # NOTE: nested scoped schemas are flattened, so every value is a SimpleSchema
+        self.schemas = {}
+        for alias, schema in schemas.items():
+            if isinstance(schema, ScopedSchema):
+                self.schemas.update(schema.schemas)
+            else:
+                self.schemas[alias] = schema
+        # qualified column name -> position in flat record
+        self.slots = {}
+        # flat list of columns; index corresponds to slot
+        self.slot_columns = []
+        for alias, schema in self.schemas.items():
+            for column in schema.columns:
+                self.slots[f"{alias}.{column.name}"] = len(self.slot_columns)
+                self.slot_columns.append(column)
 
     def get_table_names(self):
         return self.schemas.keys()
@@ -138,7 +160,7 @@ class ScopedSchema(AbstractSchema):
     def from_schemas(
         cls,
         left_schema: Union[SimpleSchema, ScopedSchema],
-        right_schema: SimpleSchema,
+        right_schema: Union[SimpleSchema, ScopedSchema],
         left_alias: Optional[str],
         right_alias: str,
     ):
@@ -153,11 +175,19 @@ class ScopedSchema(AbstractSchema):
 
     @property
     def columns(self):
-        return [
-            col
-            for table_alias, schema in self.schemas.items()
-            for col in schema.columns
-        ]
+        return self.slot_columns
+
+    def get_slot(self, name: str) -> Optional[int]:
+        """
+        Return position of qualified column `name` in a flat record, or None if
+        the name can't be resolved
+        """
+        slot = self.slots.get(name)
+        if slot is None and "." in name:
+            # aliases are case-sensitive; column names are stored lowercased
+            table_alias, column_name = name.split(".", 1)
+            slot = self.slots.get(f"{table_alias}.{column_name.lower()}")
+        return slot
 
     def has_column(self, name: str) -> bool:
         column = self.get_column_by_name(name)
@@ -166,12 +196,10 @@ class ScopedSchema(AbstractSchema):
     def get_column_by_name(self, name) -> Optional[Column]:
         name_parts = name.split(".")
         assert len(name_parts) == 2
-        table_alias, column_name = name_parts
-        table_schema = self.schemas[table_alias]
-        for column in table_schema.columns:
-            if column.name.lower() == column_name:
-                return column
-        return None
+        slot = self.get_slot(name)
+        if slot is None:
+            return None
+        return self.slot_columns[slot]
 
 
 class GroupedSchema(AbstractSchema):
@@ -253,6 +281,10 @@ class CatalogSchema(SimpleSchema):
     will be easier. Yet, even doing that will require special
     handling of the catalog schema. Further, having a hardcoded
     schema will provide an easy validation on the parser.
+
+    NOTE: row_count is the exact number of rows in the table, and bloom_filter_pagenum the
+    page of the Bloom filter over the table's keys, if it has one. These are the last columns,
+    so that catalog records written before they existed deserialize with nulls.
     """
 
     def __init__(self):
@@ -263,6 +295,32 @@ class CatalogSchema(SimpleSchema):
                 Column("name", Text),
                 Column("root_pagenum", Integer),
                 Column("sql_text", Text),
+                Column("row_count", Integer),
+                Column("bloom_filter_pagenum", Integer),
+            ],
+        )
+
+
+class StatsCatalogSchema(SimpleSchema):
+    """
+    Hardcoded schema of the stats catalog, i.e. the table holding statistics
+    collected by ANALYZE. Unlike the catalog, this is a regular table, that is created
+    (via the catalog) when statistics are first collected.
+
+    Each record holds the statistics of one table; the key is the table's root page number.
+    Per column statistics are stored as json in `column_stats`.
+    """
+
+    def __init__(self):
+        super().__init__(
+            TableName(STATS_CATALOG),
+            [
+                Column("pkey", Integer, is_primary_key=True),
+                Column("table_name", Text),
+                Column("row_count", Integer),
+                Column("page_count", Integer),
+                Column("tree_height", Integer),
+                Column("column_stats", Text),
             ],
         )
 
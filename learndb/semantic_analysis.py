@@ -239,8 +239,15 @@ class SemanticAnalyzer(Visitor):
                     )
                     raise SemanticAnalysisError()
 
+                # the return type may depend on the column's type, e.g. sum over a real column
                 func = resp.body
-                return func.return_type
+                column_type = self.schema.get_column_by_name(column_name.name).datatype
+                resp = func.resolve_return_type([column_type])
+                if not resp.success:
+                    self.failure_type = SemanticAnalysisFailure.TypeMismatch
+                    self.error_message = resp.error_message
+                    raise SemanticAnalysisError()
+                return resp.body
 
             # function does not exist
             self.failure_type = SemanticAnalysisFailure.FunctionDoesNotExist
@@ -256,6 +263,14 @@ class SemanticAnalyzer(Visitor):
             self.failure_type = SemanticAnalysisFailure.ColumnDoesNotExist
             raise SemanticAnalysisError()
 
+        if self.mode == EvalMode.Grouped and self.schema.is_non_grouping_column(
+            column_name.name
+        ):
+            # a non-grouping column only has a value when aggregated
+            self.error_message = f"Expected grouping column, or aggregate over column; received column [{column_name.name}]"
+            self.failure_type = SemanticAnalysisFailure.FunctionMismatch
+            raise SemanticAnalysisError()
+
         resp = self.name_registry.resolve_column_name_type(column_name.name)
         if resp.success:
             return resp.body
@@ -0,0 +1,174 @@
+"""
+Utilities to order records, i.e. to evaluate order by clauses.
+
+Records are ordered by a composite sort key, that is computed once per record.
+Small inputs are sorted in memory (Timsort); inputs larger than a memory budget
+are sorted with an external merge sort, i.e. sorted runs are spilled to temp files
+and then merged.
+"""
+import heapq
+import pickle
+import tempfile
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+from .lang_parser.symbols import OrderByClause, OrderingQualifier
+from .record_utils import SimpleRecord
+from .schema import SimpleSchema
+
+
+class DescendingKey:
+    """
+    Wraps a key, and inverts its ordering. Used for columns ordered descending,
+    since not all values, e.g. strings, can be negated.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other: "DescendingKey") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: "DescendingKey") -> bool:
+        return self.key == other.key
+
+    def __repr__(self):
+        return f"DescendingKey({self.key})"
+
+
+def make_sort_key(order_by_clause: OrderByClause) -> Callable[[Any], Tuple]:
+    """
+    Return a function that computes the composite sort key of a record.
+
+    Each column contributes a (is_null, value) pair; thus NULLs order after all
+    values, i.e. last for ascending columns, and first for descending columns.
+    """
+    columns = [
+        (
+            ord_col.column.name,
+            ord_col.qualifier == OrderingQualifier.Descending,
+        )
+        for ord_col in order_by_clause.columns
+    ]
+
+    def sort_key(record) -> Tuple:
+        key = []
+        for name, is_descending in columns:
+            value = record.get(name)
+            column_key = (value is None, value)
+            key.append(DescendingKey(column_key) if is_descending else column_key)
+        return tuple(key)
+
+    return sort_key
+
+
+def make_slots_sort_key(slots: Tuple[int, ...]) -> Callable[[Tuple], Tuple]:
+    """
+    Return a function that computes the sort key of a row, i.e. a tuple of values,
+    ordered ascending on the values at `slots`. Like `make_sort_key`, NULLs order last.
+    """
+
+    def sort_key(row: Tuple) -> Tuple:
+        return tuple((row[slot] is None, row[slot]) for slot in slots)
+
+    return sort_key
+
+
+def sort_records(
+    records: Iterable[SimpleRecord],
+    sort_key: Callable[[Any], Tuple],
+    schema: SimpleSchema,
+    memory_budget: int,
+) -> Iterator[SimpleRecord]:
+    """
+    Sort `records` by `sort_key`. The sort is stable.
+
+    If there are at most `memory_budget` records, they are sorted in memory.
+    Otherwise, fallback to an external merge sort.
+    NOTE: only record values are spilled; records are recreated with `schema` when read.
+    """
+    return sort_rows(
+        records,
+        sort_key,
+        memory_budget,
+        encode=lambda record: record.values,
+        decode=lambda values: SimpleRecord(values, schema),
+    )
+
+
+def sort_rows(
+    rows: Iterable,
+    sort_key: Callable[[Any], Tuple],
+    memory_budget: int,
+    encode: Callable[[Any], Any] = None,
+    decode: Callable[[Any], Any] = None,
+) -> Iterator:
+    """
+    Sort `rows` by `sort_key`. The sort is stable.
+
+    If there are at most `memory_budget` rows, they are sorted in memory.
+    Otherwise, fallback to an external merge sort; `encode` and `decode` convert
+    a row to and from its spilled (picklable) representation. By default, rows are
+    spilled as is.
+    """
+    rows = iter(rows)
+    run = list(islice(rows, memory_budget + 1))
+    if len(run) <= memory_budget:
+        run.sort(key=sort_key)
+        return iter(run)
+    return external_merge_sort(
+        chain(run, rows), sort_key, memory_budget, encode, decode
+    )
+
+
+def external_merge_sort(
+    rows: Iterator,
+    sort_key: Callable[[Any], Tuple],
+    memory_budget: int,
+    encode: Callable[[Any], Any] = None,
+    decode: Callable[[Any], Any] = None,
+) -> Iterator:
+    """
+    Sort rows by splitting them into runs of at most `memory_budget` rows;
+    each run is sorted and spilled to a temp file. The runs are then lazily merged.
+    """
+    run_files = []
+    try:
+        while True:
+            run = list(islice(rows, memory_budget))
+            if not run:
+                break
+            run.sort(key=sort_key)
+            run_files.append(spill_run(run, encode))
+
+        runs = [read_run(run_file, decode) for run_file in run_files]
+        # heapq.merge is stable, i.e. on equal keys, earlier runs are yielded first
+        yield from heapq.merge(*runs, key=sort_key)
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def spill_run(run: List, encode: Callable[[Any], Any] = None):
+    """
+    Write rows in run to a temp file, and return the (rewound) file.
+    """
+    run_file = tempfile.TemporaryFile()
+    for row in run:
+        pickle.dump(row if encode is None else encode(row), run_file)
+    run_file.seek(0)
+    return run_file
+
+
+def read_run(run_file, decode: Callable[[Any], Any] = None) -> Iterator:
+    """
+    Lazily read rows from a spilled run
+    """
+    while True:
+        try:
+            row = pickle.load(run_file)
+        except EOFError:
+            return
+        yield row if decode is None else decode(row)
@@ -3,16 +3,18 @@ class representing a logical-database
 support API to read/write data via Table
 and creating tables etc.
 """
+
 import random
 import string
-from collections import UserList, UserDict
-from typing import Optional, List, Union, Tuple
+from collections import UserList
+from typing import Any, Dict, Iterable, Iterator, Optional, List, Union, Tuple
 
+from .bloom_filter import BloomFilter
 from .btree import Tree
 from .constants import CATALOG_ROOT_PAGE_NUM
 from .dataexchange import Response
 from .pager import Pager
-from .record_utils import GroupedRecord
+from .record_utils import AggregateKey, GroupedRecord
 from .schema import (
     SimpleSchema,
     ScopedSchema,
@@ -20,6 +22,7 @@ from .schema import (
     GroupedSchema,
     NonGroupedSchema,
 )
+from .zone_map import ZoneMap
 
 
 class RecordSet(UserList):
@@ -30,21 +33,40 @@ class RecordSet(UserList):
     pass
 
 
-class GroupedRecordSet(UserDict):
+class PipelinedRecordSet:
     """
-    Maintains a dictionary of lists of records, where the dict is
-    indexed by the group key
+    A recordset whose records are produced lazily, i.e. pulled one at a time
+    from an upstream iterator, e.g. a generator over a cursor or over another recordset.
+
+    NOTE: a pipelined recordset can only be iterated once, and can't be appended to.
+    Operators that need multiple passes over their input, e.g. the inner side of a join,
+    must materialize it themselves.
     """
 
-    def __getitem__(self, key):
-        if key not in self.data:
-            self.data[key] = []
-        return self.data[key]
+    def __init__(self, records: Iterable):
+        self.records = iter(records)
+
+    def __iter__(self):
+        return self.records
+
+    def append(self, record):
+        raise TypeError("Attempted append on a pipelined recordset")
 
-    def __setitem__(self, key, value):
-        if key not in self.data:
-            self.data[key] = []
-        self.data[key].append(value)
+
+class GroupedRecordSet:
+    """
+    A recordset of groups, i.e. (group key, aggregate values) pairs, that are produced
+    lazily, i.e. pulled one at a time from an upstream iterator, e.g. a grouping operator.
+
+    NOTE: the records of a group are not kept, only the aggregates computed over them.
+    Like a pipelined recordset, a grouped recordset can only be iterated once.
+    """
+
+    def __init__(self, groups: Iterable[Tuple[Tuple, Dict[AggregateKey, Any]]]):
+        self.groups = iter(groups)
+
+    def __iter__(self):
+        return self.groups
 
 
 class Scope:
@@ -62,6 +84,8 @@ class Scope:
         self.group_rsets = {}
         # recordset name -> schema
         self.rsets_schemas = {}
+        # recordset name -> slots that records are ordered on (if known)
+        self.rsets_orderings = {}
         self.group_rsets_schemas = {}
 
     def register_aliased_source(self, source: str, alias: str):
@@ -74,13 +98,18 @@ class Scope:
         return self.record_sets.get(name)
 
     def add_recordset(
-        self, name: str, schema: NonGroupedSchema, recordset: RecordSet
+        self,
+        name: str,
+        schema: NonGroupedSchema,
+        recordset: Union[RecordSet, PipelinedRecordSet],
+        ordering: Optional[Tuple[int, ...]] = None,
     ) -> None:
         """
         Upsert a new recordset with `name`
         """
         self.rsets_schemas[name] = schema
         self.record_sets[name] = recordset
+        self.rsets_orderings[name] = ordering
 
     def drop_recordset(self, name: str):
         del self.record_sets[name]
@@ -88,6 +117,9 @@ class Scope:
     def get_recordset_schema(self, name: str) -> Optional[NonGroupedSchema]:
         return self.rsets_schemas.get(name)
 
+    def get_recordset_ordering(self, name: str) -> Optional[Tuple[int, ...]]:
+        return self.rsets_orderings.get(name)
+
     def add_grouped_recordset(
         self, name, schema: GroupedSchema, recordset: GroupedRecordSet
     ) -> None:
@@ -145,6 +177,13 @@ class StateManager:
         # mapping from table_name to schema object
         self.schemas = {}
         self.trees = {}
+        # mapping from table_name to the exact number of rows in the table;
+        # these are persisted in the catalog, when the database is closed
+        self.row_counts: Dict[str, int] = {}
+        # mapping from table_name to column name to the column's zone map
+        self.zone_maps: Dict[str, Dict[str, ZoneMap]] = {}
+        # mapping from table_name to the Bloom filter over the table's keys
+        self.bloom_filters: Dict[str, BloomFilter] = {}
         # scope stack
         self.scopes: List[Scope] = []
 
@@ -163,7 +202,16 @@ class StateManager:
         as a root page for new tree.
         :return:
         """
-        return self.pager.get_unused_page_num()
+        page_num = self.pager.get_unused_page_num()
+        if self.pager.page_exists(page_num):
+            # a recycled page, e.g. returned by a node merge, holds stale contents;
+            # reset it to an empty leaf root, else the new tree would adopt them
+            Tree.initialize_leaf_node(
+                self.pager.get_page(page_num),
+                node_is_root=True,
+                parent_page_num=page_num,
+            )
+        return page_num
 
     def table_exists(self, table_name: str) -> bool:
         return table_name in self.trees
@@ -176,14 +224,57 @@ class StateManager:
 
     def unregister_table(self, table_name: str):
         """
-        Remove table_name entry from both trees and schemas cache
+        Remove table_name entry from trees, schemas, row counts, zone maps, and Bloom filters cache
         """
         del self.trees[table_name]
         del self.schemas[table_name]
+        self.row_counts.pop(table_name, None)
+        self.zone_maps.pop(table_name, None)
+        self.bloom_filters.pop(table_name, None)
+
+    def register_row_count(self, table_name: str, row_count: int):
+        self.row_counts[table_name] = row_count
+
+    def get_row_count(self, table_name: str) -> Optional[int]:
+        """
+        Return the number of rows in the table, or None if it's not tracked, e.g. the catalog
+        """
+        return self.row_counts.get(table_name)
+
+    def adjust_row_count(self, table_name: str, delta: int):
+        """
+        Adjust the table's row count, by the number of rows inserted (or deleted)
+        """
+        if table_name in self.row_counts:
+            self.row_counts[table_name] += delta
+
+    def register_zone_map(self, table_name: str, column_name: str, zone_map: ZoneMap):
+        self.zone_maps.setdefault(table_name, {})[column_name] = zone_map
+
+    def get_zone_maps(self, table_name: str) -> Dict[str, ZoneMap]:
+        """
+        Return the table's zone maps, keyed by column name
+        """
+        return self.zone_maps.get(table_name, {})
+
+    def unregister_zone_maps(self, table_name: str):
+        """
+        Remove the table's zone maps; these are rebuilt when next used
+        """
+        self.zone_maps.pop(table_name, None)
+
+    def register_bloom_filter(self, table_name: str, bloom_filter: BloomFilter):
+        self.bloom_filters[table_name] = bloom_filter
+
+    def get_bloom_filter(self, table_name: str) -> Optional[BloomFilter]:
+        return self.bloom_filters.get(table_name)
 
     def get_catalog_schema(self):
         return self.catalog_schema
 
+    def get_table_names(self) -> List[str]:
+        return list(self.schemas)
+
     def has_schema(self, table_name: str):
         return table_name in self.schemas
 
@@ -258,26 +349,40 @@ class StateManager:
                 is_unique = True
         return name
 
-    def init_recordset(self, schema: Union[SimpleSchema, ScopedSchema]) -> Response:
+    def init_recordset(
+        self,
+        schema: Union[SimpleSchema, ScopedSchema],
+        records: Optional[Iterable] = None,
+        ordering: Optional[Tuple[int, ...]] = None,
+    ) -> Response:
         """
         Creates a new recordset with the associated `schema`, and
         stores it in the current scope.
         Recordset name should be unique across all scopes
+
+        If `records` is passed, the recordset is pipelined, i.e. records are
+        pulled from `records` when the recordset is iterated.
+        `ordering` are the slots, i.e. positions in record.to_tuple(), that
+        records are (ascending) ordered on, if known.
         """
         name = self.unique_recordset_name()
         scope = self.scopes[-1]
-        scope.add_recordset(name, schema, RecordSet())
+        recordset = RecordSet() if records is None else PipelinedRecordSet(records)
+        scope.add_recordset(name, schema, recordset, ordering)
         return Response(True, body=name)
 
-    def init_grouped_recordset(self, schema: GroupedSchema):
+    def init_grouped_recordset(
+        self,
+        schema: GroupedSchema,
+        groups: Iterable[Tuple[Tuple, Dict[AggregateKey, Any]]],
+    ):
         """
-        init a grouped recordset.
-        NOTE: A grouped record set is internally stored like
-        {group_key_tuple -> list_of_records}
+        init a grouped recordset, that lazily pulls groups, i.e.
+        (group_key_tuple, aggregate_values) pairs, from `groups`
         """
         name = self.unique_grouped_recordset_name()
         scope = self.scopes[-1]
-        scope.add_grouped_recordset(name, schema, GroupedRecordSet())
+        scope.add_grouped_recordset(name, schema, GroupedRecordSet(groups))
         return Response(True, body=name)
 
     def find_recordset_scope(self, name: str) -> Optional[Scope]:
@@ -303,6 +408,11 @@ class StateManager:
         if scope:
             return scope.get_recordset_schema(name)
 
+    def get_recordset_ordering(self, name: str) -> Optional[Tuple[int, ...]]:
+        scope = self.find_recordset_scope(name)
+        if scope:
+            return scope.get_recordset_ordering(name)
+
     def get_grouped_recordset_schema(self, name: str) -> Optional[NonGroupedSchema]:
         scope = self.find_grouped_recordset_scope(name)
         if scope:
@@ -318,25 +428,6 @@ class StateManager:
         recordset = scope.get_recordset(name)
         recordset.append(record)
 
-    def append_grouped_recordset(self, name: str, group_key: Tuple, record):
-        """
-        Add record to a group
-        """
-        scope = self.find_grouped_recordset_scope(name)
-        assert scope is not None
-        recordset = scope.get_grouped_recordset(name)
-        recordset[group_key].append(record)
-
-    def add_group_grouped_recordset(self, name: str, group_key: Tuple, group_recordset):
-        """
-        Add a new group, with a given set of records for group_recordset
-        """
-        scope = self.find_grouped_recordset_scope(name)
-        assert scope is not None
-        recordset = scope.get_grouped_recordset(name)
-        assert group_key not in recordset
-        recordset[group_key] = group_recordset
-
     def drop_recordset(self, name: str):
         scope = self.find_recordset_scope(name)
         assert scope is not None
@@ -353,17 +444,17 @@ class StateManager:
         assert scope is not None
         return iter(scope.get_recordset(name))
 
-    def grouped_recordset_iter(self, name) -> List[GroupedRecord]:
+    def grouped_recordset_iter(self, name) -> Iterator[GroupedRecord]:
         """
         return an iterator over a groups from a grouped recordset
+        NOTE: The iterator will be consumed after one iteration
         """
         scope = self.find_grouped_recordset_scope(name)
         assert scope is not None
         recordset = scope.get_grouped_recordset(name)
         schema = scope.get_grouped_recordset_schema(name)
-        # NOTE: cloning the group_rset, since it may need to be iterated multiple times
         # A group is represented by a GroupedRecord
-        return [
-            GroupedRecord(schema, group_key, group_rset)
-            for group_key, group_rset in recordset.items()
-        ]
+        return (
+            GroupedRecord(schema, group_key, aggregate_values)
+            for group_key, aggregate_values in recordset
+        )
@@ -0,0 +1,263 @@
+"""
+Table statistics, i.e. estimates of a table's size and the distribution of its values,
+used by the query planner to estimate the cost of evaluating a query.
+
+Statistics are either defaults, derived from the table's size, or collected by ANALYZE
+in one pass over the table's records:
+    - the number of distinct values of a column is estimated with a HyperLogLog sketch
+    - the distribution of a column's values is summarized by an equi-depth histogram,
+      built from a (reservoir) sample of the values
+"""
+import json
+import math
+import random
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from .lang_parser.symbols import ComparisonOp
+from .schema import SimpleSchema
+
+# when the number of distinct values of a column is not known, assume
+# each value occurs this many times; but that small tables have distinct values
+DEFAULT_ROWS_PER_DISTINCT_VALUE = 10
+# selectivity of a condition, whose selectivity can't be estimated
+DEFAULT_SELECTIVITY = 1 / 3
+
+# number of HyperLogLog registers is 2 ** HLL_PRECISION; the standard error is ~1.04 / sqrt(registers)
+HLL_PRECISION = 10
+# number of values sampled per column, and number of histogram buckets
+HISTOGRAM_SAMPLE_SIZE = 1000
+HISTOGRAM_BUCKETS = 10
+
+
+@dataclass
+class ColumnStatistics:
+    """
+    Statistics of a single column, collected by ANALYZE
+    """
+
+    null_count: int
+    distinct_count: int
+    min_value: Any = None
+    max_value: Any = None
+    # bucket boundaries of an equi-depth histogram over non-null values, i.e. each
+    # of the len(histogram) - 1 buckets holds (approximately) the same number of values
+    histogram: List[Any] = field(default_factory=list)
+
+    def fraction_below(self, value: Any) -> Optional[float]:
+        """
+        Estimate the fraction of non-null values that are less than `value`;
+        None if there is no histogram, or `value` is not comparable to its values
+        """
+        bounds = self.histogram
+        if len(bounds) < 2:
+            return None
+        try:
+            if value <= bounds[0]:
+                return 0.0
+            if value > bounds[-1]:
+                return 1.0
+            bucket = min(bisect_right(bounds, value) - 1, len(bounds) - 2)
+            low, high = bounds[bucket], bounds[bucket + 1]
+        except TypeError:
+            return None
+        # interpolate within the bucket, for numeric values
+        within = 0.5
+        if (
+            isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and high != low
+        ):
+            within = (value - low) / (high - low)
+        return (bucket + within) / (len(bounds) - 1)
+
+
+@dataclass
+class TableStatistics:
+    """
+    Statistics of a single table
+    """
+
+    row_count: int
+    # lowercased column name -> column statistics; only known for analyzed tables
+    columns: Dict[str, ColumnStatistics] = field(default_factory=dict)
+    # lowercased column name -> number of distinct values, when known without analyzing,
+    # e.g. the primary key
+    distinct_counts: Dict[str, int] = field(default_factory=dict)
+    page_count: Optional[int] = None
+    tree_height: Optional[int] = None
+
+    def distinct_count(self, column_name: str) -> int:
+        """
+        Return the (estimated) number of distinct values of the column; this
+        is always between 1 and the row count
+        """
+        column_name = column_name.lower()
+        if column_name in self.columns:
+            count = self.columns[column_name].distinct_count
+        else:
+            count = self.distinct_counts.get(column_name)
+        if count is None:
+            count = max(
+                self.row_count // DEFAULT_ROWS_PER_DISTINCT_VALUE,
+                min(self.row_count, DEFAULT_ROWS_PER_DISTINCT_VALUE),
+            )
+        return max(1, min(count, self.row_count))
+
+    def selectivity(
+        self, column_name: str, operator: ComparisonOp, value: Any
+    ) -> float:
+        """
+        Estimate the fraction of records, where <column> <operator> <value> holds
+        """
+        if value is None:
+            # comparisons with null are never true
+            return 0.0
+        column = self.columns.get(column_name.lower())
+        non_null = 1.0
+        if column is not None and self.row_count:
+            non_null = 1 - column.null_count / self.row_count
+
+        if operator == ComparisonOp.Equal:
+            return non_null / self.distinct_count(column_name)
+        if operator == ComparisonOp.NotEqual:
+            return non_null * (1 - 1 / self.distinct_count(column_name))
+
+        below = column.fraction_below(value) if column is not None else None
+        if below is None:
+            return DEFAULT_SELECTIVITY
+        if operator in (ComparisonOp.Less, ComparisonOp.LessEqual):
+            return non_null * below
+        return non_null * (1 - below)
+
+    def column_statistics_to_json(self) -> str:
+        return json.dumps(
+            {name: column.__dict__ for name, column in self.columns.items()}
+        )
+
+    @staticmethod
+    def column_statistics_from_json(text: str) -> Dict[str, ColumnStatistics]:
+        return {
+            name: ColumnStatistics(**fields)
+            for name, fields in json.loads(text).items()
+        }
+
+
+def mix_hash(value: Any) -> int:
+    """
+    Return a 64-bit hash of value, whose bits are well distributed; python's hash
+    of an int is the int itself. This is the finalizer of splitmix64.
+    """
+    h = hash(value) & 0xFFFFFFFFFFFFFFFF
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct values added, in constant memory
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = [0] * self.num_registers
+
+    def add(self, value: Any):
+        h = mix_hash(value)
+        register = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        # position of the leftmost 1-bit in the remaining bits
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def estimate(self) -> int:
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0**-register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # small range correction, i.e. linear counting
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class ColumnStatisticsCollector:
+    """
+    Collects statistics of a column, one value at a time
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.null_count = 0
+        self.count = 0
+        self.min_value = None
+        self.max_value = None
+        self.distinct = HyperLogLog()
+        self.sample = []
+
+    def add(self, value: Any):
+        if value is None:
+            self.null_count += 1
+            return
+        self.count += 1
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+        self.distinct.add(value)
+        # reservoir sampling, i.e. each value is sampled with equal probability
+        if len(self.sample) < HISTOGRAM_SAMPLE_SIZE:
+            self.sample.append(value)
+        else:
+            index = self.rng.randrange(self.count)
+            if index < HISTOGRAM_SAMPLE_SIZE:
+                self.sample[index] = value
+
+    def histogram(self) -> List[Any]:
+        """
+        Return bucket boundaries at equally spaced quantiles of the sample
+        """
+        if not self.sample:
+            return []
+        sample = sorted(self.sample)
+        buckets = min(HISTOGRAM_BUCKETS, len(sample))
+        bounds = [
+            sample[(len(sample) - 1) * bucket // buckets]
+            for bucket in range(buckets + 1)
+        ]
+        bounds[0], bounds[-1] = self.min_value, self.max_value
+        return bounds
+
+    def finalize(self) -> ColumnStatistics:
+        return ColumnStatistics(
+            null_count=self.null_count,
+            # the sketch's estimate can't exceed the number of values
+            distinct_count=min(self.distinct.estimate(), self.count),
+            min_value=self.min_value,
+            max_value=self.max_value,
+            histogram=self.histogram(),
+        )
+
+
+def collect_table_statistics(
+    records: Iterable, schema: SimpleSchema, seed: int = 0
+) -> TableStatistics:
+    """
+    Collect statistics over `records`, in a single pass
+    """
+    rng = random.Random(seed)
+    names = [column.name.lower() for column in schema.columns]
+    collectors = {name: ColumnStatisticsCollector(rng) for name in names}
+    row_count = 0
+    for record in records:
+        row_count += 1
+        for name in names:
+            collectors[name].add(record.get(name))
+    return TableStatistics(
+        row_count,
+        {name: collector.finalize() for name, collector in collectors.items()},
+    )
@@ -5,13 +5,15 @@ ValueGenerators are used in to evaluate select clauses. They are objects
 that track the formal parameters passed to the select clause. Then
 when iterating over a recordset, the valueGenerator takes a record, and returns a single output value
 """
+
 from dataclasses import dataclass
-from typing import Any, Dict, List, NewType, Union
+from typing import Any, Callable, Dict, List, NewType, Union
 
 from .functions import FunctionDefinition
 from .lang_parser.symbols import OrClause
 from .record_utils import SimpleRecord, ScopedRecord, GroupedRecord
 from .expression_interpreter import ExpressionInterpreter
+from .expression_compiler import CompiledExpression
 
 
 @dataclass
@@ -68,27 +70,31 @@ class ValueGeneratorFromRecordOverFunc:
         self.pos_args = pos_args
         self.named_args = named_args
         self.func = func
+        # bind each arg to a getter, i.e. record -> arg value, once; rather than on each record
+        self.pos_arg_getters = [self.bind_arg(arg) for arg in pos_args]
+        self.named_arg_getters = {
+            arg_name: self.bind_arg(arg_val) for arg_name, arg_val in named_args.items()
+        }
+
+    @staticmethod
+    def bind_arg(arg: SelectableAtom) -> Callable[[Any], Any]:
+        if isinstance(arg, LiteralSelectableAtom):
+            # evaluate any literals, by unboxing from `LiteralSelectableAtom`
+            value = arg.value
+            return lambda record: value
+        # evaluate any column references, i.e. replace with value in record
+        name = arg.name
+        return lambda record: record.get(name)
 
     def get_value(self, record) -> Any:
         """
         This is invoked when iterating over a recordset with each record
         """
-        # evaluate pos_args, i.e. convert SelectableAtom to a value that can be passed to a function
-        evaluated_pos_args = []
-        for arg in self.pos_args:
-            if isinstance(arg, LiteralSelectableAtom):
-                # evaluate any literals, by unboxing from `LiteralSelectableAtom`
-                evaluated_pos_args.append(arg.value)
-            else:
-                # evaluate any column references, i.e. replace with value in record
-                evaluated_pos_args.append(record.get(arg.name))
-
-        evaluated_named_args = {}
-        for arg_name, arg_val in self.named_args.items():
-            if isinstance(arg_val, LiteralSelectableAtom):
-                evaluated_named_args[arg_name] = arg_val.value
-            else:
-                evaluated_named_args[arg_name] = record.get(arg_val.name)
+        evaluated_pos_args = [getter(record) for getter in self.pos_arg_getters]
+        evaluated_named_args = {
+            arg_name: getter(record)
+            for arg_name, getter in self.named_arg_getters.items()
+        }
 
         # apply a function on arguments to
         ret_val = self.func.apply(evaluated_pos_args, evaluated_named_args)
@@ -115,6 +121,19 @@ class ValueGeneratorFromRecordOverExpr:
         return value
 
 
+class ValueGeneratorFromRecordOverCompiledExpr:
+    """
+    Generate value from a single record, by evaluating an expr that was compiled
+    (see ExpressionCompiler) against the schema of the records
+    """
+
+    def __init__(self, compiled_expr: CompiledExpression):
+        self.compiled_expr = compiled_expr
+
+    def get_value(self, record: Union[SimpleRecord, ScopedRecord]) -> Any:
+        return self.compiled_expr(record)
+
+
 class ValueGeneratorFromNoRecordOverExpr:
     """
     Generate value from a no-record. Where the value is the result of evaluating an expr.
@@ -2,74 +2,132 @@
 Virtual machine class, and related classes.
 Executes the AST generated by the parser.
 """
-import logging
 
+import heapq
+import logging
 
-from typing import Any, List, Optional, Tuple, Union
+from collections import defaultdict
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple, Union
 from collections.abc import Iterable
 from enum import Enum, auto
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-from .btree import Tree, TreeInsertResult, TreeDeleteResult
-from .constants import CATALOG
+from .bloom_filter import BloomFilter
+from .btree import Tree, TreeInsertResult, TreeDeleteResult, TreeUpdateResult
+from .constants import CATALOG, FILE_HEADER_UNCOUNTED_VERSION_VALUE, STATS_CATALOG
+from .datatypes import Integer, Real, Text
 from .cursor import Cursor
 from .dataexchange import Response
-from .functions import resolve_function_name
+from .functions import (
+    Accumulator,
+    CountAccumulator,
+    is_aggregate_function,
+    resolve_aggregate_func_name,
+    resolve_function_name,
+)
 from .lang_parser.visitor import Visitor
 from .lang_parser.symbols import (
     Symbol,
     Program,
+    SelectStmnt,
     CreateStmnt,
+    AnalyzeStmnt,
+    ExplainStmnt,
     SingleSource,
+    ConditionedJoin,
     JoinType,
     Joining,
+    UnconditionedJoin,
     WhereClause,
+    FromClause,
     TableName,
     HavingClause,
+    GroupByClause,
     SelectClause,
     FuncCall,
     ColumnName,
     Literal,
+    Comparison,
+    ComparisonOp,
     Expr,
     InsertStmnt,
     DropStmnt,
+    UpdateStmnt,
+    TruncateStmnt,
     OrderByClause,
     OrderingQualifier,
     LimitClause,
+    SymbolicDataType,
 )
 from .lang_parser.sqlhandler import SqlFrontEnd
 from .record_utils import (
+    AggregateKey,
+    aggregate_key,
     SimpleRecord,
     GroupedRecord,
     create_catalog_record,
     ScopedRecord,
+    JoinedRecordView,
     create_record,
-    create_null_record,
     create_record_from_raw_values,
+    validate_record,
 )
 from .statemanager import StateManager
 from .schema import (
     generate_schema,
     generate_unvalidated_schema,
     schema_to_ddl,
+    StatsCatalogSchema,
     AbstractSchema,
     SimpleSchema,
     ScopedSchema,
     make_grouped_schema,
     GroupedSchema,
+    NonGroupedSchema,
     Column,
 )
 from .serde import serialize_record, deserialize_cell
+from .explain import (
+    JOIN_TYPE_NAMES,
+    IOCounters,
+    Operator,
+    QueryProfile,
+    expression_to_sql,
+)
+from .statistics import TableStatistics, collect_table_statistics
+from .sorting import make_slots_sort_key, make_sort_key, sort_records, sort_rows
+from .query_planner import (
+    EquiJoinKeys,
+    JoinAlgorithm,
+    JoinPlan,
+    Relation,
+    conjoin,
+    estimate_selectivity,
+    find_equi_join_keys,
+    flatten_joining,
+    keys_are_comparable,
+    null_supplied_sources,
+    other_key_pairs,
+    plan_join_order,
+    primary_key_slot,
+    referenced_columns,
+    split_conjuncts,
+    unqualify,
+)
 
 from .value_generators import (
-    ValueGeneratorFromRecordOverFunc,
-    ValueGeneratorFromRecordOverExpr,
+    ValueGeneratorFromRecordOverCompiledExpr,
     ValueGeneratorFromRecordGroupOverExpr,
     ValueGeneratorFromNoRecordOverExpr,
 )
 from .vm_utils import datatype_from_symbolic_datatype
+from .zone_map import ZoneMap
 from .expression_interpreter import ExpressionInterpreter
+from .expression_compiler import CompiledExpression, ExpressionCompiler
+from .expression_rewriter import ExpressionRewriter, is_boolean_literal
 from .name_registry import NameRegistry
 from .semantic_analysis import SemanticAnalyzer
 
@@ -84,6 +142,20 @@ class VMConfig:
 
     db_filepath: str
     stop_program_on_statement_failure = True
+    # max number of records sorted in memory; larger inputs are sorted with an external merge sort
+    sort_memory_budget: int = 10000
+    # max number of rows in a hash join's build side; if both join inputs are larger,
+    # the join is evaluated as a merge join over (externally) sorted inputs
+    join_memory_budget: int = 10000
+    # table name -> names of (numeric) columns to keep zone maps for; scans skip leaves
+    # whose zones can't match a range predicate on these columns
+    zone_map_columns: Dict[str, List[str]] = field(default_factory=dict)
+    # names of tables to keep a Bloom filter over the primary keys for; point lookups
+    # of keys not in the filter skip the tree descent
+    bloom_filter_tables: List[str] = field(default_factory=list)
+    # max number of records a delete, or update, collects before modifying them
+    # in the tree, and resuming its scan
+    modify_batch_size: int = 1000
 
 
 class SelectClauseSourceType(Enum):
@@ -115,6 +187,12 @@ class VirtualMachine(Visitor):
         append_groupedrecordset(name, record)
         drop_groupedrecordset(name)
 
+    A recordset can also be pipelined, i.e. init_recordset(schema, records), where
+    records is an iterator (typically a generator over an upstream recordset). Thus
+    operators (scan, filter, join, project, limit) form a pull-based pipeline, and
+    records stream through it. Only blocking operators (sort, group, and the inner
+    side of a join) materialize their input.
+
     These will likely be backed by simple lists, and dicts of lists.
     The main reason for doing it this way; instead of making rich
     RecordSet types, is because that would require logic for interpreting
@@ -131,7 +209,12 @@ class VirtualMachine(Visitor):
         self.state_manager = StateManager(config.db_filepath)
         self.name_registry = NameRegistry()
         self.interpreter = ExpressionInterpreter(self.name_registry)
+        self.compiler = ExpressionCompiler(self.interpreter)
+        self.rewriter = ExpressionRewriter(self.interpreter)
         self.type_checker = SemanticAnalyzer(self.name_registry)
+        # counts of pages, and bytes read; and the profile of the statement being explained, if any
+        self.io_counters = IOCounters()
+        self.profile: Optional[QueryProfile] = None
         # 3. parameters to control VM behavior
         # 3.1. whether to stop a program execution on first statement failure
         self.stop_program_on_statement_failure = (
@@ -152,6 +235,11 @@ class VirtualMachine(Visitor):
         pager = self.state_manager.get_pager()
         cursor = Cursor(pager, catalog_tree)
 
+        # files written before internal nodes stored their child counts, must have them counted
+        rebuild_child_counts = pager.file_version == FILE_HEADER_UNCOUNTED_VERSION_VALUE
+        if rebuild_child_counts:
+            catalog_tree.rebuild_child_counts()
+
         # need parser to parse schema definition
         parser = SqlFrontEnd()
 
@@ -179,10 +267,25 @@ class VirtualMachine(Visitor):
             tree = Tree(
                 self.state_manager.get_pager(), table_record.get("root_pagenum")
             )
+            if rebuild_child_counts:
+                tree.rebuild_child_counts()
 
             # register schema
             self.state_manager.register_schema(table_record.get("name"), table_schema)
             self.state_manager.register_tree(table_record.get("name"), tree)
+            # catalog records written before row counts were kept, have no row count
+            row_count = table_record.get("row_count")
+            if row_count is None:
+                row_count = tree.count_cells()
+            self.state_manager.register_row_count(table_record.get("name"), row_count)
+            bloom_filter_page_num = table_record.get("bloom_filter_pagenum")
+            if bloom_filter_page_num is not None:
+                self.state_manager.register_bloom_filter(
+                    table_record.get("name"),
+                    BloomFilter(
+                        pager.get_page(bloom_filter_page_num), bloom_filter_page_num
+                    ),
+                )
 
             cursor.advance()
 
@@ -190,6 +293,7 @@ class VirtualMachine(Visitor):
         """
         Terminate the virtual machine.
         """
+        self.persist_table_metadata()
         self.state_manager.close()
 
     def run(self, program: Program) -> Response:
@@ -299,6 +403,8 @@ class VirtualMachine(Visitor):
         # 8. register tree
         tree = Tree(self.state_manager.get_pager(), table_record.get("root_pagenum"))
         self.state_manager.register_tree(table_name, tree)
+        # 9. register row count
+        self.state_manager.register_row_count(table_name, 0)
         return Response(True)
 
     def visit_drop_stmnt(self, stmnt: DropStmnt) -> Response:
@@ -333,12 +439,75 @@ class VirtualMachine(Visitor):
 
         # 1.2. delete
         catalog_tree.delete(table_key)
+        self.delete_table_statistics(table_to_drop)
+        bloom_filter = self.state_manager.get_bloom_filter(table_to_drop)
+        if bloom_filter is not None:
+            pager.return_page(bloom_filter.page_num)
+
+        # 2. return the tree's pages to the pager
+        self.get_tree(table_to_drop).drop()
 
-        # 2. unregister table
+        # 3. unregister table
         self.state_manager.unregister_table(stmnt.table_name.table_name)
 
         return Response(True)
 
+    def visit_truncate_stmnt(self, stmnt: TruncateStmnt) -> Response:
+        """
+        Handle truncate table stmnt, i.e. delete all of the table's rows; the tree's pages
+        are returned to the pager, without visiting the rows
+        """
+        table_name = stmnt.table_name.table_name.lower()
+        if not self.state_manager.has_schema(table_name):
+            return Response(False, error_message=f"Table [{table_name}] does not exist")
+
+        self.get_tree(table_name).truncate()
+        self.state_manager.register_row_count(table_name, 0)
+        self.state_manager.unregister_zone_maps(table_name)
+        bloom_filter = self.state_manager.get_bloom_filter(table_name)
+        if bloom_filter is not None:
+            bloom_filter.clear()
+        # the statistics describe rows that no longer exist
+        self.delete_table_statistics(table_name)
+
+        return Response(True)
+
+    def visit_analyze_stmnt(self, stmnt: AnalyzeStmnt) -> Response:
+        """
+        Handle analyze stmnt, i.e. collect statistics of the table (or all tables)
+        and store them in the stats catalog
+        """
+        if stmnt.table_name is not None:
+            table_name = stmnt.table_name.table_name.lower()
+            if not self.state_manager.has_schema(table_name):
+                return Response(False, error_message=f"table {table_name} not found")
+            table_names = [table_name]
+        else:
+            table_names = [
+                table_name
+                for table_name in self.state_manager.get_table_names()
+                if table_name != STATS_CATALOG
+            ]
+
+        resp = self.ensure_stats_catalog()
+        if not resp.success:
+            return resp
+        for table_name in table_names:
+            self.store_table_statistics(table_name, self.analyze_table(table_name))
+        return Response(True)
+
+    def visit_explain_stmnt(self, stmnt: ExplainStmnt) -> Response:
+        """
+        Handle explain stmnt, i.e. output the tree of operators that evaluate the select,
+        one record per line. With analyze, the select is executed (its records are
+        discarded), and each operator's actuals are output too.
+        """
+        self.profile = QueryProfile(stmnt.analyze, self.io_counters)
+        try:
+            return self.visit_select_stmnt(stmnt.select_stmnt)
+        finally:
+            self.profile = None
+
     def visit_select_stmnt(self, stmnt) -> Response:
         """
         handle select stmnt
@@ -353,8 +522,41 @@ class VirtualMachine(Visitor):
         rsname = None  # name of result set
         from_clause = stmnt.from_clause
         if from_clause:
+            self.rewrite_conditions(from_clause)
+            source = from_clause.source.source
+            # conjuncts of the where clause over a single source are evaluated
+            # in the scan of that source, i.e. before any joins
+            pushed_conditions = {}
+            residual = []
+            if from_clause.where_clause:
+                pushed_conditions, residual = self.push_down_predicates(
+                    source, from_clause.where_clause
+                )
+            # a chain of inner joins is evaluated in the (estimated) cheapest order
+            join_plan = None
+            if isinstance(source, Joining):
+                join_plan, residual = self.plan_joining(
+                    source, pushed_conditions, residual
+                )
+            where_clause = WhereClause(conjoin(residual)) if residual else None
+            # the records an offset skips, may be skipped by the scan, i.e. without reading them
+            skipped = self.find_scan_offset(from_clause, stmnt.select_clause)
+            # if only the primary key is referenced, the scan need only read keys
+            key_only = isinstance(
+                source, (SingleSource, TableName)
+            ) and self.is_key_only(
+                source if isinstance(source, SingleSource) else SingleSource(source),
+                [stmnt.select_clause, from_clause],
+            )
+
             # materialize source in from clause
-            resp = self.materialize(stmnt.from_clause.source.source)
+            resp = self.materialize(
+                source,
+                pushed_conditions,
+                join_plan,
+                start_rank=skipped,
+                key_only=key_only,
+            )
             if not resp.success:
                 return Response(
                     False,
@@ -363,8 +565,8 @@ class VirtualMachine(Visitor):
             rsname = resp.body
 
             # 3. apply filter on source - where clause
-            if from_clause.where_clause:
-                resp = self.filter_recordset(from_clause.where_clause, rsname)
+            if where_clause:
+                resp = self.filter_recordset(where_clause, rsname)
                 if not resp.success:
                     return Response(
                         False,
@@ -374,8 +576,27 @@ class VirtualMachine(Visitor):
                 rsname = resp.body
 
             # 4. apply group by clause
-            if from_clause.group_by_clause:
-                resp = self.group_recordset(from_clause.group_by_clause, rsname)
+            # the aggregates that the select, and having, clauses are evaluated over
+            aggregate_exprs = list(stmnt.select_clause.selectables)
+            if from_clause.having_clause:
+                aggregate_exprs.append(from_clause.having_clause.condition)
+            group_by_clause = from_clause.group_by_clause
+            if group_by_clause is None and (
+                from_clause.having_clause or self.calls_aggregate(aggregate_exprs)
+            ):
+                # without a group by, aggregates are over a single group of all records
+                group_by_clause = GroupByClause([])
+            if group_by_clause:
+                row_count_aggregates = self.find_row_count_aggregates(
+                    from_clause, aggregate_exprs
+                )
+                if row_count_aggregates is not None:
+                    # counts are answered from the table's row count, i.e. without a scan
+                    resp = self.group_by_row_count(rsname, *row_count_aggregates)
+                else:
+                    resp = self.group_recordset(
+                        group_by_clause, rsname, aggregate_exprs
+                    )
                 if not resp.success:
                     return Response(
                         False,
@@ -385,7 +606,7 @@ class VirtualMachine(Visitor):
 
             # 5. apply having clause
             if from_clause.having_clause:
-                # having without group - by should treat entire
+                # having without group - by treats entire
                 # resultset as one group
                 resp = self.filter_grouped_recordset(from_clause.having_clause, rsname)
                 assert resp.success
@@ -406,100 +627,32 @@ class VirtualMachine(Visitor):
         # 7. if from_clause, evaluate order, limit clause
         if from_clause:
             if from_clause.order_by_clause:
+                # with a limit, only the first limit + offset ordered records are needed
+                top_n = None
+                if from_clause.limit_clause:
+                    top_n = self.limit_clause_bound(from_clause.limit_clause)
                 resp = self.evaluate_order_by_clause(
-                    from_clause.order_by_clause, rsname
+                    from_clause.order_by_clause, rsname, top_n
                 )
                 assert resp.success
                 rsname = resp.body
             if from_clause.limit_clause:
-                resp = self.evaluate_limit_clause(from_clause.limit_clause, rsname)
+                resp = self.evaluate_limit_clause(
+                    from_clause.limit_clause, rsname, skipped
+                )
                 assert resp.success
                 rsname = resp.body
 
-        for record in self.recordset_iter(rsname):
-            self.output_pipe.write(record)
+        if self.profile is not None:
+            self.write_query_plan(rsname)
+        else:
+            for record in self.recordset_iter(rsname):
+                self.output_pipe.write(record)
 
         # end scope, and recycle any ephemeral objects in scope
         self.end_scope()
         return Response(True)
 
-    @staticmethod
-    def quicksort(records: List, order_by_clause: OrderByClause):
-        """
-        Sort a list of records according to an order by clause.
-
-        If the order by clause has more than one column, secondary columns only
-        matter if one column matches
-
-        """
-        if len(records) <= 1:
-            return records
-        pivot = records[len(records) // 2]
-        # the left has all values less than the pivot
-        # left = [x for x in records if x < pivot]
-        left = []
-        for record in records:
-            # evaluate whether record < pivot
-            # go from left to right ordering column
-            # if a column value is equal (for a given record to the pivot), look at the next ordering column
-            # otherwise the value is either less, in which case append to "left"
-            # else skip this record
-            for ord_col in order_by_clause.columns:
-                record_value = record.get(ord_col.column.name)
-                pivot_value = pivot.get(ord_col.column.name)
-                if ord_col.qualifier == OrderingQualifier.Descending:
-                    # for desc columns, comparison is inverted from asc
-                    if record_value > pivot_value:
-                        left.append(record)
-                        break
-                    elif record_value < pivot_value:
-                        break
-                else:
-                    if record_value < pivot_value:
-                        left.append(record)
-                        break
-                    elif record_value > pivot_value:
-                        break
-                    # else: continue; i.e. equality on curr column, check next column
-
-        middle = []
-        # evaluate whether record == pivot
-        for record in records:
-            for ord_col in order_by_clause.columns:
-                record_value = record.get(ord_col.column.name)
-                pivot_value = pivot.get(ord_col.column.name)
-                # TODO: does this equality need to handle floats in a special way?
-                if record_value != pivot_value:
-                    break
-            else:
-                # all columns matched, hence no break
-                middle.append(record)
-
-        right = []
-        for record in records:
-            # evaluate whether record > pivot
-            for ord_col in order_by_clause.columns:
-                record_value = record.get(ord_col.column.name)
-                pivot_value = pivot.get(ord_col.column.name)
-                if ord_col.qualifier == OrderingQualifier.Descending:
-                    if record_value < pivot_value:
-                        right.append(record)
-                        break
-                    elif record_value > pivot_value:
-                        break
-                else:
-                    if record_value > pivot_value:
-                        right.append(record)
-                        break
-                    elif record_value < pivot_value:
-                        break
-
-        return (
-            VirtualMachine.quicksort(left, order_by_clause)
-            + middle
-            + VirtualMachine.quicksort(right, order_by_clause)
-        )
-
     def visit_insert_stmnt(self, stmnt: InsertStmnt) -> Response:
         """
         handle insert stmnt
@@ -529,42 +682,145 @@ class VirtualMachine(Visitor):
         cell = resp.body
         resp = tree.insert(cell)
         assert resp == TreeInsertResult.Success, f"Insert op failed with status: {resp}"
+        self.state_manager.adjust_row_count(table_name, 1)
+        self.widen_zone_maps(table_name.lower(), record)
+        bloom_filter = self.state_manager.get_bloom_filter(table_name.lower())
+        if bloom_filter is not None:
+            bloom_filter.add(record.get_primary_key())
         self.end_scope()
         return Response(True, body=TreeInsertResult.Success)
 
     def visit_delete_stmnt(self, stmnt) -> Response:
         """
-        handle delete stmnt
+        handle delete stmnt.
+        The records to delete are found by the same access path as a select's scan of a single
+        table, i.e. `condition_records`; without materializing the table. Their keys are deleted
+        in batches, per `Tree.delete_many`
         """
         self.begin_scope()
-        # 1. iterate over source dataset
-        # materializing the entire recordset is expensive, but cleaner/easier/faster to implement
-        resp = self.materialize(stmnt.table_name)
-        assert resp.success
-        rsname = resp.body
+        try:
+            table_name = stmnt.table_name.table_name.lower()
+            if not self.state_manager.has_schema(table_name):
+                return Response(
+                    False, error_message=f"Table [{table_name}] does not exist"
+                )
 
-        if stmnt.where_condition:
-            resp = self.filter_recordset(stmnt.where_condition, rsname)
-            assert resp.success
-            rsname = resp.body
+            condition = None
+            if stmnt.where_condition:
+                condition = self.rewriter.rewrite_condition(
+                    stmnt.where_condition.condition
+                )
+            # if the condition only references the primary key, only keys are read
+            key_only = self.is_key_only(
+                SingleSource(stmnt.table_name), [condition] if condition else []
+            )
+
+            # delete each batch; the scan is resumed after the batch is deleted
+            tree = self.get_tree(table_name)
+            del_keys = []
+            for record_batch in self.matching_record_batches(
+                table_name, condition, key_only
+            ):
+                key_batch = [record.get_primary_key() for record in record_batch]
+                resp = tree.delete_many(key_batch)
+                if resp != TreeDeleteResult.Success:
+                    # the row counts of the batches deleted so far, have been adjusted
+                    logging.warning(f"delete failed for keys {key_batch}")
+                    return Response(False, resp)
+                self.state_manager.adjust_row_count(table_name, -len(key_batch))
+                del_keys.extend(key_batch)
+
+            # return list of deleted keys
+            return Response(True, body=del_keys)
+        finally:
+            self.end_scope()
+
+    def matching_record_batches(
+        self, table_name: str, condition: Optional[Symbol], key_only: bool = False
+    ) -> Iterable[List[SimpleRecord]]:
+        """
+        Generate, in key order, the table's records that satisfy (the unqualified) `condition`,
+        per `condition_records`, in batches of at most `modify_batch_size` records.
+
+        Each batch is found by a new scan, that seeks past the previous batch's last key;
+        hence the consumer may modify the table between batches.
+        """
+        batch_size = self.config.modify_batch_size
+        start_key = None
+        while True:
+            record_batch = list(
+                islice(
+                    self.condition_records(
+                        table_name, condition, key_only=key_only, start_key=start_key
+                    ),
+                    batch_size,
+                )
+            )
+            if record_batch:
+                yield record_batch
+            if len(record_batch) < batch_size:
+                return
+            start_key = record_batch[-1].get_primary_key() + 1
 
-        # 2. create list of keys to delete
-        del_keys = []
-        for record in self.recordset_iter(rsname):
-            del_keys.append(record.get_primary_key())
+    def visit_update_stmnt(self, stmnt: UpdateStmnt) -> Response:
+        """
+        handle update stmnt.
+        The records to update are found by the same access path as a select's scan of a single
+        table, i.e. `condition_records`, in batches; without materializing the table
+        """
+        self.begin_scope()
+        table_name = stmnt.table_name.table_name.lower()
+        if not self.state_manager.has_schema(table_name):
+            return Response(False, error_message=f"Table [{table_name}] does not exist")
 
-        # 3. delete the keys
-        table_name = stmnt.table_name.table_name
+        schema = self.get_schema(table_name)
+        column_name = stmnt.column_name.name.lower()
+        column = schema.get_column_by_name(column_name)
+        if column is None:
+            return Response(
+                False,
+                error_message=f"Column [{column_name}] does not exist in table [{table_name}]",
+            )
+        if column.is_primary_key:
+            # the key determines the cell's position in the tree
+            return Response(
+                False,
+                error_message=f"Primary key column [{column_name}] can not be updated",
+            )
+
+        condition = None
+        if stmnt.where_condition:
+            condition = self.rewriter.rewrite_condition(stmnt.where_condition.condition)
+
+        # rewrite the cells of each batch of matching records; the scan is resumed
+        # after the batch is updated
         tree = self.get_tree(table_name)
-        for del_key in del_keys:
-            resp = tree.delete(del_key)
-            if resp != TreeDeleteResult.Success:
-                logging.warning(f"delete failed for key {del_key}")
-                return Response(False, resp)
+        updated_keys = []
+        for record_batch in self.matching_record_batches(table_name, condition):
+            for record in record_batch:
+                values = record.values.copy()
+                values[column_name] = stmnt.value.value
+                updated_record = SimpleRecord(values, schema)
+                resp = validate_record(updated_record)
+                if not resp.success:
+                    return Response(
+                        False,
+                        error_message=f"Update record failed due to [{resp.error_message}]",
+                    )
+                resp = serialize_record(updated_record)
+                assert (
+                    resp.success
+                ), f"serialize record failed due to {resp.error_message}"
+                resp = tree.update(resp.body)
+                assert (
+                    resp == TreeUpdateResult.Success
+                ), f"Update op failed with status: {resp}"
+                self.widen_zone_maps(table_name, updated_record)
+                updated_keys.append(updated_record.get_primary_key())
 
         self.end_scope()
-        # return list of deleted keys
-        return Response(True, body=del_keys)
+        # return list of updated keys
+        return Response(True, body=updated_keys)
 
     # section : general statement helpers
 
@@ -582,38 +838,785 @@ class VirtualMachine(Visitor):
         else:
             return self.state_manager.get_tree(table_name)
 
+    def lookup_record(self, table_name: str, key: int) -> Optional[SimpleRecord]:
+        """
+        Point lookup: return record with primary `key` in table, or None if it doesn't exist
+        """
+        bloom_filter = self.get_bloom_filter(table_name.lower())
+        if bloom_filter is not None and not bloom_filter.may_contain(key):
+            # the key doesn't exist; the tree isn't descended
+            return None
+        cell = self.get_tree(table_name).find_cell(key)
+        self.io_counters.pages_read += 1
+        if cell is None:
+            return None
+        self.io_counters.bytes_deserialized += len(cell)
+        resp = deserialize_cell(cell, self.get_schema(table_name))
+        assert resp.success
+        return resp.body
+
+    def table_records(
+        self,
+        table_name: str,
+        start_rank: int = 0,
+        key_only: bool = False,
+        zone_filters: Optional[List[Tuple[ZoneMap, ComparisonOp, Any]]] = None,
+        start_key: Optional[int] = None,
+    ) -> Iterable[SimpleRecord]:
+        """
+        Lazily generate the table's records, in primary key order; starting at the
+        record with rank `start_rank`, or if `start_key` is passed, at the first record
+        with key not less than it.
+        If `key_only` is set, only the cells' keys are read, i.e. the cells are not
+        deserialized, and the records' other columns are null.
+        Leaves whose records, per `zone_filters`, i.e. (zone map, operator, value) triples,
+        can't satisfy <column> <operator> <value>, are skipped.
+        """
+        schema = self.get_schema(table_name)
+        cursor = Cursor(self.state_manager.get_pager(), self.get_tree(table_name))
+        if start_key is not None:
+            cursor.seek_key(start_key)
+        elif start_rank:
+            cursor.seek_rank(start_rank)
+        if key_only:
+            primary_key = schema.get_primary_key_column()
+            null_values = dict.fromkeys(column.name for column in schema.columns)
+        page_num = None
+        while cursor.end_of_table is False:
+            if cursor.page_num != page_num:
+                page_num = cursor.page_num
+                if zone_filters and self.can_skip_leaf(page_num, zone_filters):
+                    cursor.next_leaf()
+                    continue
+                self.io_counters.pages_read += 1
+            if key_only:
+                values = null_values.copy()
+                values[primary_key] = cursor.get_key()
+                yield SimpleRecord(values, schema)
+                cursor.advance()
+                continue
+            cell = cursor.get_cell()
+            self.io_counters.bytes_deserialized += len(cell)
+            resp = deserialize_cell(cell, schema)
+            assert resp.success
+            yield resp.body
+            cursor.advance()
+
+    def condition_records(
+        self,
+        table_name: str,
+        condition: Optional[Symbol],
+        start_rank: int = 0,
+        key_only: bool = False,
+        start_key: Optional[int] = None,
+    ) -> Iterable[SimpleRecord]:
+        """
+        Lazily generate, in primary key order, the table's records that satisfy (the unqualified)
+        `condition`. This is the access path for a single table, of select, update and delete:
+            - if the condition fixes the primary key, the record is looked up
+            - otherwise the table is scanned; the scan seeks to the low end of the condition's
+              range over the primary key, stops past its high end, and skips leaves per zone maps
+        Records with keys less than `start_key`, if passed, are skipped. The scan starts at the
+        record with rank `start_rank`, if passed; and if `key_only` is set, only reads keys.
+        """
+        schema = self.get_schema(table_name)
+        low, high = self.find_primary_key_range(
+            condition, schema.get_primary_key_column()
+        )
+        if start_key is not None:
+            low = start_key if low is None else max(low, start_key)
+        matches = self.compile_expression(condition, schema)
+
+        if low is not None and low == high:
+            # point lookup
+            record = self.lookup_record(table_name, low)
+            if record is not None and (matches is None or matches(record)):
+                yield record
+            return
+
+        # zone maps are built when first used, i.e. when the scan is pulled from
+        zone_map_filters = [
+            (self.get_zone_map(table_name, column_name), operator, value)
+            for column_name, operator, value in self.find_zone_filters(
+                table_name, condition
+            )
+        ]
+        for record in self.table_records(
+            table_name, start_rank, key_only, zone_map_filters, start_key=low
+        ):
+            if high is not None and record.get_primary_key() > high:
+                return
+            if matches is not None and not matches(record):
+                continue
+            yield record
+
+    def can_skip_leaf(
+        self, page_num: int, zone_filters: List[Tuple[ZoneMap, ComparisonOp, Any]]
+    ) -> bool:
+        """
+        Whether, per any of the zone filters, none of the leaf's records can match;
+        only the leaf's first and last keys are read
+        """
+        node = self.state_manager.get_pager().get_page(page_num)
+        first_key = Tree.leaf_node_key(node, 0)
+        last_key = Tree.leaf_node_key(node, Tree.leaf_node_num_cells(node) - 1)
+        return any(
+            zone_map.can_skip(first_key, last_key, operator, value)
+            for zone_map, operator, value in zone_filters
+        )
+
+    def compile_expression(
+        self,
+        expr: Optional[Symbol],
+        schema: AbstractSchema,
+        left_width: Optional[int] = None,
+    ) -> Optional[CompiledExpression]:
+        """
+        Compile `expr` into a closure, over records conforming to `schema`; or over
+        JoinedRecordViews with `left_width` left slots. None if there is no `expr`.
+        """
+        if expr is None:
+            return None
+        return self.compiler.compile(expr, schema, left_width)
+
+    # section : zone map helpers
+
+    def find_zone_filters(
+        self, table_name: str, condition: Optional[Symbol]
+    ) -> List[Tuple[str, ComparisonOp, Any]]:
+        """
+        Find conjuncts of (the unqualified) `condition` like <column> <op> <number>, where
+        the column is configured to have a zone map; return these as (column name, op, number)
+        """
+        zone_map_columns = {
+            column_name.lower()
+            for column_name in self.config.zone_map_columns.get(table_name, [])
+        }
+        if condition is None or not zone_map_columns:
+            return []
+        schema = self.get_schema(table_name)
+        zone_filters = []
+        for conjunct in split_conjuncts(condition):
+            # the rewriter normalizes comparisons to <column> <op> <literal>
+            if not (
+                isinstance(conjunct, Comparison)
+                and isinstance(conjunct.left_op, ColumnName)
+                and isinstance(conjunct.right_op, Literal)
+            ):
+                continue
+            column_name = conjunct.left_op.name.lower()
+            column = schema.get_column_by_name(column_name)
+            value = conjunct.right_op.value
+            if (
+                column_name in zone_map_columns
+                and column is not None
+                and column.datatype in (Integer, Real)
+                and isinstance(value, (int, float))
+                and not isinstance(value, bool)
+            ):
+                zone_filters.append((column_name, conjunct.operator, value))
+        return zone_filters
+
+    def get_zone_map(self, table_name: str, column_name: str) -> ZoneMap:
+        """
+        Return the column's zone map; building it, if it doesn't exist
+        """
+        zone_map = self.state_manager.get_zone_maps(table_name).get(column_name)
+        if zone_map is None:
+            zone_map = self.build_zone_map(table_name, column_name)
+            self.state_manager.register_zone_map(table_name, column_name, zone_map)
+        return zone_map
+
+    def build_zone_map(self, table_name: str, column_name: str) -> ZoneMap:
+        """
+        Build the column's zone map, with a zone per leaf, in one pass over the table
+        """
+        zone_map = ZoneMap()
+        schema = self.get_schema(table_name)
+        cursor = Cursor(self.state_manager.get_pager(), self.get_tree(table_name))
+        page_num = None
+        while cursor.end_of_table is False:
+            key = cursor.get_key()
+            if cursor.page_num != page_num:
+                page_num = cursor.page_num
+                self.io_counters.pages_read += 1
+                zone_map.add_zone(key)
+            cell = cursor.get_cell()
+            self.io_counters.bytes_deserialized += len(cell)
+            resp = deserialize_cell(cell, schema)
+            assert resp.success
+            zone_map.widen(key, resp.body.values[column_name])
+            cursor.advance()
+        return zone_map
+
+    def widen_zone_maps(self, table_name: str, record: SimpleRecord):
+        """
+        Widen the table's zone maps, with an inserted `record`
+        """
+        key = record.get_primary_key()
+        for column_name, zone_map in self.state_manager.get_zone_maps(
+            table_name
+        ).items():
+            zone_map.widen(key, record.values.get(column_name))
+
+    # section : bloom filter helpers
+
+    def get_bloom_filter(self, table_name: str) -> Optional[BloomFilter]:
+        """
+        Return the Bloom filter over the table's keys; building it if the table is configured
+        to have one, and it doesn't exist, e.g. it's missing from a database file. None if the
+        table has no Bloom filter.
+        """
+        bloom_filter = self.state_manager.get_bloom_filter(table_name)
+        if bloom_filter is None and table_name in (
+            name.lower() for name in self.config.bloom_filter_tables
+        ):
+            if table_name == CATALOG or not self.state_manager.has_schema(table_name):
+                return None
+            bloom_filter = self.build_bloom_filter(table_name)
+            self.state_manager.register_bloom_filter(table_name, bloom_filter)
+        return bloom_filter
+
+    def build_bloom_filter(self, table_name: str) -> BloomFilter:
+        """
+        Build a Bloom filter, in a newly allocated page, over the table's keys; only
+        the keys are read, i.e. the cells are not deserialized
+        """
+        pager = self.state_manager.get_pager()
+        page_num = pager.get_unused_page_num()
+        bloom_filter = BloomFilter(pager.get_page(page_num), page_num)
+        # the page may have been returned, i.e. may hold stale bytes
+        bloom_filter.clear()
+        cursor = Cursor(pager, self.get_tree(table_name))
+        page_num = None
+        while cursor.end_of_table is False:
+            if cursor.page_num != page_num:
+                page_num = cursor.page_num
+                self.io_counters.pages_read += 1
+            bloom_filter.add(cursor.get_key())
+            cursor.advance()
+        return bloom_filter
+
+    # section : row count helpers
+
+    def persist_table_metadata(self):
+        """
+        Write the tables' row counts, and Bloom filter pages, that changed, to their
+        catalog records.
+        NOTE: row counts are maintained in memory, and persisted when the database is
+        closed; like the tables' pages, which are only flushed by the pager on close.
+        """
+        catalog_tree = self.state_manager.get_catalog_tree()
+        catalog_schema = self.state_manager.get_catalog_schema()
+        cursor = Cursor(self.state_manager.get_pager(), catalog_tree)
+        # the catalog can't be modified while it's iterated
+        stale_records = []
+        while cursor.end_of_table is False:
+            resp = deserialize_cell(cursor.get_cell(), catalog_schema)
+            assert resp.success, "deserialize failed while reading catalog"
+            table_record = resp.body
+            row_count = self.state_manager.get_row_count(table_record.get("name"))
+            if row_count is None:
+                row_count = table_record.get("row_count")
+            bloom_filter = self.state_manager.get_bloom_filter(table_record.get("name"))
+            bloom_filter_page_num = (
+                bloom_filter.page_num if bloom_filter is not None else None
+            )
+            if row_count != table_record.get(
+                "row_count"
+            ) or bloom_filter_page_num != table_record.get("bloom_filter_pagenum"):
+                stale_records.append((table_record, row_count, bloom_filter_page_num))
+            cursor.advance()
+
+        for table_record, row_count, bloom_filter_page_num in stale_records:
+            resp = create_catalog_record(
+                table_record.get("pkey"),
+                table_record.get("name"),
+                table_record.get("root_pagenum"),
+                table_record.get("sql_text"),
+                catalog_schema,
+                row_count,
+                bloom_filter_page_num,
+            )
+            assert resp.success, f"catalog record failed due to {resp.error_message}"
+            resp = serialize_record(resp.body)
+            assert resp.success, f"serialize record failed due to {resp.error_message}"
+            catalog_tree.delete(table_record.get("pkey"))
+            catalog_tree.insert(resp.body)
+
+    def find_row_count_aggregates(
+        self, from_clause: FromClause, aggregate_exprs: List[Symbol]
+    ) -> Optional[Tuple[str, Dict[AggregateKey, int]]]:
+        """
+        Determine whether the aggregates can be computed from the table's row count, i.e.
+        without a scan. This is the case when the source is a single table, that is
+        not filtered or grouped, and each aggregate is a count of the table's primary key,
+        which is never null. If so, return the table name, and the aggregate values.
+        """
+        source = from_clause.source.source
+        if isinstance(source, TableName):
+            source = SingleSource(source)
+        if (
+            not isinstance(source, SingleSource)
+            or from_clause.where_clause is not None
+            or from_clause.group_by_clause is not None
+        ):
+            return None
+        table_name = source.table_name.table_name.lower()
+        row_count = self.state_manager.get_row_count(table_name)
+        if row_count is None:
+            return None
+        primary_key = self.get_schema(table_name).get_primary_key_column()
+
+        aggregate_values = {}
+        for expr in aggregate_exprs:
+            for func_call in expr.find_descendents(FuncCall):
+                if not is_aggregate_function(func_call.name):
+                    continue
+                resp = resolve_aggregate_func_name(func_call.name)
+                if not isinstance(resp.body.accumulator, CountAccumulator):
+                    return None
+                if len(func_call.args) != 1:
+                    return None
+                column = func_call.args[0]
+                if isinstance(column, Expr):
+                    column = column.expr
+                if not isinstance(column, ColumnName) or not self.is_primary_key_column(
+                    column, source, primary_key
+                ):
+                    return None
+                aggregate_values[aggregate_key(func_call.name, column.name)] = row_count
+        if not aggregate_values:
+            return None
+        return table_name, aggregate_values
+
+    def is_key_only(self, source: SingleSource, exprs: List[Symbol]) -> bool:
+        """
+        Determine whether the only column referenced in `exprs` (e.g. clauses of a statement)
+        over the single `source`, is the table's primary key. If so, the source can be scanned
+        by reading only the keys of its records.
+        """
+        table_name = source.table_name.table_name.lower()
+        if table_name != CATALOG and not self.state_manager.has_schema(table_name):
+            return False
+        primary_key = self.get_schema(table_name).get_primary_key_column()
+        for expr in exprs:
+            # nested selects reference columns of their own sources
+            if expr.find_descendents(SelectStmnt):
+                return False
+            for column in expr.find_descendents(ColumnName):
+                if not self.is_primary_key_column(column, source, primary_key):
+                    return False
+        return True
+
+    @staticmethod
+    def find_primary_key_range(
+        condition: Optional[Symbol], primary_key: str
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Return the (inclusive) range of keys that can satisfy (the rewritten, unqualified)
+        `condition`, per its conjuncts like <primary key> <op> <integer>; as (low, high),
+        where a None bound is unbounded
+        """
+        low = high = None
+        if condition is None:
+            return low, high
+        for conjunct in split_conjuncts(condition):
+            if not (
+                isinstance(conjunct, Comparison)
+                and isinstance(conjunct.left_op, ColumnName)
+                and conjunct.left_op.name.lower() == primary_key
+                and isinstance(conjunct.right_op, Literal)
+                and conjunct.right_op.type == SymbolicDataType.Integer
+            ):
+                continue
+            value = conjunct.right_op.value
+            operator = conjunct.operator
+            if operator in (ComparisonOp.Greater, ComparisonOp.GreaterEqual):
+                bound = value + 1 if operator == ComparisonOp.Greater else value
+                low = bound if low is None else max(low, bound)
+            elif operator in (ComparisonOp.Less, ComparisonOp.LessEqual):
+                bound = value - 1 if operator == ComparisonOp.Less else value
+                high = bound if high is None else min(high, bound)
+            elif operator == ComparisonOp.Equal:
+                low = value if low is None else max(low, value)
+                high = value if high is None else min(high, value)
+        return low, high
+
+    @staticmethod
+    def is_primary_key_column(
+        column: ColumnName, source: SingleSource, primary_key: str
+    ) -> bool:
+        """
+        Whether `column` is the primary key of the single `source`
+        """
+        # with an alias, columns are qualified by the alias
+        column_name = column.name
+        if source.table_alias is not None:
+            if not column_name.startswith(f"{source.table_alias}."):
+                return False
+            column_name = column_name.split(".", 1)[1]
+        return column_name.lower() == primary_key
+
+    # section : statistics helpers
+
+    def ensure_stats_catalog(self) -> Response:
+        """
+        Create the stats catalog table, if it doesn't exist
+        """
+        if self.state_manager.has_schema(STATS_CATALOG):
+            return Response(True)
+        parser = SqlFrontEnd()
+        parser.parse(schema_to_ddl(StatsCatalogSchema()))
+        assert parser.is_success(), "stats catalog ddl parse failed"
+        return self.visit_create_stmnt(parser.get_parsed().statements[0])
+
+    def analyze_table(self, table_name: str) -> TableStatistics:
+        """
+        Collect statistics of the table, in one pass over its records
+        """
+        statistics = collect_table_statistics(
+            self.table_records(table_name), self.get_schema(table_name)
+        )
+        statistics.page_count, statistics.tree_height = self.get_tree(
+            table_name
+        ).shape()
+        return statistics
+
+    def store_table_statistics(self, table_name: str, statistics: TableStatistics):
+        """
+        Upsert the table's statistics into the stats catalog
+        """
+        stats_tree = self.get_tree(STATS_CATALOG)
+        key = self.get_tree(table_name).root_page_num
+        if stats_tree.find_cell(key) is not None:
+            stats_tree.delete(key)
+            self.state_manager.adjust_row_count(STATS_CATALOG, -1)
+        record = SimpleRecord(
+            {
+                "pkey": key,
+                "table_name": table_name,
+                "row_count": statistics.row_count,
+                "page_count": statistics.page_count,
+                "tree_height": statistics.tree_height,
+                "column_stats": statistics.column_statistics_to_json(),
+            },
+            self.get_schema(STATS_CATALOG),
+        )
+        resp = serialize_record(record)
+        assert resp.success, f"serialize record failed due to {resp.error_message}"
+        resp = stats_tree.insert(resp.body)
+        assert resp == TreeInsertResult.Success, f"Insert op failed with status: {resp}"
+        self.state_manager.adjust_row_count(STATS_CATALOG, 1)
+
+    def delete_table_statistics(self, table_name: str):
+        """
+        Delete the table's statistics from the stats catalog, if any
+        """
+        if not self.state_manager.has_schema(STATS_CATALOG):
+            return
+        key = self.get_tree(table_name).root_page_num
+        record = self.lookup_record(STATS_CATALOG, key)
+        if record is not None and record.get("table_name") == table_name:
+            self.get_tree(STATS_CATALOG).delete(key)
+            self.state_manager.adjust_row_count(STATS_CATALOG, -1)
+
+    def get_table_statistics(self, table_name: str) -> TableStatistics:
+        """
+        Return statistics of the table; these are the statistics collected by the last
+        ANALYZE of the table. Otherwise, the primary key's values are distinct.
+        In either case, the row count is the table's current, exact, row count.
+        """
+        row_count = self.state_manager.get_row_count(table_name)
+        if row_count is None:
+            row_count = self.get_tree(table_name).count_cells()
+        if self.state_manager.has_schema(STATS_CATALOG):
+            record = self.lookup_record(
+                STATS_CATALOG, self.get_tree(table_name).root_page_num
+            )
+            # the key, i.e. root page, may have been reused by a different table
+            if record is not None and record.get("table_name") == table_name:
+                return TableStatistics(
+                    row_count,
+                    TableStatistics.column_statistics_from_json(
+                        record.get("column_stats")
+                    ),
+                    page_count=record.get("page_count"),
+                    tree_height=record.get("tree_height"),
+                )
+
+        schema = self.get_schema(table_name)
+        return TableStatistics(
+            row_count,
+            distinct_counts={schema.get_primary_key_column().lower(): row_count},
+        )
+
+    # section : explain helpers
+
+    def describe_operator(
+        self, name: str, detail: Optional[str] = None, *input_rsnames: str
+    ) -> Optional[Operator]:
+        """
+        Describe an operator that consumes the recordsets `input_rsnames`;
+        None, if no statement is being explained
+        """
+        if self.profile is None:
+            return None
+        return self.profile.describe(name, detail, input_rsnames)
+
+    def write_query_plan(self, rsname: str):
+        """
+        Write the tree of operators, that generate the recordset `rsname`, to the output pipe
+        """
+        root = self.profile.get_operator(rsname)
+        records = self.recordset_iter(rsname)
+        if root is None:
+            # a select without a from clause
+            root = Operator("Result")
+            records = self.profile.instrument(records, root)
+        # with analyze, the select is executed; but its records are discarded
+        for _ in records:
+            pass
+
+        resp = generate_unvalidated_schema("query_plan", [Column("query_plan", Text)])
+        assert resp.success
+        schema = resp.body
+        for line in self.profile.format(root):
+            resp = create_record_from_raw_values(["query_plan"], [line], schema)
+            assert resp.success
+            self.output_pipe.write(resp.body)
+
     # section : select statement helpers
 
-    def materialize(self, source) -> Response:
+    def rewrite_conditions(self, from_clause: FromClause):
+        """
+        Rewrite the where, join, and having conditions of `from_clause` (in place) into
+        their simplified form; see ExpressionRewriter. A where condition that is
+        always true is dropped.
+        """
+        if from_clause.where_clause:
+            condition = self.rewriter.rewrite_condition(
+                from_clause.where_clause.condition
+            )
+            if is_boolean_literal(condition, True):
+                from_clause.where_clause = None
+            else:
+                from_clause.where_clause.condition = condition
+        source = from_clause.source.source
+        if isinstance(source, Joining):
+            for join in flatten_joining(source)[1]:
+                if isinstance(join, ConditionedJoin):
+                    join.condition = self.rewriter.rewrite_condition(join.condition)
+        if from_clause.having_clause:
+            from_clause.having_clause.condition = self.rewriter.rewrite_condition(
+                from_clause.having_clause.condition
+            )
+
+    def push_down_predicates(
+        self, source, where_clause: WhereClause
+    ) -> Tuple[Dict[Optional[str], Symbol], List[Symbol]]:
+        """
+        Determine which conjuncts of the where clause reference columns of a single source,
+        and hence can be evaluated when the source is scanned. Conjuncts over sources
+        that an outer join null-extends are not pushed down.
+
+        Returns a dict of source name (i.e. the alias, or the table name in a joining; None for an
+        unaliased single source) to the (unqualified) condition to evaluate over the
+        source's records, and the residual conjuncts.
+        """
+        if isinstance(source, TableName):
+            source = SingleSource(source)
+        if isinstance(source, SingleSource):
+            candidates = {source.table_alias: source}
+        else:
+            sources, joins = flatten_joining(source)
+            null_supplied = null_supplied_sources(joins)
+            candidates = {}
+            duplicates = set()
+            for index, single_source in enumerate(sources):
+                name = single_source.table_alias or single_source.table_name.table_name
+                if name in candidates:
+                    duplicates.add(name)
+                if index not in null_supplied:
+                    candidates[name] = single_source
+            for name in duplicates:
+                candidates.pop(name, None)
+
+        pushed = defaultdict(list)
+        residual = []
+        for conjunct in split_conjuncts(where_clause.condition):
+            columns = referenced_columns(conjunct)
+            names = {column.get_parent_alias() for column in columns}
+            if len(names) == 1:
+                name = names.pop()
+                single_source = candidates.get(name)
+                if single_source is not None and self.source_has_columns(
+                    single_source, columns
+                ):
+                    pushed[name].append(unqualify(conjunct))
+                    continue
+            residual.append(conjunct)
+
+        return {
+            name: conjoin(conjuncts) for name, conjuncts in pushed.items()
+        }, residual
+
+    def source_has_columns(
+        self, source: SingleSource, columns: List[ColumnName]
+    ) -> bool:
+        """
+        Whether the source's table exists, and has all the `columns`
+        """
+        table_name = source.table_name.table_name.lower()
+        if table_name != CATALOG and not self.state_manager.has_schema(table_name):
+            return False
+        schema = self.get_schema(table_name)
+        return all(schema.has_column(column.get_base_name()) for column in columns)
+
+    def plan_joining(
+        self,
+        source: Joining,
+        pushed_conditions: Dict[Optional[str], Symbol],
+        residual: List[Symbol],
+    ) -> Tuple[Optional[JoinPlan], List[Symbol]]:
+        """
+        If `source` is a chain of inner (or cross) joins, plan the order, and algorithm, of
+        the joins from table statistics. The join conditions, and the `residual` where conjuncts
+        over multiple sources, are evaluated by the joins.
+
+        Returns the plan (None, if the joins must be evaluated as written) and the
+        remaining residual conjuncts.
+        """
+        sources, joins = flatten_joining(source)
+        if any(
+            join.join_type not in (JoinType.Inner, JoinType.Cross) for join in joins
+        ):
+            return None, residual
+
+        relations = {}
+        for single_source in sources:
+            name = single_source.table_alias or single_source.table_name.table_name
+            table_name = single_source.table_name.table_name.lower()
+            if name in relations or (
+                table_name != CATALOG and not self.state_manager.has_schema(table_name)
+            ):
+                # let the join, as written, report the error
+                return None, residual
+            schema = self.get_schema(table_name)
+            statistics = self.get_table_statistics(table_name)
+            pushed = pushed_conditions.get(name)
+            selectivity = (
+                estimate_selectivity(split_conjuncts(pushed), statistics)
+                if pushed is not None
+                else 1.0
+            )
+            relations[name] = Relation(
+                name,
+                single_source,
+                schema,
+                statistics,
+                statistics.row_count * selectivity,
+            )
+
+        def resolvable(conjunct: Symbol) -> bool:
+            # whether every column is qualified with a source, and exists in it
+            for column in referenced_columns(conjunct):
+                relation = relations.get(column.get_parent_alias())
+                if relation is None or not relation.schema.has_column(
+                    column.get_base_name()
+                ):
+                    return False
+            return True
+
+        conjuncts = []
+        for join in joins:
+            if join.join_type == JoinType.Inner:
+                conjuncts.extend(split_conjuncts(join.condition))
+        if not all(resolvable(conjunct) for conjunct in conjuncts):
+            return None, residual
+
+        remaining = []
+        for conjunct in residual:
+            if resolvable(conjunct) and referenced_columns(conjunct):
+                conjuncts.append(conjunct)
+            else:
+                remaining.append(conjunct)
+
+        plan = plan_join_order(list(relations.values()), conjuncts)
+        if plan is None:
+            return None, residual
+        return plan, remaining
+
+    def materialize(
+        self,
+        source,
+        pushed_conditions: Optional[Dict[Optional[str], Symbol]] = None,
+        join_plan: Optional[JoinPlan] = None,
+        start_rank: int = 0,
+        key_only: bool = False,
+    ) -> Response:
         """
         Materialize source.
+        `pushed_conditions` are conditions to evaluate when scanning a single source;
+        see push_down_predicates. If source is a joining, and `join_plan` is passed,
+        the joins are evaluated per the plan. If source is a single source, its scan
+        starts at the record with rank `start_rank`, and if `key_only` is set, only reads keys.
         """
+        pushed_conditions = pushed_conditions or {}
         if isinstance(source, SingleSource):
             # NOTE: single source means a single physical table
-            return self.materialize_single_source(source)
+            return self.materialize_single_source(
+                source, pushed_conditions.get(source.table_alias), start_rank, key_only
+            )
 
         elif isinstance(source, TableName):
             source = SingleSource(source)
-            return self.materialize_single_source(source)
+            return self.materialize_single_source(
+                source, pushed_conditions.get(None), start_rank, key_only
+            )
 
         elif isinstance(source, Joining):
-            return self.materialize_joining(source)
+            if join_plan is not None:
+                return self.materialize_join_plan(join_plan, pushed_conditions)
+            return self.materialize_joining(source, pushed_conditions)
 
         else:
             raise ValueError(f"Unknown materialization source type {source}")
 
-    def materialize_single_source(self, source: SingleSource) -> Response:
+    def materialize_single_source(
+        self,
+        source: SingleSource,
+        condition: Optional[Symbol] = None,
+        start_rank: int = 0,
+        key_only: bool = False,
+    ) -> Response:
         """
         Materialize single source and return
         """
         assert isinstance(source, SingleSource), f"Unexpected {source}"
 
         # does table_names need to be resolved?
-        return self.materialize_source_from_name(source.table_name, source.table_alias)
+        return self.materialize_source_from_name(
+            source.table_name, source.table_alias, condition, start_rank, key_only
+        )
 
     def materialize_source_from_name(
-        self, table_name: TableName, table_alias: str = None
+        self,
+        table_name: TableName,
+        table_alias: str = None,
+        condition: Optional[Symbol] = None,
+        start_rank: int = 0,
+        key_only: bool = False,
     ) -> Response:
+        """
+        Materialize a (pipelined) scan over the table.
+        If `condition` is passed, only records that satisfy it are generated; the
+        condition is evaluated on the table's (unaliased) records. The records are
+        found per `condition_records`.
+        If `start_rank` is passed, the scan starts at the record with this rank, i.e.
+        the preceding records are skipped without being read.
+        If `key_only` is set, only the records' keys are read; other columns are null.
+        """
         # unwrap table_name
         table_name = table_name.table_name.lower()
 
@@ -621,9 +1624,8 @@ class VirtualMachine(Visitor):
         if table_name != CATALOG and not self.state_manager.has_schema(table_name):
             return Response(False, error_message=f"table {table_name} not found")
 
-        # get schema for table, and cursor on tree corresponding to table
+        # get schema for table
         schema = self.get_schema(table_name)
-        tree = self.get_tree(table_name)
 
         if table_alias is not None:
             # record set schema is a scoped schema, since that contains
@@ -633,34 +1635,56 @@ class VirtualMachine(Visitor):
         else:
             rs_schema = schema
 
-        resp = self.init_recordset(rs_schema)
-        assert resp.success
-        rsname = resp.body
+        def scan():
+            # iterate over the matching records; or until the consumer stops pulling records
+            for record in self.condition_records(
+                table_name, condition, start_rank, key_only
+            ):
+                # if an alias is defined
+                if table_alias:
+                    record = ScopedRecord.from_single_simple_record(
+                        record, table_alias, rs_schema
+                    )
+                yield record
 
-        cursor = Cursor(self.state_manager.get_pager(), tree)
-        # iterate over entire table
-        while cursor.end_of_table is False:
-            cell = cursor.get_cell()
-            resp = deserialize_cell(cell, schema)
-            assert resp.success
-            record = resp.body
-            # if an alias is defined
-            record = (
-                ScopedRecord.from_single_simple_record(record, table_alias, rs_schema)
-                if table_alias
-                else record
+        low, high = self.find_primary_key_range(
+            condition, schema.get_primary_key_column()
+        )
+        zone_filters = self.find_zone_filters(table_name, condition)
+        detail = table_name if table_alias is None else f"{table_name} {table_alias}"
+        if condition is not None:
+            detail += f" filter: {expression_to_sql(condition)}"
+        if low is not None and low == high:
+            detail += f" lookup: {low}"
+        elif low is not None or high is not None:
+            detail += f" key range: {'' if low is None else low}..{'' if high is None else high}"
+        if start_rank:
+            detail += f" from rank {start_rank}"
+        if zone_filters:
+            zone_map_columns = dict.fromkeys(
+                column_name for column_name, _, _ in zone_filters
             )
+            detail += f" zone maps: {', '.join(zone_map_columns)}"
+        # a table is scanned in primary key order
+        return self.init_recordset(
+            rs_schema,
+            scan(),
+            ordering=(primary_key_slot(schema),),
+            operator=self.describe_operator(
+                "KeyOnlyScan" if key_only else "Scan", detail
+            ),
+        )
 
-            self.append_recordset(rsname, record)
-            # advance cursor
-            cursor.advance()
-        return Response(True, body=rsname)
-
-    def materialize_joining(self, source: Joining) -> Response:
+    def materialize_joining(
+        self,
+        source: Joining,
+        pushed_conditions: Optional[Dict[Optional[str], Symbol]] = None,
+    ) -> Response:
         """
         Materialize a joining.
         After a pairwise joining of recordsets
         """
+        pushed_conditions = pushed_conditions or {}
         # parser places first table in a series of joins in the most nested
         # join; recursively traverse the join object(s) and construct a ordered list of
         # tables to materialize
@@ -680,11 +1704,13 @@ class VirtualMachine(Visitor):
         # starting from stack top, each materialization is the left_source
         # in the nest iteration of joining
         first = stack.pop()
-        resp = self.materialize(first)
+        left_source_name = first.table_alias or first.table_name.table_name
+        resp = self.materialize_single_source(
+            first, pushed_conditions.get(left_source_name)
+        )
         if not resp.success:
             return resp
         rsname = resp.body
-        left_source_name = first.table_alias or first.table_name.table_name
         while stack:
             # join next source with existing rset
             next_join = stack.pop()
@@ -698,7 +1724,9 @@ class VirtualMachine(Visitor):
             right_source_name = (
                 right_source.table_alias or right_source.table_name.table_name
             )
-            resp = self.materialize_single_source(right_source)
+            resp = self.materialize_single_source(
+                right_source, pushed_conditions.get(right_source_name)
+            )
             assert resp.success
             next_rsname = resp.body
 
@@ -715,7 +1743,59 @@ class VirtualMachine(Visitor):
             # the API will become clearer
 
             resp = self.join_recordset(
-                next_join, rsname, next_rsname, left_source_name, right_source_name
+                next_join,
+                rsname,
+                next_rsname,
+                left_source_name,
+                right_source_name,
+                pushed_conditions.get(right_source_name),
+            )
+            left_source_name = None
+            assert resp.success
+            rsname = resp.body
+
+        return Response(True, body=rsname)
+
+    def materialize_join_plan(
+        self,
+        join_plan: JoinPlan,
+        pushed_conditions: Dict[Optional[str], Symbol],
+    ) -> Response:
+        """
+        Materialize a joining, by joining sources in the order, and with the algorithms,
+        of `join_plan`.
+
+        NOTE: the joined records' slots are ordered per the plan, rather than as written;
+        this is not observable since columns are always referenced by name.
+        """
+        first = join_plan.first
+        resp = self.materialize_single_source(
+            first.source, pushed_conditions.get(first.name)
+        )
+        if not resp.success:
+            return resp
+        rsname = resp.body
+        left_source_name = first.name
+        for step in join_plan.steps:
+            right_source = step.relation.source
+            right_source_name = step.relation.name
+            resp = self.materialize_single_source(
+                right_source, pushed_conditions.get(right_source_name)
+            )
+            assert resp.success
+            condition = conjoin(step.conjuncts)
+            if condition is not None:
+                join_clause = ConditionedJoin(None, right_source, condition)
+            else:
+                join_clause = UnconditionedJoin(None, right_source)
+            resp = self.join_recordset(
+                join_clause,
+                rsname,
+                resp.body,
+                left_source_name,
+                right_source_name,
+                pushed_conditions.get(right_source_name),
+                step.algorithm,
             )
             left_source_name = None
             assert resp.success
@@ -734,20 +1814,25 @@ class VirtualMachine(Visitor):
         assert isinstance(where_clause, WhereClause)
 
         schema = self.get_recordset_schema(source_rsname)
-        resp = self.init_recordset(schema)
-        assert resp.success
-        # generate new result set
-        rsname = resp.body
-
-        for record in self.recordset_iter(source_rsname):
-            value = self.interpreter.evaluate_over_record(
-                where_clause.condition, record
-            )
-            assert isinstance(value, bool), f"Expected bool, received {type(value)}"
-            if value:
-                self.append_recordset(rsname, record)
+        source = self.recordset_iter(source_rsname)
+        condition = self.compile_expression(where_clause.condition, schema)
 
-        return Response(True, body=rsname)
+        def filtered():
+            for record in source:
+                value = condition(record)
+                assert isinstance(value, bool), f"Expected bool, received {type(value)}"
+                if value:
+                    yield record
+
+        # generate new (pipelined) result set; filtering preserves order
+        return self.init_recordset(
+            schema,
+            filtered(),
+            ordering=self.get_recordset_ordering(source_rsname),
+            operator=self.describe_operator(
+                "Filter", expression_to_sql(where_clause.condition), source_rsname
+            ),
+        )
 
     # section: having clause helpers
 
@@ -762,24 +1847,25 @@ class VirtualMachine(Visitor):
         assert isinstance(having_clause, HavingClause)
 
         schema = self.get_recordset_schema(source_rsname)
-        resp = self.init_grouped_recordset(schema)
-        assert resp.success
-        rsname = resp.body
+        operator = self.describe_operator(
+            "Having", expression_to_sql(having_clause.condition), source_rsname
+        )
 
         if isinstance(schema, GroupedSchema):
             # this is similar to the ungrouped case;
             # but we want to remove the groups for which the condition is false
-            for group_record in self.grouped_recordset_iter(source_rsname):
-                value = self.interpreter.evaluate_over_grouped_record(
-                    having_clause.condition, group_record
-                )
-                assert isinstance(value, bool), f"Expected bool, received {type(value)}"
-                if value:
-                    for record in group_record.get_group_recordset():
-                        self.append_grouped_recordset(
-                            rsname, group_record.group_key, record
-                        )
-            return Response(True, body=rsname)
+            def having():
+                for group_record in self.grouped_recordset_iter(source_rsname):
+                    value = self.interpreter.evaluate_over_grouped_record(
+                        having_clause.condition, group_record
+                    )
+                    assert isinstance(
+                        value, bool
+                    ), f"Expected bool, received {type(value)}"
+                    if value:
+                        yield group_record.group_key, group_record.get_aggregate_values()
+
+            return self.init_grouped_recordset(schema, having(), operator)
         else:
             assert isinstance(schema, ScopedSchema)
             raise NotImplementedError
@@ -793,6 +1879,8 @@ class VirtualMachine(Visitor):
         right_rsname: str,
         left_sname: Optional[str],
         right_sname: str,
+        right_condition: Optional[Symbol] = None,
+        algorithm: Optional[JoinAlgorithm] = None,
     ) -> Response:
         """
         join record based on record type and return joined recordset.
@@ -808,136 +1896,496 @@ class VirtualMachine(Visitor):
         :param right_rsname: right record set name (single source)
         :param left_sname: left source name (optional); when nulled' when left is joinedrecord
         :param right_sname: right source name
+        :param right_condition: condition pushed down into the right source's scan; since
+            an index nested-loop join looks up right records, instead of scanning, it must
+            evaluate this itself
+        :param algorithm: the join algorithm to use, if it applies; if not passed, merge,
+            index nested-loop, and hash joins are considered in that order
         """
         left_schema = self.get_recordset_schema(left_rsname)
         right_schema = self.get_recordset_schema(right_rsname)
         schema = ScopedSchema.from_schemas(
             left_schema, right_schema, left_sname, right_sname
         )
-        resp = self.init_recordset(schema)
-        assert resp.success
-        rsname = resp.body
-
+        join_type = join_clause.join_type
+        # joined records are flat tuples; the left values occupy the first slots
+        left_width = len(left_schema.columns)
         left_iter = self.recordset_iter(left_rsname)
-        # inner join
-        if join_clause.join_type == JoinType.Inner:
-            for left_rec in left_iter:
-                # for each left record we need to iterate over each right_record
-                right_iter = self.recordset_iter(right_rsname)
-                for right_rec in right_iter:
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
+        right_iter = self.recordset_iter(right_rsname)
+        # inner and left joins generate records in the order of the left input
+        left_ordering = (
+            self.get_recordset_ordering(left_rsname)
+            if join_type in (JoinType.Inner, JoinType.LeftOuter, JoinType.Cross)
+            else None
+        )
+        detail = JOIN_TYPE_NAMES[join_type]
+        if join_type != JoinType.Cross:
+            detail += f" on {expression_to_sql(join_clause.condition)}"
+
+        if join_type != JoinType.Cross:
+            # an equi-join, i.e. with one or more conjuncts like left.col = right.col,
+            # can be evaluated as a merge, index nested-loop, or hash join
+            keys, residual = find_equi_join_keys(
+                split_conjuncts(join_clause.condition), schema, left_width
+            )
+            if keys is not None:
+                key_index = None
+                if algorithm in (None, JoinAlgorithm.Merge):
+                    key_index = self.find_merge_join_key(
+                        keys,
+                        self.get_recordset_ordering(left_rsname),
+                        self.get_recordset_ordering(right_rsname),
                     )
-                    if self.interpreter.evaluate_over_record(
-                        join_clause.condition, record
-                    ):
-                        # join condition matched
-                        self.append_recordset(rsname, record)
-
-        elif join_clause.join_type == JoinType.LeftOuter:
-            for left_rec in left_iter:
-                # there should be at least one record each left record
-                left_record_added = False
-                right_iter = self.recordset_iter(right_rsname)
-                for right_rec in right_iter:
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
+                if key_index is not None:
+                    # both inputs are ordered on the key pair at `key_index`, e.g.
+                    # when primary keys are joined
+                    merge_keys = EquiJoinKeys(
+                        (keys.left_slots[key_index],), (keys.right_slots[key_index],)
                     )
-                    if self.interpreter.evaluate_over_record(
-                        join_clause.condition, record
-                    ):
-                        # join condition matched
-                        self.append_recordset(rsname, record)
-                        left_record_added = True
-                if not left_record_added:
-                    # add a null right record
-                    # create and join records
-                    right_rec = create_null_record(right_schema)
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
+                    records = self.merge_join(
+                        join_type,
+                        merge_keys,
+                        conjoin(residual),
+                        (record.to_tuple() for record in left_iter),
+                        (record.to_tuple() for record in right_iter),
+                        schema,
+                        left_width,
+                        other_keys=other_key_pairs(keys, key_index),
                     )
-                    self.append_recordset(rsname, record)
-
-        elif join_clause.join_type == JoinType.RightOuter:
-            # there should be at least one record for each right record
-            # NOTE: since the right is the inner record_set, we maintain the index on the
-            # index positions records in the right record set, and whether they have been joined.
-            # this is problematic because it assumes the iter order of records in a recordset
-            # will be the same, which isn't explicitly part of the recordset API
-            right_joined_index = [False for _ in self.recordset_iter(right_rsname)]
-            for left_rec in left_iter:
-                right_iter = self.recordset_iter(right_rsname)
-                for index, right_rec in enumerate(right_iter):
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
+                    return self.init_recordset(
+                        schema,
+                        records,
+                        ordering=left_ordering,
+                        operator=self.describe_operator(
+                            "MergeJoin", detail, left_rsname, right_rsname
+                        ),
                     )
-                    if self.interpreter.evaluate_over_record(
-                        join_clause.condition, record
-                    ):
-                        # join condition matched
-                        self.append_recordset(rsname, record)
-                        right_joined_index[index] = True
 
-            # handle any un-joined right records
-            for index, right_rec in enumerate(self.recordset_iter(right_rsname)):
-                if right_joined_index[index]:
-                    continue
-                left_rec = create_null_record(left_schema)
-                record = ScopedRecord.from_records(
-                    left_rec, right_rec, left_sname, right_sname, schema
+                key_index = None
+                if algorithm != JoinAlgorithm.Hash:
+                    key_index = self.find_index_join_key(
+                        join_clause, keys, schema, left_width
+                    )
+                if key_index is not None:
+                    # the right input is never iterated, i.e. the right table is not scanned
+                    right_table_name = join_clause.right_source.table_name.table_name
+                    records = self.index_nested_loop_join(
+                        join_type,
+                        right_table_name,
+                        keys,
+                        key_index,
+                        conjoin(residual),
+                        right_condition,
+                        left_iter,
+                        schema,
+                        left_width,
+                    )
+                    return self.init_recordset(
+                        schema,
+                        records,
+                        ordering=left_ordering,
+                        operator=self.describe_operator(
+                            "IndexNestedLoopJoin",
+                            f"{detail} lookup: {right_table_name.lower()}",
+                            left_rsname,
+                        ),
+                    )
+
+                records = self.hash_join(
+                    join_type,
+                    keys,
+                    conjoin(residual),
+                    left_iter,
+                    right_iter,
+                    schema,
+                    left_width,
                 )
-                self.append_recordset(rsname, record)
+                return self.init_recordset(
+                    schema,
+                    records,
+                    operator=self.describe_operator(
+                        "HashJoin", detail, left_rsname, right_rsname
+                    ),
+                )
+
+        condition = None if join_type == JoinType.Cross else join_clause.condition
+        records = self.nested_loop_join(
+            join_type, condition, left_iter, right_iter, schema, left_width
+        )
+        return self.init_recordset(
+            schema,
+            records,
+            ordering=left_ordering,
+            operator=self.describe_operator(
+                "NestedLoopJoin", detail, left_rsname, right_rsname
+            ),
+        )
 
-        elif join_clause.join_type == JoinType.FullOuter:
-            # there should be atleast one record for each left and right record
+    @staticmethod
+    def find_merge_join_key(
+        keys: EquiJoinKeys,
+        left_ordering: Optional[Tuple[int, ...]],
+        right_ordering: Optional[Tuple[int, ...]],
+    ) -> Optional[int]:
+        """
+        Determine whether the join can be evaluated as a merge join without sorting,
+        i.e. both inputs are ordered on a key pair. If so, return the position
+        of this key pair in `keys`.
+        """
+        if not left_ordering or not right_ordering:
+            return None
+        for index, (left_slot, right_slot) in enumerate(
+            zip(keys.left_slots, keys.right_slots)
+        ):
+            if left_ordering[0] == left_slot and right_ordering[0] == right_slot:
+                return index
+        return None
+
+    def find_index_join_key(
+        self,
+        join_clause: ConditionedJoin,
+        keys: EquiJoinKeys,
+        schema: ScopedSchema,
+        left_width: int,
+    ) -> Optional[int]:
+        """
+        Determine whether the join can be evaluated as an index nested-loop join, i.e. it's
+        an inner or left join, where a left (integer) column is equated to the right
+        table's primary key. If so, return the position of this key pair in `keys`.
+        """
+        if join_clause.join_type not in (JoinType.Inner, JoinType.LeftOuter):
+            return None
+        right_source = join_clause.right_source
+        if not isinstance(right_source, SingleSource):
+            return None
+        table_schema = self.get_schema(right_source.table_name.table_name)
+        # the right record's values are ordered like the table schema's columns
+        pkey_slot = primary_key_slot(table_schema)
+        for index, (left_slot, right_slot) in enumerate(
+            zip(keys.left_slots, keys.right_slots)
+        ):
+            if (
+                right_slot == pkey_slot
+                and schema.slot_columns[left_slot].datatype == Integer
+            ):
+                return index
+        return None
+
+    def index_nested_loop_join(
+        self,
+        join_type: JoinType,
+        right_table_name: str,
+        keys: EquiJoinKeys,
+        key_index: int,
+        residual: Optional[Symbol],
+        right_condition: Optional[Symbol],
+        left_iter: Iterable,
+        schema: ScopedSchema,
+        left_width: int,
+    ) -> Iterable[ScopedRecord]:
+        """
+        Generate joined records, by looking up the right record for each left record
+        in the right table's tree; i.e. the key pair at `key_index` equates a left column
+        with the right table's primary key. Any other key pairs, and the `residual`
+        condition are evaluated on the looked-up pair. The `right_condition`, i.e. a condition
+        over only the right table, is evaluated on the looked-up right record.
+        """
+        right_nulls = (None,) * (len(schema.columns) - left_width)
+        probe_slot = keys.left_slots[key_index]
+        other_keys = other_key_pairs(keys, key_index)
+        candidate = JoinedRecordView(schema, left_width)
+        residual_matches = self.compile_expression(residual, schema, left_width)
+        right_condition_matches = self.compile_expression(
+            right_condition, self.get_schema(right_table_name)
+        )
+
+        for left_rec in left_iter:
+            left_values = left_rec.to_tuple()
+            key = left_values[probe_slot]
+            # a primary key is never null, hence a null key can't match
+            right_record = (
+                self.lookup_record(right_table_name, key) if key is not None else None
+            )
+            if right_record is not None and (
+                right_condition_matches is None or right_condition_matches(right_record)
+            ):
+                right_values = right_record.to_tuple()
+                candidate.left = left_values
+                candidate.right = right_values
+                if all(
+                    left_values[left_slot] == right_values[right_slot]
+                    for left_slot, right_slot in other_keys
+                ) and (residual_matches is None or residual_matches(candidate)):
+                    yield ScopedRecord(left_values + right_values, schema)
+                    continue
+
+            if join_type == JoinType.LeftOuter:
+                yield ScopedRecord(left_values + right_nulls, schema)
+
+    def nested_loop_join(
+        self,
+        join_type: JoinType,
+        condition: Optional[Symbol],
+        left_iter: Iterable,
+        right_iter: Iterable,
+        schema: ScopedSchema,
+        left_width: int,
+    ) -> Iterable[ScopedRecord]:
+        """
+        Generate joined records by evaluating `condition` over every pair of left
+        and right records. A cross join has no condition.
+        """
+        left_nulls = (None,) * left_width
+        right_nulls = (None,) * (len(schema.columns) - left_width)
+        # the right is the inner recordset, and is iterated once per left record;
+        # hence it's materialized (as value tuples) once, when the join is first pulled
+        right_rows = [record.to_tuple() for record in right_iter]
+        # whether a right row has been joined; needed for right and full outer joins
+        right_joined_index = [False] * len(right_rows)
+        # the join condition is evaluated over a (reused) view of the candidate pair,
+        # and a joined record is only constructed for matching pairs
+        candidate = JoinedRecordView(schema, left_width)
+        condition_matches = self.compile_expression(condition, schema, left_width)
+
+        for left_rec in left_iter:
+            left_values = left_rec.to_tuple()
+            if condition is None:
+                for right_values in right_rows:
+                    yield ScopedRecord(left_values + right_values, schema)
+                continue
+
+            candidate.left = left_values
             left_record_added = False
-            right_joined_index = [False for _ in self.recordset_iter(right_rsname)]
-            for left_rec in left_iter:
-                right_iter = self.recordset_iter(right_rsname)
-                for index, right_rec in enumerate(right_iter):
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
-                    )
-                    if self.interpreter.evaluate_over_record(
-                        join_clause.condition, record
-                    ):
-                        # join condition matched
-                        self.append_recordset(rsname, record)
-                        left_record_added = True
-                        right_joined_index[index] = True
-                if not left_record_added:
-                    # add a null right record
-                    # create and join records
-                    right_rec = create_null_record(right_schema)
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
-                    )
-                    self.append_recordset(rsname, record)
+            for index, right_values in enumerate(right_rows):
+                candidate.right = right_values
+                if condition_matches(candidate):
+                    # join condition matched
+                    yield ScopedRecord(left_values + right_values, schema)
+                    left_record_added = True
+                    right_joined_index[index] = True
+
+            if not left_record_added and (
+                join_type == JoinType.LeftOuter or join_type == JoinType.FullOuter
+            ):
+                # there should be at least one record each left record
+                # add a null right record
+                yield ScopedRecord(left_values + right_nulls, schema)
+
+        if join_type == JoinType.RightOuter or join_type == JoinType.FullOuter:
             # handle any un-joined right records
-            for index, right_rec in self.recordset_iter(right_rsname):
+            for index, right_values in enumerate(right_rows):
                 if right_joined_index[index]:
                     continue
-                left_rec = create_null_record(left_schema)
-                record = ScopedRecord.from_records(
-                    left_rec, right_rec, left_sname, right_sname, schema
-                )
-                self.append_recordset(rsname, record)
+                yield ScopedRecord(left_nulls + right_values, schema)
 
-        else:
-            assert join_clause.join_type == JoinType.Cross
-            for left_rec in left_iter:
-                right_iter = self.recordset_iter(right_rsname)
-                for right_rec in right_iter:
-                    record = ScopedRecord.from_records(
-                        left_rec, right_rec, left_sname, right_sname, schema
-                    )
-                    self.append_recordset(rsname, record)
+    def hash_join(
+        self,
+        join_type: JoinType,
+        keys: EquiJoinKeys,
+        residual: Optional[Symbol],
+        left_iter: Iterable,
+        right_iter: Iterable,
+        schema: ScopedSchema,
+        left_width: int,
+    ) -> Iterable[ScopedRecord]:
+        """
+        Generate joined records for an equi-join. A hash table is built on the
+        smaller input, and probed with each record of the other input. The `residual`
+        condition, i.e. the non-equi-join conjuncts, is only evaluated on pairs with matching keys.
+
+        If both inputs are larger than the join memory budget, the inputs are sorted
+        (with an external sort) and merge joined instead.
+
+        NOTE: like the interpreter's equality, null keys are equal to each other.
+        """
+        left_nulls = (None,) * left_width
+        right_nulls = (None,) * (len(schema.columns) - left_width)
+        left_key = itemgetter(*keys.left_slots)
+        right_key = itemgetter(*keys.right_slots)
+        candidate = JoinedRecordView(schema, left_width)
+        residual_matches = self.compile_expression(residual, schema, left_width)
+        budget = self.config.join_memory_budget
+
+        remaining_right_rows = (record.to_tuple() for record in right_iter)
+        right_rows = list(islice(remaining_right_rows, budget + 1))
+        # read left records until the left is known to be larger than the right;
+        # the smaller input is the build side
+        remaining_left_rows = (record.to_tuple() for record in left_iter)
+        left_rows = list(islice(remaining_left_rows, len(right_rows) + 1))
+
+        if len(left_rows) <= len(right_rows):
+            # build on left, probe with right; the right is consumed in a streaming fashion
+            table = defaultdict(list)
+            for index, left_values in enumerate(left_rows):
+                table[left_key(left_values)].append(index)
+            left_joined_index = [False] * len(left_rows)
+
+            for right_values in chain(right_rows, remaining_right_rows):
+                candidate.right = right_values
+                right_record_added = False
+                for index in table.get(right_key(right_values), ()):
+                    left_values = left_rows[index]
+                    candidate.left = left_values
+                    if residual_matches is None or residual_matches(candidate):
+                        yield ScopedRecord(left_values + right_values, schema)
+                        right_record_added = True
+                        left_joined_index[index] = True
+                if not right_record_added and (
+                    join_type == JoinType.RightOuter or join_type == JoinType.FullOuter
+                ):
+                    yield ScopedRecord(left_nulls + right_values, schema)
+
+            if join_type == JoinType.LeftOuter or join_type == JoinType.FullOuter:
+                for index, left_values in enumerate(left_rows):
+                    if not left_joined_index[index]:
+                        yield ScopedRecord(left_values + right_nulls, schema)
+            return
+
+        if len(right_rows) > budget and keys_are_comparable(keys, schema, left_width):
+            # neither input fits the budget; sort both inputs on the keys and merge
+            left_sort_key = make_slots_sort_key(keys.left_slots)
+            right_sort_key = make_slots_sort_key(keys.right_slots)
+            yield from self.merge_join(
+                join_type,
+                keys,
+                residual,
+                sort_rows(chain(left_rows, remaining_left_rows), left_sort_key, budget),
+                sort_rows(
+                    chain(right_rows, remaining_right_rows), right_sort_key, budget
+                ),
+                schema,
+                left_width,
+            )
+            return
 
-        return Response(True, body=rsname)
+        # build on right, probe with left; the left is consumed in a streaming fashion
+        right_rows.extend(remaining_right_rows)
+        table = defaultdict(list)
+        for index, right_values in enumerate(right_rows):
+            table[right_key(right_values)].append(index)
+        right_joined_index = [False] * len(right_rows)
 
-    def group_recordset(self, group_by_clause, source_rsname):
+        for left_values in chain(left_rows, remaining_left_rows):
+            candidate.left = left_values
+            left_record_added = False
+            for index in table.get(left_key(left_values), ()):
+                right_values = right_rows[index]
+                candidate.right = right_values
+                if residual_matches is None or residual_matches(candidate):
+                    yield ScopedRecord(left_values + right_values, schema)
+                    left_record_added = True
+                    right_joined_index[index] = True
+            if not left_record_added and (
+                join_type == JoinType.LeftOuter or join_type == JoinType.FullOuter
+            ):
+                yield ScopedRecord(left_values + right_nulls, schema)
+
+        if join_type == JoinType.RightOuter or join_type == JoinType.FullOuter:
+            for index, right_values in enumerate(right_rows):
+                if not right_joined_index[index]:
+                    yield ScopedRecord(left_nulls + right_values, schema)
+
+    def merge_join(
+        self,
+        join_type: JoinType,
+        keys: EquiJoinKeys,
+        residual: Optional[Symbol],
+        left_rows: Iterable[Tuple],
+        right_rows: Iterable[Tuple],
+        schema: ScopedSchema,
+        left_width: int,
+        other_keys: List[Tuple[int, int]] = (),
+    ) -> Iterable[ScopedRecord]:
+        """
+        Generate joined records for an equi-join, whose inputs (i.e. value tuples) are
+        ordered (ascending, nulls last) on the `keys`. Both inputs are advanced in lock-step;
+        only the right rows with the current key are held in memory.
+        `other_keys` are additional (left slot, right slot) pairs that must be equal;
+        like the `residual` condition, these are evaluated on pairs with matching keys.
+
+        NOTE: like the interpreter's equality, null keys are equal to each other.
+        """
+        left_nulls = (None,) * left_width
+        right_nulls = (None,) * (len(schema.columns) - left_width)
+        left_key = make_slots_sort_key(keys.left_slots)
+        right_key = make_slots_sort_key(keys.right_slots)
+        left_outer = join_type == JoinType.LeftOuter or join_type == JoinType.FullOuter
+        right_outer = (
+            join_type == JoinType.RightOuter or join_type == JoinType.FullOuter
+        )
+        candidate = JoinedRecordView(schema, left_width)
+        residual_matches = self.compile_expression(residual, schema, left_width)
+
+        left_rows = iter(left_rows)
+        right_rows = iter(right_rows)
+        left_values = next(left_rows, None)
+        right_values = next(right_rows, None)
+
+        while left_values is not None and right_values is not None:
+            key = left_key(left_values)
+            right_row_key = right_key(right_values)
+            if key < right_row_key:
+                if left_outer:
+                    yield ScopedRecord(left_values + right_nulls, schema)
+                left_values = next(left_rows, None)
+                continue
+            if right_row_key < key:
+                if right_outer:
+                    yield ScopedRecord(left_nulls + right_values, schema)
+                right_values = next(right_rows, None)
+                continue
+
+            # keys are equal; gather the group of right rows with this key
+            group = []
+            while right_values is not None and right_key(right_values) == key:
+                group.append(right_values)
+                right_values = next(right_rows, None)
+            group_joined_index = [False] * len(group)
+
+            # join each left row with this key, with the group
+            while left_values is not None and left_key(left_values) == key:
+                candidate.left = left_values
+                left_record_added = False
+                for index, group_values in enumerate(group):
+                    candidate.right = group_values
+                    if all(
+                        left_values[left_slot] == group_values[right_slot]
+                        for left_slot, right_slot in other_keys
+                    ) and (residual_matches is None or residual_matches(candidate)):
+                        yield ScopedRecord(left_values + group_values, schema)
+                        left_record_added = True
+                        group_joined_index[index] = True
+                if not left_record_added and left_outer:
+                    yield ScopedRecord(left_values + right_nulls, schema)
+                left_values = next(left_rows, None)
+
+            if right_outer:
+                for index, group_values in enumerate(group):
+                    if not group_joined_index[index]:
+                        yield ScopedRecord(left_nulls + group_values, schema)
+
+        # handle the unmatched tail of either input
+        while left_values is not None and left_outer:
+            yield ScopedRecord(left_values + right_nulls, schema)
+            left_values = next(left_rows, None)
+        while right_values is not None and right_outer:
+            yield ScopedRecord(left_nulls + right_values, schema)
+            right_values = next(right_rows, None)
+
+    def group_recordset(
+        self, group_by_clause, source_rsname: str, aggregate_exprs: List[Symbol]
+    ) -> Response:
         """
         Apply by group-by on records in rsname
+
+        Each record is stepped into the state of each aggregate of its group. Only the
+        aggregate states of a group are kept, not the group's records. The aggregates
+        computed are those called in `aggregate_exprs`.
+
+        If the records are ordered on the group-by columns, the records of each group are
+        contiguous; so the groups are streamed, i.e. a group is emitted once the group key
+        changes, and memory is O(1) in the number of groups. Otherwise, this is a hash
+        aggregation, i.e. each record is hashed to its group, and memory is O(groups).
         """
         # generate grouped schema
 
@@ -946,21 +2394,166 @@ class VirtualMachine(Visitor):
         assert resp.success
         grouped_schema = resp.body
 
+        # bind group-key columns, and aggregated columns, to their position in the records
+        key_getters = [
+            self.compile_expression(column, source_schema)
+            for column in grouped_schema.group_by_columns
+        ]
+        aggregates = self.find_aggregates(aggregate_exprs, source_schema)
+        aggregate_keys = list(aggregates)
+        accumulators = [aggregates[key][0] for key in aggregate_keys]
+        value_getters = [
+            self.compile_expression(aggregates[key][1], source_schema)
+            for key in aggregate_keys
+        ]
+        steps = list(enumerate(zip(accumulators, value_getters)))
+
+        def init_states() -> list:
+            return [accumulator.init() for accumulator in accumulators]
+
+        def finalize_states(states: list) -> Dict[AggregateKey, Any]:
+            return {
+                key: accumulator.finalize(state)
+                for key, accumulator, state in zip(aggregate_keys, accumulators, states)
+            }
+
+        def stream_groups():
+            # the records of a group are contiguous; emit a group when the key changes
+            group_key = None
+            states = None
+            for record in self.recordset_iter(source_rsname):
+                key = tuple(getter(record) for getter in key_getters)
+                if states is None or key != group_key:
+                    if states is not None:
+                        yield group_key, finalize_states(states)
+                    group_key = key
+                    states = init_states()
+                for idx, (accumulator, getter) in steps:
+                    states[idx] = accumulator.step(states[idx], getter(record))
+            if states is not None:
+                yield group_key, finalize_states(states)
+            elif not key_getters:
+                # the single group of all records exists, even if there are no records
+                yield (), finalize_states(init_states())
+
+        def hash_groups():
+            # iterate over records, get group-key, step record into group's aggregate states
+            groups = {}
+            for record in self.recordset_iter(source_rsname):
+                group_key = tuple(getter(record) for getter in key_getters)
+                states = groups.get(group_key)
+                if states is None:
+                    states = init_states()
+                    groups[group_key] = states
+                for idx, (accumulator, getter) in steps:
+                    states[idx] = accumulator.step(states[idx], getter(record))
+            if not groups and not key_getters:
+                # the single group of all records exists, even if there are no records
+                groups[()] = init_states()
+            for group_key, states in groups.items():
+                yield group_key, finalize_states(states)
+
         # init new grouped-recordset
-        resp = self.init_grouped_recordset(grouped_schema)
+        detail = None
+        if group_by_clause.columns:
+            detail = "by " + ", ".join(
+                column.name for column in group_by_clause.columns
+            )
+        if self.is_ordered_on(
+            source_schema,
+            self.get_recordset_ordering(source_rsname),
+            grouped_schema.group_by_columns,
+        ):
+            operator = self.describe_operator("StreamAggregate", detail, source_rsname)
+            groups = stream_groups()
+        else:
+            operator = self.describe_operator("HashAggregate", detail, source_rsname)
+            groups = hash_groups()
+        return self.init_grouped_recordset(grouped_schema, groups, operator)
+
+    def group_by_row_count(
+        self,
+        source_rsname: str,
+        table_name: str,
+        aggregate_values: Dict[AggregateKey, int],
+    ) -> Response:
+        """
+        Group the records in rsname, i.e. all records of table `table_name`, into
+        a single group, whose `aggregate_values` are known, i.e. without pulling the records
+        """
+        source_schema = self.get_recordset_schema(source_rsname)
+        resp = make_grouped_schema(source_schema, [])
         assert resp.success
-        rsname = resp.body
+        operator = self.describe_operator("RowCount", table_name)
+        return self.init_grouped_recordset(
+            resp.body, iter([((), aggregate_values)]), operator
+        )
+
+    @staticmethod
+    def is_ordered_on(
+        schema: NonGroupedSchema,
+        ordering: Optional[Tuple[int, ...]],
+        columns: List[ColumnName],
+    ) -> bool:
+        """
+        Whether records, ordered on the slots `ordering`, are ordered on `columns`,
+        i.e. the columns' slots are a prefix of the ordering, in any order; then records
+        with equal values of `columns` are contiguous
+        """
+        if not ordering or not columns:
+            return False
+        if isinstance(schema, ScopedSchema):
+            slots = [schema.get_slot(column.name) for column in columns]
+        else:
+            names = [column.name.lower() for column in schema.columns]
+            slots = [
+                (
+                    names.index(column.name.lower())
+                    if column.name.lower() in names
+                    else None
+                )
+                for column in columns
+            ]
+        return set(slots) == set(ordering[: len(slots)])
 
-        # iterate over records, get group-key, add record to group
-        for record in self.recordset_iter(source_rsname):
-            # get group-key
-            group_values = []
-            for col in grouped_schema.group_by_columns:
-                group_values.append(record.get(col.name))
-            group_key = tuple(group_values)
-            self.append_grouped_recordset(rsname, group_key, record)
+    @staticmethod
+    def calls_aggregate(exprs: List[Symbol]) -> bool:
+        """
+        Whether any of `exprs` calls an aggregate function
+        """
+        return any(
+            is_aggregate_function(func_call.name)
+            for expr in exprs
+            for func_call in expr.find_descendents(FuncCall)
+        )
 
-        return Response(True, body=rsname)
+    @staticmethod
+    def find_aggregates(
+        exprs: List[Symbol], schema: NonGroupedSchema
+    ) -> Dict[AggregateKey, Tuple[Accumulator, ColumnName]]:
+        """
+        Find calls to aggregate functions, over a column of `schema`, in `exprs`.
+        Return a dict of aggregate key to the function's accumulator, and the column.
+
+        NOTE: invalid calls, e.g. over an unknown column, are skipped; these are
+        reported by semantic analysis
+        """
+        aggregates = {}
+        for expr in exprs:
+            for func_call in expr.find_descendents(FuncCall):
+                resp = resolve_aggregate_func_name(func_call.name)
+                if not resp.success or len(func_call.args) != 1:
+                    continue
+                column = func_call.args[0]
+                if isinstance(column, Expr):
+                    column = column.expr
+                if not isinstance(column, ColumnName) or not schema.has_column(
+                    column.name
+                ):
+                    continue
+                key = aggregate_key(func_call.name, column.name)
+                aggregates[key] = (resp.body.accumulator, column)
+        return aggregates
 
     def evaluate_select_clause(self, select_clause: SelectClause, source_rsname: str):
         """
@@ -1125,7 +2718,8 @@ class VirtualMachine(Visitor):
                 # a stringified or_clause to use as output column name
                 expr_name = self.interpreter.stringify(selectable)
                 resp = self.type_checker.analyze_grouped(selectable, source_schema)
-                assert resp.success, resp.error_message
+                if not resp.success:
+                    return Response(False, error_message=resp.error_message)
                 expr_type = resp.body
                 out_column = Column(expr_name, expr_type)
                 out_columns.append(out_column)
@@ -1150,31 +2744,25 @@ class VirtualMachine(Visitor):
             )
         return Response(True, body=generators)
 
-    def generate_value_generators_over_recordset(self, selectables: List) -> Response:
+    def generate_value_generators_over_recordset(
+        self, selectables: List, schema: Union[SimpleSchema, ScopedSchema]
+    ) -> Response:
         """
         Return Response[List[Generators]]
+        NOTE: expressions are compiled against `schema`, i.e. the schema of the records
+        the generators will be evaluated over
         """
         generators = []
         for selectable in selectables:
-            if isinstance(selectable, FuncCall):
-                generators.append(
-                    ValueGeneratorFromRecordOverFunc(selectable, self.interpreter)
-                )
-            elif isinstance(selectable, ColumnName):
-                generators.append(
-                    ValueGeneratorFromRecordOverExpr(selectable, self.interpreter)
-                )
-            elif isinstance(selectable, Literal):
-                generators.append(
-                    ValueGeneratorFromRecordOverExpr(selectable, self.interpreter)
-                )
-            else:
-                # expression
-                assert isinstance(selectable, Expr)
-                # NOTE: selectable can be arbitrary algebraic expression, including columns
-                generators.append(
-                    ValueGeneratorFromRecordOverExpr(selectable, self.interpreter)
+            # function call, column, literal, or expression
+            assert isinstance(selectable, (FuncCall, ColumnName, Literal, Expr))
+            # NOTE: selectable can be arbitrary algebraic expression, including columns;
+            # compiling binds column slots, and resolves (and validates args of) functions once
+            generators.append(
+                ValueGeneratorFromRecordOverCompiledExpr(
+                    self.compile_expression(selectable, schema)
                 )
+            )
         return Response(True, body=generators)
 
     def generate_value_generators_over_grouped_recordset(
@@ -1259,7 +2847,9 @@ class VirtualMachine(Visitor):
         out_schema = resp.body
 
         # 2. generate output value generators
-        resp = self.generate_value_generators_over_recordset(select_clause.selectables)
+        resp = self.generate_value_generators_over_recordset(
+            select_clause.selectables, source_schema
+        )
         if not resp.success:
             return Response(
                 False,
@@ -1267,25 +2857,30 @@ class VirtualMachine(Visitor):
             )
         value_generators = resp.body
 
-        # 3. generate output resultset
-        resp = self.init_recordset(out_schema)
-        assert resp.success
-        out_rsname = resp.body
-
+        # 3. generate output (pipelined) resultset
         out_column_names = [col.name for col in out_schema.columns]
-        # populate output resultset
-        for record in self.recordset_iter(source_rsname):
-            # get value, one for each output column
-            value_list = [val_gen.get_value(record) for val_gen in value_generators]
-            # convert column values to a record
-            resp = create_record_from_raw_values(
-                out_column_names, value_list, out_schema
-            )
-            assert resp.success
-            out_record = resp.body
-            self.append_recordset(out_rsname, out_record)
-
-        return Response(True, body=out_rsname)
+        source = self.recordset_iter(source_rsname)
+
+        def projected():
+            for record in source:
+                # get value, one for each output column
+                value_list = [val_gen.get_value(record) for val_gen in value_generators]
+                # convert column values to a record
+                resp = create_record_from_raw_values(
+                    out_column_names, value_list, out_schema
+                )
+                assert resp.success
+                yield resp.body
+
+        return self.init_recordset(
+            out_schema,
+            projected(),
+            operator=self.describe_operator(
+                "Project",
+                ", ".join(map(expression_to_sql, select_clause.selectables)),
+                source_rsname,
+            ),
+        )
 
     def evaluate_select_clause_grouped_source(
         self, select_clause: SelectClause, source_rsname: str
@@ -1316,72 +2911,142 @@ class VirtualMachine(Visitor):
             )
         value_generators = resp.body
 
-        # 3. generate output resultset
+        # 3. generate output (pipelined) resultset
         # NOTE: a groupedrecordset materializes to a resultset, i.e. groups are squashed
-        resp = self.init_recordset(out_schema)
-        assert resp.success
-        out_rsname = resp.body
-
         out_column_names = [col.name for col in out_schema.columns]
-        # populate output resultset
-        for grouped_record in self.grouped_recordset_iter(source_rsname):
-            # get value, one for each output column
-            group_schema = self.state_manager.get_grouped_recordset_schema(
-                source_rsname
-            )
-            assert isinstance(group_schema, GroupedSchema)
-            value_list = [
-                val_gen.get_value(grouped_record) for val_gen in value_generators
-            ]
-            # convert column values to a record
-            resp = create_record_from_raw_values(
-                out_column_names, value_list, out_schema
-            )
-            assert resp.success
-            out_record = resp.body
-            self.append_recordset(out_rsname, out_record)
-
-        return Response(True, body=out_rsname)
+        grouped_records = self.grouped_recordset_iter(source_rsname)
+
+        def projected():
+            for grouped_record in grouped_records:
+                # get value, one for each output column
+                value_list = [
+                    val_gen.get_value(grouped_record) for val_gen in value_generators
+                ]
+                # convert column values to a record
+                resp = create_record_from_raw_values(
+                    out_column_names, value_list, out_schema
+                )
+                assert resp.success
+                yield resp.body
+
+        return self.init_recordset(
+            out_schema,
+            projected(),
+            operator=self.describe_operator(
+                "Project",
+                ", ".join(map(expression_to_sql, select_clause.selectables)),
+                source_rsname,
+            ),
+        )
 
     # section: order by clause helpers
 
     def evaluate_order_by_clause(
-        self, order_by_clause: OrderByClause, source_rsname: str
+        self,
+        order_by_clause: OrderByClause,
+        source_rsname: str,
+        top_n: Optional[int] = None,
     ) -> Response:
         """
         Evaluate order clause, i.e. order resultset `rsname` and return ordered resultset
+
+        If `top_n` is set, only the first `top_n` ordered records are returned. These are
+        selected with a bounded heap, i.e. in O(n log top_n) time, and O(top_n) memory.
         """
         schema = self.get_recordset_schema(source_rsname)
-        resp = self.init_recordset(schema)
-        assert resp.success
-        # generate new result set
-        rsname = resp.body
+        source = self.recordset_iter(source_rsname)
+        # the composite sort key is computed once per record
+        sort_key = make_sort_key(order_by_clause)
+        detail = "by " + ", ".join(
+            f"{ord_col.column.name} "
+            + ("desc" if ord_col.qualifier == OrderingQualifier.Descending else "asc")
+            for ord_col in order_by_clause.columns
+        )
+        if top_n is not None:
+
+            def top_records():
+                # NOTE: nsmallest is stable, i.e. equivalent to sorted(records, key=sort_key)[:top_n]
+                yield from heapq.nsmallest(top_n, source, key=sort_key)
+
+            return self.init_recordset(
+                schema,
+                top_records(),
+                operator=self.describe_operator(
+                    "TopN", f"{top_n} {detail}", source_rsname
+                ),
+            )
 
-        # materialize
-        records = [record for record in self.recordset_iter(source_rsname)]
-        # sort
-        sorted_records = self.quicksort(records, order_by_clause)
-        # add to resultset
-        for record in sorted_records:
-            self.append_recordset(rsname, record)
+        def sorted_records():
+            # sorting is blocking, i.e. the source must be materialized (when the first
+            # record is pulled); in memory, or spilled to disk if the source exceeds the
+            # sort memory budget
+            yield from sort_records(
+                source, sort_key, schema, self.config.sort_memory_budget
+            )
 
-        return Response(True, body=rsname)
+        return self.init_recordset(
+            schema,
+            sorted_records(),
+            operator=self.describe_operator("Sort", detail, source_rsname),
+        )
 
     # section: limit clause helpers
 
+    def find_scan_offset(
+        self, from_clause: FromClause, select_clause: SelectClause
+    ) -> int:
+        """
+        Determine whether the limit clause's offset can be applied by the scan, i.e. by
+        seeking to the record with rank offset. This requires that each scanned record
+        maps to one output record, in scan order; i.e. the source is a single table,
+        and there is no filtering, grouping, aggregation, or ordering.
+        Return the offset the scan can apply, else 0.
+        """
+        limit_clause = from_clause.limit_clause
+        if (
+            limit_clause is None
+            or limit_clause.offset is None
+            or not isinstance(from_clause.source.source, (SingleSource, TableName))
+            or from_clause.where_clause is not None
+            or from_clause.group_by_clause is not None
+            or from_clause.having_clause is not None
+            or from_clause.order_by_clause is not None
+            or self.calls_aggregate(select_clause.selectables)
+        ):
+            return 0
+        return limit_clause.offset.value
+
+    @staticmethod
+    def limit_clause_bound(limit_clause: LimitClause) -> int:
+        """
+        Return number of (leading) records a limit clause needs, i.e. limit + offset
+        """
+        offset = limit_clause.offset.value if limit_clause.offset is not None else 0
+        return offset + limit_clause.limit.value
+
     def evaluate_limit_clause(
-        self, limit_clause: LimitClause, source_rsname: str
+        self, limit_clause: LimitClause, source_rsname: str, skipped: int = 0
     ) -> Response:
+        """
+        `skipped` is the number of records of the offset, that the scan already skipped
+        """
         schema = self.get_recordset_schema(source_rsname)
-        resp = self.init_recordset(schema)
-        assert resp.success
-        # generate new result set
-        rsname = resp.body
-        for index, record in enumerate(self.recordset_iter(source_rsname)):
-            if index >= limit_clause.limit.value:
-                break
-            self.append_recordset(rsname, record)
-        return Response(True, body=rsname)
+        offset = limit_clause.offset.value if limit_clause.offset is not None else 0
+        # since recordsets are pipelined, records past limit + offset are never pulled,
+        # i.e. upstream operators (scan, filter, ...) stop once the limit is reached
+        limited = islice(
+            self.recordset_iter(source_rsname),
+            offset - skipped,
+            self.limit_clause_bound(limit_clause) - skipped,
+        )
+        detail = str(limit_clause.limit.value)
+        if offset:
+            detail += f" offset {offset}"
+        return self.init_recordset(
+            schema,
+            limited,
+            operator=self.describe_operator("Limit", detail, source_rsname),
+        )
 
     # section: scope management
 
@@ -1397,20 +3062,45 @@ class VirtualMachine(Visitor):
 
     # section: record set utilities
 
-    def init_recordset(self, schema) -> Response:
+    def init_recordset(
+        self,
+        schema,
+        records: Optional[Iterable] = None,
+        ordering: Optional[Tuple[int, ...]] = None,
+        operator: Optional[Operator] = None,
+    ) -> Response:
         """
         initialize recordset; this requires a unique name
-        for each recordset
-        """
-        return self.state_manager.init_recordset(schema)
-
-    def init_grouped_recordset(self, schema: GroupedSchema):
+        for each recordset.
+        If `records` is passed, the recordset is pipelined, i.e. it lazily pulls
+        records from `records`.
+        `ordering` are the slots that records are known to be ordered on.
+        `operator` describes the operator generating the records, if a statement is being explained.
+        """
+        if operator is not None and records is not None:
+            records = self.profile.instrument(records, operator)
+        resp = self.state_manager.init_recordset(schema, records, ordering)
+        if operator is not None:
+            self.profile.register(resp.body, operator)
+        return resp
+
+    def init_grouped_recordset(
+        self,
+        schema: GroupedSchema,
+        groups: Iterable[Tuple[Tuple, Dict[AggregateKey, Any]]],
+        operator: Optional[Operator] = None,
+    ):
         """
-        init a grouped recordset.
-        NOTE: A grouped record set is internally stored like
-        {group_key_tuple -> list_of_records}
+        init a grouped recordset, that lazily pulls groups, i.e.
+        (group_key_tuple, aggregate_values) pairs, from `groups`.
+        `operator` describes the operator generating the groups, if a statement is being explained.
         """
-        return self.state_manager.init_grouped_recordset(schema)
+        if operator is not None:
+            groups = self.profile.instrument(groups, operator)
+        resp = self.state_manager.init_grouped_recordset(schema, groups)
+        if operator is not None:
+            self.profile.register(resp.body, operator)
+        return resp
 
     def get_recordset_schema(self, name: str) -> Optional[AbstractSchema]:
         """
@@ -1427,22 +3117,14 @@ class VirtualMachine(Visitor):
     def append_recordset(self, name: str, record):
         return self.state_manager.append_recordset(name, record)
 
-    def append_grouped_recordset(
-        self, name: str, group_key: Tuple, record: Union[SimpleRecord, ScopedRecord]
-    ):
-        """
-        Append a single record to a given group
-        """
-        self.state_manager.append_grouped_recordset(name, group_key, record)
+    def drop_recordset(self, name: str):
+        self.state_manager.drop_recordset(name)
 
-    def add_group_grouped_recordset(self, name: str, group_key: Tuple, recordset):
+    def get_recordset_ordering(self, name: str) -> Optional[Tuple[int, ...]]:
         """
-        Add a new group with given key, and recordset.
+        Return the slots that records of (ungrouped) recordset are ordered on, if known
         """
-        self.state_manager.add_group_grouped_recordset(name, group_key, recordset)
-
-    def drop_recordset(self, name: str):
-        self.state_manager.drop_recordset(name)
+        return self.state_manager.get_recordset_ordering(name)
 
     def recordset_iter(self, name: str) -> Iterable:
         """Return an iterator over recordset
@@ -1450,8 +3132,9 @@ class VirtualMachine(Visitor):
         """
         return self.state_manager.recordset_iter(name)
 
-    def grouped_recordset_iter(self, name: str) -> List[GroupedRecord]:
+    def grouped_recordset_iter(self, name: str) -> Iterable[GroupedRecord]:
         """
-        return a pair of iterator over group records
+        return an iterator over group records
+        NOTE: The iterator will be consumed after one iteration
         """
         return self.state_manager.grouped_recordset_iter(name)
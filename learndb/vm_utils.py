@@ -1,7 +1,7 @@
 from enum import Enum, auto
 from typing import Type
 
-from .datatypes import DataType, Integer, Real, Blob, Text
+from .datatypes import DataType, Integer, Real, Blob, Text, Boolean
 from .lang_parser.symbols import SymbolicDataType
 
 
@@ -23,5 +23,7 @@ def datatype_from_symbolic_datatype(data_type: SymbolicDataType) -> Type[DataTyp
         return Blob
     elif data_type == SymbolicDataType.Text:
         return Text
+    elif data_type == SymbolicDataType.Boolean:
+        return Boolean
     else:
         raise Exception(f"Unknown type {data_type}")
@@ -0,0 +1,134 @@
+"""
+Zone maps, i.e. summaries of a column's values over ranges of keys, that let a scan skip
+leaves whose records can't satisfy a range predicate on the column, e.g. `created_at > 100`.
+
+A zone summarizes the records in a range of keys, by the min and max of the column's values,
+and whether any of them are null. A zone map is built in one pass over the table, with one zone
+per leaf. Since zones are keyed by ranges of keys, rather than by pages, they remain valid as
+the tree splits, and merges, its leaves:
+    - an insert widens the zone whose key range holds the key; a key in no zone extends the key
+      range of the preceding (else the following) zone, to hold the key
+    - a delete leaves the zones as is; a zone's summary may then be wider than the values of the
+      records it holds, which only makes the zone less selective
+
+Thus, every record's key is in exactly one zone, whose summary holds the record's value. A leaf
+can be skipped if none of the zones overlapping the leaf's range of keys can match.
+
+NOTE: zone maps are kept in memory, and rebuilt when first used after the database is opened.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from .constants import REAL_EPSILON
+from .lang_parser.symbols import ComparisonOp
+
+
+@dataclass
+class Zone:
+    """
+    Summary of the column's values, of records with keys in [first_key, last_key]
+    """
+
+    first_key: int
+    last_key: int
+    min_value: Any = None
+    max_value: Any = None
+    has_nulls: bool = False
+
+    def may_match(self, operator: ComparisonOp, value: Any) -> bool:
+        """
+        Whether any record in the zone may satisfy <column> <operator> <value>.
+        NOTE: the bounds are widened by REAL_EPSILON, since reals are compared with a tolerance
+        """
+        if self.has_nulls:
+            # comparing null to a value fails; so such a zone is never skipped
+            return True
+        if self.min_value is None:
+            # the zone holds no records
+            return False
+        low = self.min_value - REAL_EPSILON
+        high = self.max_value + REAL_EPSILON
+        if operator == ComparisonOp.Equal:
+            return low <= value <= high
+        if operator == ComparisonOp.Greater:
+            return high > value
+        if operator == ComparisonOp.GreaterEqual:
+            return high >= value
+        if operator == ComparisonOp.Less:
+            return low < value
+        if operator == ComparisonOp.LessEqual:
+            return low <= value
+        return True
+
+
+class ZoneMap:
+    """
+    The zones of a single column, ordered by (disjoint) key ranges
+    """
+
+    def __init__(self):
+        self.zones: List[Zone] = []
+        # first key of each zone; for bisecting
+        self.first_keys: List[int] = []
+
+    def add_zone(self, first_key: int):
+        """
+        Add an (empty) zone starting at `first_key`; keys from `first_key` onward
+        must not be in any zone
+        """
+        index = bisect_right(self.first_keys, first_key)
+        self.zones.insert(index, Zone(first_key, first_key))
+        self.first_keys.insert(index, first_key)
+
+    def widen(self, key: int, value: Any):
+        """
+        Widen the zone holding `key`, to summarize `value`
+        """
+        zone = self.find_zone(key)
+        if zone is None:
+            # the first zone
+            self.add_zone(key)
+            zone = self.zones[0]
+        if value is None:
+            zone.has_nulls = True
+        elif zone.min_value is None:
+            zone.min_value = zone.max_value = value
+        else:
+            zone.min_value = min(zone.min_value, value)
+            zone.max_value = max(zone.max_value, value)
+
+    def find_zone(self, key: int) -> Optional[Zone]:
+        """
+        Return the zone holding `key`; a key in no zone extends the preceding, else
+        the following, zone. None if there are no zones.
+        """
+        if not self.zones:
+            return None
+        index = bisect_right(self.first_keys, key) - 1
+        if index < 0:
+            # the key precedes all zones
+            zone = self.zones[0]
+            zone.first_key = self.first_keys[0] = key
+            return zone
+        zone = self.zones[index]
+        zone.last_key = max(zone.last_key, key)
+        return zone
+
+    def can_skip(
+        self, first_key: int, last_key: int, operator: ComparisonOp, value: Any
+    ) -> bool:
+        """
+        Whether no record with key in [first_key, last_key] can satisfy
+        <column> <operator> <value>
+        """
+        index = max(bisect_right(self.first_keys, first_key) - 1, 0)
+        overlaps = False
+        while index < len(self.zones) and self.zones[index].first_key <= last_key:
+            zone = self.zones[index]
+            if zone.last_key >= first_key:
+                if zone.may_match(operator, value):
+                    return False
+                overlaps = True
+            index += 1
+        return overlaps
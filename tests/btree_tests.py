@@ -156,3 +156,99 @@ def test_deletes(test_cases):
 
         db.close()
         del db
+
+
+def test_updates(test_cases):
+    """
+    iterate over test cases- insert all keys
+    then update keys, with values that shrink, grow, and no longer fit
+    the leaf, and ensure:
+    - tree is consistent
+    - has expected keys and values
+
+    :param test_cases:
+    :return:
+    """
+    values = ["hi", "hello world " * 10, "x" * 1500]
+
+    for test_case in test_cases:
+        db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+
+        db.handle_input("create table foo ( cola integer primary key, colb text)")
+
+        # insert keys
+        expected = {}
+        for key in test_case:
+            db.handle_input(f"insert into foo (cola, colb) values ({key}, 'hello world')")
+            expected[key] = "hello world"
+
+        # shuffle keys in repeatable order
+        random.seed(1)
+        update_keys = test_case[:]
+        random.shuffle(update_keys)
+
+        for idx, key in enumerate(update_keys):
+            value = values[idx % len(values)]
+            resp = db.handle_input(f"update foo set colb = '{value}' where cola = {key}")
+            assert resp.success, f"update of key {key} failed with {resp.error_message}"
+            expected[key] = value
+
+            db.handle_input("select cola, colb from foo")
+            pipe = db.get_pipe()
+            result = {}
+            while pipe.has_msgs():
+                record = pipe.read()
+                result[record.get("cola")] = record.get("colb")
+
+            db.virtual_machine.state_manager.validate_tree("foo")
+            assert result == expected, f"Update test case [{test_case}][{idx}] {update_keys} failed"
+
+        db.close()
+        del db
+
+
+def test_range_deletes():
+    """
+    randomly interleave inserts with deletes of primary key ranges, that delete
+    keys in batches, and after each statement ensure:
+    - tree is consistent, incl. its child counts
+    - has expected keys
+    """
+    for seed in range(3):
+        rng = random.Random(seed)
+        db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+        # keys are deleted in batches, between which the scan is resumed
+        db.virtual_machine.config.modify_batch_size = 5
+
+        db.handle_input("create table foo ( cola integer primary key, colb text)")
+
+        expected = set()
+        for round_num in range(12):
+            statements = []
+            for _ in range(rng.randint(1, 30)):
+                key = rng.randint(0, 120)
+                if key not in expected:
+                    statements.append(f"insert into foo (cola, colb) values ({key}, 'hello world')")
+                    expected.add(key)
+            low = rng.randint(0, 120)
+            high = low + rng.randint(0, 40)
+            statements.append(f"delete from foo where cola >= {low} and cola <= {high}")
+            expected -= set(range(low, high + 1))
+
+            for statement in statements:
+                resp = db.handle_input(statement)
+                assert resp.success, f"seed [{seed}] round [{round_num}] [{statement}] failed"
+                db.virtual_machine.state_manager.validate_tree("foo")
+
+            # select rows
+            db.handle_input("select cola from foo")
+            pipe = db.get_pipe()
+            result_keys = []
+            while pipe.has_msgs():
+                record = pipe.read()
+                result_keys.append(record.get("cola"))
+
+            assert result_keys == sorted(expected), f"seed [{seed}] round [{round_num}] has unexpected keys"
+
+        db.close()
+        del db
@@ -11,7 +11,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # specific internal imports for specific tests suites
 # generally we'll import entire module, unless it' clearer to import a specific member
 
-from learndb.constants import REAL_EPSILON
+from learndb.constants import REAL_EPSILON, FILE_HEADER_UNCOUNTED_VERSION_VALUE, FILE_HEADER_VERSION_VALUE
 
 # learndb
 from learndb.interface import LearnDB
@@ -24,4 +24,6 @@ from learndb.schema import SimpleSchema, Column
 from learndb.record_utils import SimpleRecord
 from learndb.serde import deserialize_cell, serialize_record
 
-from learndb.pager import Pager
\ No newline at end of file
+from learndb.pager import Pager
+from learndb.btree import NodeType
+from learndb import functions
@@ -1,9 +1,11 @@
 """
 Set of tests on employees schema
 """
+import os
 import pytest
 
-from .context import LearnDB
+from .context import LearnDB, functions
+from .context import FILE_HEADER_UNCOUNTED_VERSION_VALUE, FILE_HEADER_VERSION_VALUE, NodeType
 from .test_constants import TEST_DB_FILE
 
 # utils
@@ -175,3 +177,659 @@ def test_table_drop(db_employees):
         table_names.append(table_name)
     assert len(table_names) == 1
     assert table_names[0] == "department"
+
+
+def test_select_full_join(db_employees):
+    db_employees.handle_input("INSERT INTO employees(id, name, salary, depid) VALUES (4, 'Lee', 50, 7)")
+    db_employees.handle_input("select e.name, d.name from employees e full outer join department d on e.depid = d.depid")
+    pairs = []
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.append((record.at_index(0), record.at_index(1)))
+    assert len(pairs) == 5
+    assert ("Lee", None) in pairs
+    assert (None, "engineering") in pairs
+    assert ("Gab", "sales") in pairs
+
+
+def test_select_multi_join(db_employees):
+    db_employees.handle_input("create table location (locid INTEGER PRIMARY KEY, depid INTEGER, city TEXT)")
+    db_employees.handle_input("INSERT INTO location(locid, depid, city) VALUES (1, 1, 'Oslo')")
+    db_employees.handle_input("INSERT INTO location(locid, depid, city) VALUES (2, 2, 'Lima')")
+    db_employees.handle_input(
+        "select e.name, d.name, l.city from employees e inner join department d on e.depid = d.depid "
+        "inner join location l on l.depid = d.depid"
+    )
+    rows = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        rows.add((record.at_index(0), record.at_index(1), record.at_index(2)))
+    assert rows == {("John", "accounting", "Oslo"), ("Anita", "accounting", "Oslo"), ("Gab", "sales", "Lima")}
+
+
+def test_where_limit(db_fruits):
+    db_fruits.handle_input("select name from fruits where avg_weight > 140 limit 2")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    assert values == ['apple', 'pineapple']
+
+
+def test_limit_offset(db_fruits):
+    db_fruits.handle_input("select name from fruits limit 3 offset 2")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    assert values == ['pineapple', 'grape', 'pear']
+
+
+def test_order_limit_offset(db_fruits):
+    db_fruits.handle_input("select name, avg_weight from fruits order by avg_weight desc limit 2 offset 1")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    assert values == ['pineapple', 'apple']
+
+
+def test_limit_offset_seeks_rank(db_fruits):
+    # the scan seeks to the offset's rank, using the tree's child counts
+    db_fruits.handle_input("delete from fruits where id = 2 or id = 6")
+    for offset in range(9):
+        db_fruits.handle_input(f"select id from fruits limit 2 offset {offset}")
+        values = []
+        while db_fruits.get_pipe().has_msgs():
+            values.append(db_fruits.get_pipe().read().at_index(0))
+        assert values == [1, 3, 4, 5, 7, 8, 9][offset:offset + 2]
+
+    db_fruits.handle_input("explain analyze select name from fruits limit 2 offset 5")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[-1].startswith("  -> Scan fruits from rank 5 (actual rows=2 ")
+
+
+def test_child_counts_built_for_files_written_without_them():
+    db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+    db.nuke_dbfile()
+    db.handle_input("create table t (id integer primary key, name text)")
+    for key in range(40):
+        db.handle_input(f"insert into t (id, name) values ({key}, 'n{key}')")
+
+    # make the file look like one written before internal nodes stored their child counts
+    tree = db.virtual_machine.state_manager.get_tree("t")
+    stack = [tree.root_page_num]
+    while stack:
+        node = tree.pager.get_page(stack.pop())
+        if tree.get_node_type(node) == NodeType.NodeInternal:
+            for child_num, child_page_num in tree.internal_node_children(node):
+                tree.set_internal_node_child_count(node, child_num, 0)
+                stack.append(child_page_num)
+    db.close()
+    with open(TEST_DB_FILE, "r+b") as fp:
+        fp.write(FILE_HEADER_UNCOUNTED_VERSION_VALUE.ljust(16, b"\x00"))
+
+    # the counts are built when the file is opened
+    db = LearnDB(TEST_DB_FILE)
+    assert db.virtual_machine.state_manager.get_tree("t").validate_child_counts()
+    db.handle_input("select id from t limit 3 offset 10")
+    values = []
+    while db.get_pipe().has_msgs():
+        values.append(db.get_pipe().read().at_index(0))
+    assert values == [10, 11, 12]
+    db.close()
+
+    # the file is now written with the current version
+    db = LearnDB(TEST_DB_FILE)
+    assert db.virtual_machine.state_manager.get_pager().file_version == FILE_HEADER_VERSION_VALUE
+    db.close()
+
+
+def test_key_only_scan(db_fruits):
+    # only the primary key is referenced, so only the keys are read
+    db_fruits.handle_input("delete from fruits where id = 2 or id = 6")
+    db_fruits.handle_input("select f.id from fruits f where f.id > 3 order by f.id desc")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    assert values == [9, 8, 7, 5, 4]
+
+    db_fruits.handle_input("explain analyze select id from fruits where id > 3")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[-1].startswith("-> KeyOnlyScan fruits")
+    assert lines[-1].endswith(" bytes=0)")
+
+    # other columns are read as before
+    db_fruits.handle_input("explain select name from fruits where id > 3")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[-1].startswith("-> Scan fruits")
+
+
+def test_scan_seeks_primary_key_range(db_fruits):
+    def select(cmd):
+        db_fruits.handle_input(cmd)
+        values = []
+        while db_fruits.get_pipe().has_msgs():
+            values.append(db_fruits.get_pipe().read().at_index(0))
+        return values
+
+    assert select("select name from fruits where id > 3 and id <= 5") == ['grape', 'pear']
+    assert select("select name from fruits where id = 7") == ['watermelon']
+    assert select("select name from fruits where id = 7 and avg_weight < 100") == []
+    assert select("select name from fruits where id > 5 and id < 5") == []
+
+    lines = select("explain select name from fruits where id > 3 and id <= 5")
+    assert lines[-1] == "-> Scan fruits filter: id > 3 and id <= 5 key range: 4..5"
+    lines = select("explain select f.name from fruits f where f.id = 7")
+    assert lines[-1] == "-> Scan fruits f filter: id = 7 lookup: 7"
+
+
+def test_zone_map_skips_leaves():
+    db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+    db.nuke_dbfile()
+    db.virtual_machine.config.zone_map_columns = {"events": ["created_at"]}
+    db.handle_input("create table events (id integer primary key, created_at integer)")
+    for key in range(1, 31):
+        db.handle_input(f"insert into events (id, created_at) values ({key}, {key * 10})")
+
+    def select(cmd):
+        db.handle_input(cmd)
+        values = []
+        while db.get_pipe().has_msgs():
+            values.append(db.get_pipe().read().at_index(0))
+        return values
+
+    assert select("select id from events where created_at > 265") == [27, 28, 29, 30]
+    lines = select("explain analyze select id from events where created_at > 265")
+    assert "zone maps: created_at" in lines[-1]
+    # only the leaves, with keys from 27 onward, are read
+    assert " pages=2 " in lines[-1]
+
+    # zones are widened by inserts, and remain valid after deletes
+    db.handle_input("insert into events (id, created_at) values (31, 5)")
+    db.handle_input("insert into events (id, created_at) values (0, 400)")
+    db.handle_input("delete from events where id > 10 and id < 20")
+    assert select("select id from events where created_at > 265 or created_at < 8") == [0, 27, 28, 29, 30, 31]
+    assert select("select id from events where created_at <= 50") == [1, 2, 3, 4, 5, 31]
+    assert select("select id from events where created_at = 150") == []
+    db.close()
+
+
+def test_order_with_nulls(db_fruits):
+    db_fruits.handle_input("insert into fruits (id, name) values (10, 'kiwi')")
+    db_fruits.handle_input("select name, avg_weight from fruits order by avg_weight desc, name")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    # nulls order last for asc, and first for desc
+    assert values[:3] == ['kiwi', 'watermelon', 'pineapple']
+    assert values[-1] == 'grape'
+
+
+def test_order_external_sort(db_fruits):
+    # force the sort to spill runs
+    db_fruits.virtual_machine.config.sort_memory_budget = 2
+    db_fruits.handle_input("select name, avg_weight from fruits order by avg_weight, name desc")
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    expected = ['grape', 'banana', 'orange', 'mango', 'peach', 'pear', 'apple', 'pineapple', 'watermelon']
+    assert expected == values
+
+
+def test_select_join_with_residual_condition(db_employees):
+    db_employees.handle_input(
+        "select e.name, d.name from employees e right join department d on e.depid = d.depid and e.salary > 150"
+    )
+    pairs = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.add((record.at_index(0), record.at_index(1)))
+    assert pairs == {("Anita", "accounting"), ("Gab", "sales"), (None, "engineering")}
+
+
+def test_select_left_join_on_primary_key(db_employees):
+    db_employees.handle_input("INSERT INTO employees(id, name, salary, depid) VALUES (4, 'Lee', 50, 7)")
+    db_employees.handle_input(
+        "select e.name, d.name from employees e left join department d on e.depid = d.depid where e.salary < 250"
+    )
+    pairs = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.add((record.at_index(0), record.at_index(1)))
+    assert pairs == {("John", "accounting"), ("Gab", "sales"), ("Lee", None)}
+
+
+def test_select_join_on_primary_keys(db_employees):
+    db_employees.handle_input("INSERT INTO employees(id, name, salary, depid) VALUES (4, 'Lee', 50, 7)")
+    db_employees.handle_input(
+        "select e.name, d.name from employees e full join department d on e.id = d.depid"
+    )
+    pairs = []
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.append((record.at_index(0), record.at_index(1)))
+    # both inputs are ordered on the primary key, hence the output is too
+    assert pairs == [("John", "accounting"), ("Anita", "sales"), ("Gab", "engineering"), ("Lee", None)]
+
+
+def test_select_join_over_memory_budget(db_employees):
+    # neither input fits the join memory budget, so the inputs are sorted and merged
+    db_employees.virtual_machine.config.join_memory_budget = 1
+    db_employees.handle_input("INSERT INTO employees(id, name, salary, depid) VALUES (4, 'Lee', 50, 7)")
+    db_employees.handle_input(
+        "select e.name, d.name from employees e full join department d on e.depid = d.depid"
+    )
+    pairs = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.add((record.at_index(0), record.at_index(1)))
+    assert pairs == {
+        ("John", "accounting"),
+        ("Anita", "accounting"),
+        ("Gab", "sales"),
+        ("Lee", None),
+        (None, "engineering"),
+    }
+
+
+def test_select_join_where_on_each_source(db_employees):
+    db_employees.handle_input(
+        "select e.name, d.name from employees e join department d on e.depid = d.depid "
+        "where e.salary > 150 and d.name = 'accounting'"
+    )
+    pairs = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.add((record.at_index(0), record.at_index(1)))
+    assert pairs == {("Anita", "accounting")}
+
+
+def test_select_right_join_where_on_preserved_source(db_employees):
+    db_employees.handle_input(
+        "select e.name, d.name from employees e right join department d on e.depid = d.depid "
+        "where d.depid > 1"
+    )
+    pairs = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        pairs.add((record.at_index(0), record.at_index(1)))
+    assert pairs == {("Gab", "sales"), (None, "engineering")}
+
+
+def test_select_three_way_join_reordered():
+    """
+    the joins are evaluated in an order different from the written one, i.e. starting
+    with the small (filtered) table
+    """
+    db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+    db.nuke_dbfile()
+    commands = [
+        "create table big (id integer primary key, sid integer)",
+        "create table small (id integer primary key, name text)",
+        "create table mid (id integer primary key, bid integer)",
+    ]
+    commands += [f"insert into big (id, sid) values ({i}, {i % 3})" for i in range(1, 41)]
+    commands += [f"insert into small (id, name) values ({i}, 'n{i}')" for i in range(3)]
+    commands += [f"insert into mid (id, bid) values ({i}, {i * 4})" for i in range(1, 11)]
+    for cmd in commands:
+        resp = db.handle_input(cmd)
+        assert resp.success, f"{cmd} failed with {resp.error_message}"
+
+    db.handle_input(
+        "select b.id, s.name, m.id from big b join small s on b.sid = s.id "
+        "join mid m on m.bid = b.id where s.name = 'n1'"
+    )
+    rows = set()
+    while db.get_pipe().has_msgs():
+        record = db.get_pipe().read()
+        rows.add((record.get("b.id"), record.get("s.name"), record.get("m.id")))
+    assert rows == {(4, "n1", 1), (16, "n1", 4), (28, "n1", 7), (40, "n1", 10)}
+
+    # the where clause's join condition is evaluated by the (cross) join
+    db.handle_input("select b.id, s.name from big b cross join small s where b.sid = s.id and b.id < 5")
+    rows = set()
+    while db.get_pipe().has_msgs():
+        record = db.get_pipe().read()
+        rows.add((record.get("b.id"), record.get("s.name")))
+    assert rows == {(1, "n1"), (2, "n2"), (3, "n0"), (4, "n1")}
+    db.close()
+
+
+def test_analyze(db_employees):
+    assert db_employees.handle_input("analyze employees").success
+    assert not db_employees.handle_input("analyze nonexistent").success
+    assert db_employees.handle_input("analyze").success
+
+    db_employees.handle_input(
+        "select table_name, row_count, page_count, tree_height from stats_catalog"
+    )
+    rows = set()
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        rows.add(tuple(record.at_index(i) for i in range(4)))
+    assert rows == {("employees", 3, 1, 1), ("department", 3, 1, 1)}
+
+    statistics = db_employees.virtual_machine.get_table_statistics("employees")
+    salary = statistics.columns["salary"]
+    assert (salary.null_count, salary.distinct_count) == (0, 3)
+    assert (salary.min_value, salary.max_value) == (100, 300)
+    assert statistics.distinct_count("depid") == 2
+
+    # statistics persist, and are removed with their table
+    db_employees.close()
+    db = LearnDB(TEST_DB_FILE)
+    assert db.virtual_machine.get_table_statistics("department").columns["name"].distinct_count == 3
+    assert db.handle_input("drop table department").success
+    db.handle_input("select table_name from stats_catalog")
+    names = []
+    while db.get_pipe().has_msgs():
+        names.append(db.get_pipe().read().at_index(0))
+    assert names == ["employees"]
+    db.close()
+
+
+def test_update(db_fruits):
+    # records are updated in batches, between which the scan is resumed
+    db_fruits.virtual_machine.config.modify_batch_size = 2
+    resp = db_fruits.handle_input("update fruits set name = 'kiwi' where id = 4")
+    assert resp.success
+    resp = db_fruits.handle_input("update fruits set avg_weight = 150 where avg_weight > 140 and avg_weight < 200")
+    assert resp.success
+    # the row doesn't satisfy the rest of the condition
+    resp = db_fruits.handle_input("update fruits set avg_weight = 0 where id = 1 and name = 'pear'")
+    assert resp.success
+    long_name = "watermelon" * 100
+    resp = db_fruits.handle_input(f"update fruits set name = '{long_name}' where id = 7")
+    assert resp.success
+    resp = db_fruits.handle_input("update fruits set name = 'berry' where id > 7")
+    assert resp.success
+
+    db_fruits.handle_input("select id, name, avg_weight from fruits")
+    rows = []
+    while db_fruits.get_pipe().has_msgs():
+        record = db_fruits.get_pipe().read()
+        rows.append((record.get("id"), record.get("name"), record.get("avg_weight")))
+    assert rows == [
+        (1, 'apple', 200), (2, 'orange', 140), (3, 'pineapple', 1000), (4, 'kiwi', 5), (5, 'pear', 150),
+        (6, 'mango', 140), (7, long_name, 10000), (8, 'berry', 118), (9, 'berry', 150),
+    ]
+    db_fruits.virtual_machine.state_manager.validate_tree("fruits")
+    db_fruits.handle_input("select count(id) from fruits")
+    assert db_fruits.get_pipe().read().at_index(0) == 9
+
+    # primary key, and unknown columns can't be updated
+    assert not db_fruits.handle_input("update fruits set id = 10 where id = 1").success
+    assert not db_fruits.handle_input("update fruits set color = 'red'").success
+
+
+def test_truncate_and_drop_reclaim_pages():
+    db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+    db.handle_input("create table staging (id integer primary key, name text)")
+    for key in range(1, 60):
+        db.handle_input(f"insert into staging (id, name) values ({key}, 'name{key}')")
+    pager = db.virtual_machine.state_manager.get_pager()
+    tree = db.virtual_machine.state_manager.get_tree("staging")
+    num_tree_pages, _ = tree.shape()
+    num_returned_pages = len(pager.returned_pages)
+
+    assert db.handle_input("truncate staging").success
+    # all pages, but the root, are returned
+    assert len(pager.returned_pages) - num_returned_pages == num_tree_pages - 1
+    assert tree.shape() == (1, 1)
+    db.handle_input("select count(id) from staging")
+    assert db.get_pipe().read().at_index(0) == 0
+    db.handle_input("select id from staging")
+    assert not db.get_pipe().has_msgs()
+
+    # the returned pages are reused
+    num_pages = pager.num_pages
+    for key in range(1, 60):
+        db.handle_input(f"insert into staging (id, name) values ({key}, 'name{key}')")
+    assert pager.num_pages == num_pages
+    db.virtual_machine.state_manager.validate_tree("staging")
+    db.close()
+
+    # dropping the table shrinks the file
+    file_size = os.path.getsize(TEST_DB_FILE)
+    db = LearnDB(TEST_DB_FILE)
+    assert db.handle_input("drop table staging").success
+    db.close()
+    assert os.path.getsize(TEST_DB_FILE) < file_size
+
+    db = LearnDB(TEST_DB_FILE)
+    assert not db.handle_input("truncate staging").success
+    db.close()
+
+
+def test_delete_scans_only_the_primary_key_range():
+    db = LearnDB(TEST_DB_FILE, nuke_db_file=True)
+    # keys are deleted in batches, between which the scan is resumed
+    db.virtual_machine.config.modify_batch_size = 4
+    db.handle_input("create table events (id integer primary key, created_at integer)")
+    for key in range(1, 31):
+        db.handle_input(f"insert into events (id, created_at) values ({key}, {key * 10})")
+    io_counters = db.virtual_machine.io_counters
+
+    # only the key range's leaves are read; and only their keys
+    pages_read, bytes_deserialized = io_counters.pages_read, io_counters.bytes_deserialized
+    assert db.handle_input("delete from events where id > 20 and id <= 26").success
+    assert io_counters.pages_read - pages_read < 5
+    assert io_counters.bytes_deserialized == bytes_deserialized
+
+    assert db.handle_input("delete from events where created_at > 60 and id < 15").success
+    assert db.handle_input("delete from events where id = 30 and created_at = 0").success
+    db.handle_input("select id from events")
+    keys = []
+    while db.get_pipe().has_msgs():
+        keys.append(db.get_pipe().read().at_index(0))
+    assert keys == [1, 2, 3, 4, 5, 6, 15, 16, 17, 18, 19, 20, 27, 28, 29, 30]
+    db.handle_input("select count(id) from events")
+    assert db.get_pipe().read().at_index(0) == 16
+    db.virtual_machine.state_manager.validate_tree("events")
+    db.close()
+
+
+def test_bloom_filter_skips_lookups_of_absent_keys(db_employees):
+    db_employees.virtual_machine.config.bloom_filter_tables = ["department"]
+    for key, depid in [(4, 7), (5, 8), (6, 9)]:
+        db_employees.handle_input(f"insert into employees (id, name, salary, depid) values ({key}, 'X', 50, {depid})")
+    query = "select e.id, d.name from employees e left join department d on e.depid = d.depid"
+    db_employees.handle_input(query)
+    rows = []
+    while db_employees.get_pipe().has_msgs():
+        record = db_employees.get_pipe().read()
+        rows.append((record.at_index(0), record.at_index(1)))
+    assert rows == [(1, 'accounting'), (2, 'accounting'), (3, 'sales'), (4, None), (5, None), (6, None)]
+
+    db_employees.handle_input(f"explain analyze {query}")
+    lines = []
+    while db_employees.get_pipe().has_msgs():
+        lines.append(db_employees.get_pipe().read().get("query_plan"))
+    join_pages = int(lines[1].split(" pages=")[1].split()[0])
+    scan_pages = int(lines[2].split(" pages=")[1].split()[0])
+    # only the lookups of the 3 present keys descend the tree
+    assert join_pages - scan_pages == 3
+
+    # the filter persists, and is maintained by inserts
+    db_employees.close()
+    db = LearnDB(TEST_DB_FILE)
+    assert db.virtual_machine.state_manager.get_bloom_filter("department") is not None
+    db.handle_input("insert into department (depid, name) values (9, 'legal')")
+    db.handle_input("select d.name from employees e join department d on e.depid = d.depid where e.id = 6")
+    assert db.get_pipe().read().at_index(0) == 'legal'
+    db.close()
+
+
+def test_explain(db_employees):
+    query = (
+        "select e.name, d.name from employees e join department d on e.depid = d.depid "
+        "where e.salary > 150 order by e.name"
+    )
+    db_employees.handle_input(f"explain {query}")
+    lines = []
+    while db_employees.get_pipe().has_msgs():
+        lines.append(db_employees.get_pipe().read().get("query_plan"))
+    assert lines == [
+        "Sort by e.name asc",
+        "-> Project e.name, d.name",
+        "  -> IndexNestedLoopJoin inner on e.depid = d.depid lookup: department",
+        "    -> Scan employees e filter: salary > 150",
+    ]
+
+    # with analyze, the query is executed, and each operator reports its actuals
+    db_employees.handle_input(f"explain analyze {query}")
+    lines = []
+    while db_employees.get_pipe().has_msgs():
+        lines.append(db_employees.get_pipe().read().get("query_plan"))
+    assert len(lines) == 4
+    assert lines[0].startswith("Sort by e.name asc (actual rows=2 ")
+    assert lines[3].startswith("    -> Scan employees e filter: salary > 150 (actual rows=2 ")
+    assert "pages=1 bytes=" in lines[3]
+
+
+def test_select_compiled_expressions(db_fruits):
+    # where and select expressions are compiled, and must evaluate like the interpreter
+    db_fruits.handle_input(
+        "select name, square(id) + avg_weight / 3 from fruits "
+        "where avg_weight * 2 > 300 and id < 8 or name = 'grape'"
+    )
+    rows = []
+    while db_fruits.get_pipe().has_msgs():
+        record = db_fruits.get_pipe().read()
+        rows.append((record.at_index(0), record.at_index(1)))
+    assert rows == [('apple', 67), ('pineapple', 342), ('grape', 17), ('pear', 80), ('watermelon', 3382)]
+
+
+def test_select_simplified_conditions(db_fruits):
+    # constants are folded, true conjuncts dropped, and comparisons normalized to column op constant
+    query = "select name from fruits where 1 = 1 and 2 * 100 > avg_weight + 50 or 1 = 2"
+    db_fruits.handle_input(f"explain {query}")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines == ["Project name", "-> Scan fruits filter: avg_weight < 150"]
+
+    db_fruits.handle_input(query)
+    values = []
+    while db_fruits.get_pipe().has_msgs():
+        values.append(db_fruits.get_pipe().read().at_index(0))
+    assert values == ['orange', 'grape', 'mango', 'banana', 'peach']
+
+    db_fruits.handle_input("select name from fruits where 1 = 2")
+    assert not db_fruits.get_pipe().has_msgs()
+
+
+def test_select_function_calls(db_fruits):
+    # functions are resolved, and their args validated, once, when the select is compiled
+    db_fruits.handle_input("select square(id), square(id + 1) from fruits where square(id) < 10")
+    rows = []
+    while db_fruits.get_pipe().has_msgs():
+        record = db_fruits.get_pipe().read()
+        rows.append((record.at_index(0), record.at_index(1)))
+    assert rows == [(1, 4), (4, 9), (9, 16)]
+
+
+def test_select_group_by_hash_aggregate(db_fruits):
+    # aggregates are accumulated per group; count skips nulls
+    db_fruits.handle_input("insert into fruits (id, name) values (10, 'kiwi')")
+    db_fruits.handle_input("insert into fruits (id, name, avg_weight) values (11, 'plum', 140)")
+    db_fruits.handle_input("insert into fruits (id, avg_weight) values (12, 140)")
+    query = "select avg_weight, count(name), count(id) from fruits group by avg_weight having count(id) > 1"
+    db_fruits.handle_input(query)
+    rows = []
+    while db_fruits.get_pipe().has_msgs():
+        record = db_fruits.get_pipe().read()
+        rows.append((record.at_index(0), record.at_index(1), record.at_index(2)))
+    assert rows == [(140, 3, 4)]
+
+    db_fruits.handle_input(f"explain analyze {query}")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[2].startswith("  -> HashAggregate by avg_weight (actual rows=9 ")
+
+
+def test_select_group_by_stream_aggregate(db_fruits):
+    # a scan is ordered on the primary key; so grouping on it streams the groups
+    query = "select f.id, sum(f.avg_weight) from fruits f where f.id < 4 group by f.id having sum(f.avg_weight) > 150"
+    db_fruits.handle_input(query)
+    rows = []
+    while db_fruits.get_pipe().has_msgs():
+        record = db_fruits.get_pipe().read()
+        rows.append((record.at_index(0), record.at_index(1)))
+    assert rows == [(1, 200), (3, 1000)]
+
+    db_fruits.handle_input(f"explain analyze {query}")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[1].startswith("-> Having sum(f.avg_weight) > 150 (actual rows=2 ")
+    assert lines[2].startswith("  -> StreamAggregate by f.id (actual rows=3 ")
+
+
+def test_select_count_from_row_count(db_fruits):
+    # counting the primary key, without a where clause, reads the table's row count
+    db_fruits.handle_input("insert into fruits (id, name) values (10, 'kiwi')")
+    db_fruits.handle_input("delete from fruits where id < 3")
+    db_fruits.handle_input("select count(id) from fruits")
+    assert db_fruits.get_pipe().read().at_index(0) == 8
+
+    db_fruits.handle_input("explain analyze select count(f.id) from fruits f")
+    lines = []
+    while db_fruits.get_pipe().has_msgs():
+        lines.append(db_fruits.get_pipe().read().get("query_plan"))
+    assert lines[1].startswith("-> RowCount fruits (actual rows=1 ")
+    assert "pages=0 " in lines[1]
+    assert db_fruits.virtual_machine.get_table_statistics("fruits").row_count == 8
+
+    # a count of a nullable column is counted by scanning
+    db_fruits.handle_input("select count(avg_weight) from fruits")
+    assert db_fruits.get_pipe().read().at_index(0) == 7
+
+    # row counts persist in the catalog
+    db_fruits.close()
+    db = LearnDB(TEST_DB_FILE)
+    db.handle_input("select name, row_count from catalog")
+    record = db.get_pipe().read()
+    assert (record.at_index(0), record.at_index(1)) == ("fruits", 8)
+    db.handle_input("select count(id) from fruits")
+    assert db.get_pipe().read().at_index(0) == 8
+    db.close()
+
+
+def test_select_aggregates(db_fruits):
+    db_fruits.handle_input("insert into fruits (id, name) values (10, 'kiwi')")
+    # without a group by, aggregates are over all records; nulls are skipped
+    db_fruits.handle_input(
+        "select count(avg_weight), sum(avg_weight), avg(avg_weight), min(name), max(avg_weight) from fruits"
+    )
+    record = db_fruits.get_pipe().read()
+    assert [record.at_index(idx) for idx in range(5)] == [9, 11916, 11916 / 9, 'apple', 10000]
+    assert not db_fruits.get_pipe().has_msgs()
+
+    # over no records, count is 0, and the others are null
+    db_fruits.handle_input("select count(id), sum(avg_weight), min(name) from fruits where id > 100")
+    record = db_fruits.get_pipe().read()
+    assert [record.at_index(idx) for idx in range(3)] == [0, None, None]
+
+    # sum is only defined over numeric columns
+    resp = db_fruits.handle_input("select sum(name) from fruits")
+    assert not resp.success
+
+
+def test_aggregate_accumulators_merge():
+    # partial states, e.g. from separate workers, merge into the state over all values
+    values = [3, None, 7, 1, 5]
+    for name in ["count", "sum", "avg", "min", "max"]:
+        accumulator = functions.resolve_function_name(name).accumulator
+        left = right = accumulator.init()
+        for value in values[:2]:
+            left = accumulator.step(left, value)
+        for value in values[2:]:
+            right = accumulator.step(right, value)
+        merged = accumulator.finalize(accumulator.merge(left, right))
+        assert merged == functions.accumulate(accumulator, values)
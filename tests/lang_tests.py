@@ -97,6 +97,28 @@ def test_drop_stmnt():
     assert handler.is_success()
 
 
+def test_analyze_stmnt():
+    cmds = [
+        "analyze",
+        "analyze foo",
+    ]
+    for cmd in cmds:
+        handler = SqlFrontEnd()
+        handler.parse(cmd)
+        assert handler.is_success()
+
+
+def test_explain_stmnt():
+    cmds = [
+        "explain select cola from foo",
+        "explain analyze select cola from foo f join bar b on f.id = b.id where cola > 1",
+    ]
+    for cmd in cmds:
+        handler = SqlFrontEnd()
+        handler.parse(cmd)
+        assert handler.is_success()
+
+
 def test_multi_stmnt():
     cmd = "create table foo ( colA integer primary key, colB text); select cola from foo"
     handler = SqlFrontEnd()
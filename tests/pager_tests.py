@@ -34,4 +34,22 @@ def test_free_pages_persisted():
     new_page = pager.get_unused_page_num()
     assert new_page in returned_pages
     new_page = pager.get_unused_page_num()
-    assert new_page in returned_pages
\ No newline at end of file
+    assert new_page in returned_pages
+
+
+def test_no_free_pages_persisted():
+    """
+    Test that if no pages are returned, no free pages are
+    served after pager is closed and reopened.
+    :return:
+    """
+    if os.path.exists(TEST_DB_FILE):
+        os.remove(TEST_DB_FILE)
+
+    pager = Pager(TEST_DB_FILE)
+    for _ in range(3):
+        pager.get_page(pager.get_unused_page_num())
+    pager.close()
+
+    pager = Pager(TEST_DB_FILE)
+    assert pager.get_unused_page_num() == 3